@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -93,6 +94,22 @@ DATABASES = {
 }
 
 
+# Cache shared by every worker process on the host. The timetable, airport
+# index, route calendar and flight instance horizon keep their version
+# stamps here, so a schedule load, sync or admin edit in one process is
+# seen by all the others. A per-process (LocMem) cache would hide them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('FLIGHT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'flight-cache')),
+        'OPTIONS': {
+            # Culling is random; keep it away from the handful of version stamps
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -146,3 +163,73 @@ INTERNAL_IPS = [
 AMADEUS_CLIENT_ID = os.environ.get('AMADEUS_CLIENT_ID', 'your_client_id_here')
 AMADEUS_CLIENT_SECRET = os.environ.get('AMADEUS_CLIENT_SECRET', 'your_client_secret_here')
 AMADEUS_HOSTNAME = os.environ.get('AMADEUS_HOSTNAME', 'test')  # 'test' for sandbox, 'production' for live
+
+# Amadeus HTTP connection pools (sync SDK session and async client)
+AMADEUS_HTTP_TIMEOUT = float(os.environ.get('AMADEUS_HTTP_TIMEOUT', '10'))
+AMADEUS_HTTP_MAX_CONNECTIONS = int(os.environ.get('AMADEUS_HTTP_MAX_CONNECTIONS', '200'))
+AMADEUS_HTTP_MAX_KEEPALIVE = int(os.environ.get('AMADEUS_HTTP_MAX_KEEPALIVE', '50'))
+# Refresh the shared access token in the background this many seconds before it expires
+AMADEUS_TOKEN_REFRESH_AHEAD = int(os.environ.get('AMADEUS_TOKEN_REFRESH_AHEAD', '300'))
+
+# Log 1 in N Amadeus flight-offer payloads at DEBUG level (0 disables)
+AMADEUS_LOG_PAYLOAD_SAMPLE = int(os.environ.get('AMADEUS_LOG_PAYLOAD_SAMPLE', '100'))
+
+# Seconds identical flight-offer searches are served from cache (0 disables)
+AMADEUS_OFFER_CACHE_TTL = int(os.environ.get('AMADEUS_OFFER_CACHE_TTL', '120'))
+
+# Request quota for flight searches (the self-service test environment
+# allows 10 per second), how long to hold searches back after a 429, and
+# how many searches a flexible-date batch keeps in flight
+AMADEUS_MAX_REQUESTS_PER_SECOND = float(os.environ.get('AMADEUS_MAX_REQUESTS_PER_SECOND', '10'))
+AMADEUS_RATE_LIMIT_PAUSE = float(os.environ.get('AMADEUS_RATE_LIMIT_PAUSE', '1'))
+AMADEUS_BATCH_CONCURRENCY = int(os.environ.get('AMADEUS_BATCH_CONCURRENCY', '8'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'standard': {
+            'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'standard',
+        },
+    },
+    'loggers': {
+        'flight': {
+            'handlers': ['console'],
+            'level': os.environ.get('FLIGHT_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+# Log a warning on a worker's first request if the reference tables are empty.
+# Seed them with `python manage.py bootstrap`.
+FLIGHT_BOOTSTRAP_CHECK = os.environ.get('FLIGHT_BOOTSTRAP_CHECK', 'false').lower() == 'true'
+
+# Connection search over the local schedule (minutes)
+FLIGHT_MIN_CONNECTION_MINUTES = 60
+FLIGHT_MAX_LAYOVER_MINUTES = 12 * 60
+# Shortest gap between landing and the return flight when pairing round trips
+FLIGHT_MIN_TURNAROUND_MINUTES = 120
+
+# Seats sold per flight, date and class, and how long an unpaid booking holds
+# its seats before they are released for others to book
+FLIGHT_SEAT_CAPACITY = {'economy': 150, 'business': 30, 'first': 8}
+FLIGHT_SEAT_HOLD_MINUTES = int(os.environ.get('FLIGHT_SEAT_HOLD_MINUTES', '15'))
+
+# Days ahead the weekly schedule is expanded into dated FlightInstance rows;
+# roll the window forward daily with `python manage.py generate_flight_instances`
+FLIGHT_INSTANCE_DAYS = int(os.environ.get('FLIGHT_INSTANCE_DAYS', '60'))
+
+# Plan search legs from the in-memory timetable; False reads them from the
+# database (at most two queries per leg) instead of holding the schedule
+FLIGHT_SEARCH_TIMETABLE = os.environ.get('FLIGHT_SEARCH_TIMETABLE', 'true').lower() == 'true'
+
+# Overall deadline (seconds) for the concurrent local + Amadeus search; sources
+# still running when it expires are dropped and the page is marked partial.
+FLIGHT_SEARCH_DEADLINE = float(os.environ.get('FLIGHT_SEARCH_DEADLINE', '8'))
+FLIGHT_SEARCH_WORKERS = int(os.environ.get('FLIGHT_SEARCH_WORKERS', '8'))
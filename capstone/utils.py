@@ -1,8 +1,10 @@
 from io import BytesIO
 from django.http import HttpResponse
 from django.template.loader import get_template
+from django.db import IntegrityError, transaction
 
 from flight.models import *
+from flight.inventory import reserve
 import secrets
 from datetime import datetime, timedelta
 # from xhtml2pdf import pisa  # Temporarily commented out
@@ -21,36 +23,65 @@ def render_to_pdf(template_src, context_dict={}):
     # return None
 
 
+def parse_ticket_date(value):
+    """Booking form date ("DD-MM-YYYY") as a datetime"""
+    day, month, year = (int(part) for part in value.split('-'))
+    return datetime(year, month, day)
+
+
+def createtickets(user, passengers, legs, coupon, countrycode, email, mobile):
+    """
+    Tickets for already saved `passengers` on each (flight, date, seat class)
+    leg: one INSERT for all tickets and one for all their passenger rows.
+    Each leg's seats are reserved first; SoldOut is raised if any leg is
+    full. Call inside a transaction so a failure leaves no partial booking.
+    """
+    tickets = []
+    for flight, flight_date, seat_class in legs:
+        depart_date = parse_ticket_date(flight_date)
+        departure = depart_date.replace(hour=flight.depart_time.hour, minute=flight.depart_time.minute)
+        arrival = departure + flight.duration
+        if not flight.fare(seat_class):
+            # Blank fares are loaded as 0.0
+            raise ValueError(f"{seat_class} is not sold on flight {flight.id}")
+        fare = flight.fare(seat_class) * len(passengers)
+        reserve(flight.id, depart_date.date(), seat_class, len(passengers))
+        tickets.append(Ticket(
+            user=user,
+            flight=flight,
+            flight_ddate=depart_date,
+            flight_adate=datetime(arrival.year, arrival.month, arrival.day),
+            flight_fare=fare,
+            other_charges=FEE,
+            coupon_used=coupon or '',
+            total_fare=fare+FEE+0.0,
+            seat_class=seat_class.lower(),
+            status='PENDING',
+            seats_held=len(passengers),
+            mobile=('+'+countrycode+' '+mobile),
+            email=email,
+        ))
+
+    for attempt in range(3):
+        for ticket in tickets:
+            ticket.ref_no = secrets.token_hex(3).upper()
+        try:
+            # Savepoint, so a reference-number collision can be retried
+            with transaction.atomic():
+                tickets = Ticket.objects.bulk_create(tickets)
+            break
+        except IntegrityError:
+            if attempt == 2:
+                raise
+
+    Through = Ticket.passengers.through
+    Through.objects.bulk_create([
+        Through(ticket_id=ticket.id, passenger_id=passenger.id) for ticket in tickets for passenger in passengers
+    ])
+    return tickets
+
+
 def createticket(user,passengers,passengerscount,flight1,flight_1date,flight_1class,coupon,countrycode,email,mobile):
-    ticket = Ticket.objects.create()
-    ticket.user = user
-    ticket.ref_no = secrets.token_hex(3).upper()
-    for passenger in passengers:
-        ticket.passengers.add(passenger)
-    ticket.flight = flight1
-    ticket.flight_ddate = datetime(int(flight_1date.split('-')[2]),int(flight_1date.split('-')[1]),int(flight_1date.split('-')[0]))
-    ###################
-    flight1ddate = datetime(int(flight_1date.split('-')[2]),int(flight_1date.split('-')[1]),int(flight_1date.split('-')[0]),flight1.depart_time.hour,flight1.depart_time.minute)
-    flight1adate = (flight1ddate + flight1.duration)
-    ###################
-    ticket.flight_adate = datetime(flight1adate.year,flight1adate.month,flight1adate.day)
-    ffre = 0.0
-    if flight_1class.lower() == 'first':
-        ticket.flight_fare = flight1.first_fare*int(passengerscount)
-        ffre = flight1.first_fare*int(passengerscount)
-    elif flight_1class.lower() == 'business':
-        ticket.flight_fare = flight1.business_fare*int(passengerscount)
-        ffre = flight1.business_fare*int(passengerscount)
-    else:
-        ticket.flight_fare = flight1.economy_fare*int(passengerscount)
-        ffre = flight1.economy_fare*int(passengerscount)
-    ticket.other_charges = FEE
-    if coupon:
-        ticket.coupon_used = coupon                     ##########Coupon
-    ticket.total_fare = ffre+FEE+0.0                    ##########Total(Including coupon)
-    ticket.seat_class = flight_1class.lower()
-    ticket.status = 'PENDING'
-    ticket.mobile = ('+'+countrycode+' '+mobile)
-    ticket.email = email
-    ticket.save()
-    return ticket
\ No newline at end of file
+    with transaction.atomic():
+        return createtickets(user, passengers, [(flight1, flight_1date, flight_1class)],
+                             coupon, countrycode, email, mobile)[0]
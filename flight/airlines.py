@@ -0,0 +1,106 @@
+"""
+Airline registry shared by the Amadeus service and the template filters.
+
+Carriers are read once per process from Data/airlines.csv (IATA code,
+display name and optional `;`-separated aliases) into two dictionaries, so
+resolving a code to a name or a name to a code is a single lookup. Names
+are matched after normalization (case, punctuation and generic words such
+as "Airlines"/"Airways" are ignored), which lets "Delta Airlines",
+"Delta Air Lines" and "DELTA" all resolve to DL.
+"""
+
+import csv
+import re
+import threading
+
+from django.conf import settings
+
+LOGO_URL = "https://www.gstatic.com/flights/airline_logos/70px/{code}.png"
+GENERIC_WORDS = re.compile(r'\b(?:air lines|airlines|airline|airways)\b')
+
+
+def normalize_name(name):
+    """Lowercase alphanumeric words of an airline name"""
+    return ' '.join(re.findall(r'[0-9a-z]+', str(name).lower()))
+
+
+def loose_name(normalized):
+    """Normalized name without generic words ("korean air lines" -> "korean")"""
+    return ' '.join(GENERIC_WORDS.sub('', normalized).split())
+
+
+class Airline:
+    __slots__ = ('code', 'name')
+
+    def __init__(self, code, name):
+        self.code = code
+        self.name = name
+
+    @property
+    def logo_url(self):
+        return LOGO_URL.format(code=self.code)
+
+    def __repr__(self):
+        return f"<Airline {self.code}: {self.name}>"
+
+
+class AirlineRegistry:
+    """Airlines indexed by IATA code and by normalized name."""
+
+    def __init__(self, rows):
+        self.by_code = {}
+        self.by_name = {}
+        loose = {}
+        for code, name, aliases in rows:
+            code = code.strip().upper()
+            airline = self.by_code.setdefault(code, Airline(code, name.strip()))
+            for alias in [name] + [alias for alias in aliases.split(';') if alias.strip()]:
+                normalized = normalize_name(alias)
+                self.by_name.setdefault(normalized, airline)
+                loose.setdefault(loose_name(normalized), airline)
+        # Exact normalized names win over the looser, suffix-free ones
+        for key, airline in loose.items():
+            if key:
+                self.by_name.setdefault(key, airline)
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or settings.BASE_DIR / 'Data' / 'airlines.csv'
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            return cls([(row['code'], row['name'], row.get('aliases') or '') for row in reader])
+
+    def get(self, code):
+        """Airline for an IATA code, or None"""
+        return self.by_code.get(str(code).strip().upper()) if code else None
+
+    def find(self, name):
+        """Airline for a display name or alias, or None"""
+        if not name:
+            return None
+        normalized = normalize_name(name)
+        return self.by_name.get(normalized) or self.by_name.get(loose_name(normalized))
+
+    def name(self, code):
+        """Display name for a code, falling back to the code itself"""
+        airline = self.get(code)
+        return airline.name if airline else code
+
+    def code(self, name):
+        """IATA code for a name, or None when the carrier is unknown"""
+        airline = self.find(name)
+        return airline.code if airline else None
+
+
+_registry = None
+_lock = threading.Lock()
+
+
+def get_airline_registry():
+    """Return this process's airline registry, loading it on first use"""
+    global _registry
+    if _registry is None:
+        with _lock:
+            if _registry is None:
+                _registry = AirlineRegistry.load()
+    return _registry
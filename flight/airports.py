@@ -0,0 +1,115 @@
+"""
+Prebuilt airport index for the /query/places autocomplete.
+
+Matches are ranked in three tiers: exact IATA code, city prefix, then
+substring of city, airport name, code or country. City prefixes are found
+by bisecting a sorted list and substrings through a bigram/trigram index, so a
+keystroke costs a handful of dictionary and set operations regardless of
+how many airports are loaded.
+
+Like the timetable, the index is built on first use and rebuilt after any
+Place change, signalled through a version stamp in the Django cache.
+"""
+
+import bisect
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Place
+from .versions import VersionedIndex
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+VERSION_CACHE_KEY = 'flight_airport_index_version'
+
+
+def ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class AirportIndex:
+    """Ranked prefix/trigram index over Place rows."""
+
+    def __init__(self, places, version=None):
+        self.version = version
+        self.places = []
+        seen = set()
+        for place in sorted(places, key=lambda place: (place.city.lower(), place.code)):
+            if place.code in seen:
+                continue
+            seen.add(place.code)
+            self.places.append(place)
+
+        self.codes = {}
+        self.cities = []
+        self.texts = []
+        self.grams = {}
+        for i, place in enumerate(self.places):
+            self.codes.setdefault(place.code.lower(), i)
+            self.cities.append(place.city.lower())
+            # NUL separators keep matches from spanning two fields
+            text = '\0'.join((place.city, place.airport, place.code, place.country)).lower()
+            self.texts.append(text)
+            for gram in ngrams(text, 2) | ngrams(text, 3):
+                self.grams.setdefault(gram, set()).add(i)
+
+    @classmethod
+    def build(cls, version=None):
+        return cls(Place.objects.only('city', 'airport', 'code', 'country'), version)
+
+    def search(self, q, limit=DEFAULT_LIMIT):
+        """Places matching `q`, best matches first, at most `limit` of them"""
+        q = q.strip().lower()
+        if not q:
+            return []
+        found = []
+        taken = set()
+
+        def take(i):
+            if i not in taken:
+                taken.add(i)
+                found.append(self.places[i])
+            return len(found) >= limit
+
+        # 1. exact airport code
+        if q in self.codes and take(self.codes[q]):
+            return found
+
+        # 2. city prefix; cities are sorted so matches form one contiguous run
+        i = bisect.bisect_left(self.cities, q)
+        while i < len(self.cities) and self.cities[i].startswith(q):
+            if take(i):
+                return found
+            i += 1
+
+        # 3. substring anywhere; candidates from the bigram/trigram postings
+        if len(q) >= 2:
+            postings = sorted((self.grams.get(gram, set()) for gram in ngrams(q, min(len(q), 3))), key=len)
+            candidates = set.intersection(*postings) if postings[0] else set()
+            candidates = sorted(candidates - taken)
+        else:
+            candidates = range(len(self.places))
+        for i in candidates:
+            if q in self.texts[i] and take(i):
+                break
+        return found
+
+
+_index = VersionedIndex(VERSION_CACHE_KEY, AirportIndex.build)
+
+
+def get_airport_index():
+    """Return this process's airport index, rebuilding it if missing or stale"""
+    return _index.get()
+
+
+def invalidate_airport_index():
+    """Mark every process's airport index stale; call after bulk Place writes"""
+    _index.invalidate()
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def place_changed(sender, **kwargs):
+    invalidate_airport_index()
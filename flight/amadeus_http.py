@@ -0,0 +1,318 @@
+"""
+Shared HTTP transport for the Amadeus self-service APIs.
+
+One AmadeusConnection per worker owns what is expensive to set up:
+
+* a pooled `requests.Session`, handed to the `amadeus` SDK as its `http`
+  callable so SDK calls reuse keep-alive connections instead of opening a
+  new TLS connection per request through `urlopen`;
+* the OAuth access token, shared by the SDK and the async client and
+  refreshed in the background once it is close to expiry, so requests
+  after warm-up never wait on token acquisition;
+* the request quota: flight searches are spaced to the account's
+  transactions-per-second limit and held back after a 429, so fan-out
+  callers queue locally instead of being rejected upstream.
+
+AsyncAmadeusClient talks to the same REST endpoints through pooled
+`httpx.AsyncClient`s for the async views. An httpx client is bound to the
+event loop it was created on, so there is one client per running loop, and
+each is closed on its own loop when that loop shuts down. Under ASGI that is
+one loop per worker; when async views are run from WSGI, Django gives each
+request its own loop in its own thread, so every request opens (and closes)
+a fresh pool while the token is still shared.
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from urllib.error import URLError
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import httpx
+except ImportError:  # only needed by the async views
+    httpx = None
+
+HOSTS = {
+    'test': 'https://test.api.amadeus.com',
+    'production': 'https://api.amadeus.com',
+}
+TOKEN_PATH = '/v1/security/oauth2/token'
+# Stop using a token this many seconds before Amadeus says it expires
+TOKEN_MARGIN = 30
+
+
+class AmadeusHTTPError(Exception):
+    """Non-2xx response from Amadeus; mirrors amadeus.ResponseError's fields."""
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+        errors = body.get('errors') if isinstance(body, dict) else None
+        if errors:
+            self.description = errors[0].get('detail') or errors[0].get('title') or str(errors[0])
+        else:
+            self.description = f"HTTP {status_code}"
+        super().__init__(self.description)
+
+
+def response_body(response):
+    """Decoded JSON body of a requests/httpx response, or a synthetic error body"""
+    try:
+        return response.json()
+    except ValueError:
+        return {'errors': [{'detail': response.text[:200]}]}
+
+
+class AccessToken:
+    """
+    Thread-safe OAuth token shared by every client of one connection.
+
+    Also stands in for the SDK's own AccessToken (it implements
+    `_bearer_token()`), so SDK calls use the shared token.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.value = None
+        self.expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    @property
+    def refresh_ahead(self):
+        return getattr(settings, 'AMADEUS_TOKEN_REFRESH_AHEAD', 300)
+
+    def current(self):
+        """Valid token or None; starts a background refresh when it is nearly expired"""
+        value, now = self.value, time.monotonic()
+        if value is None or now >= self.expires_at:
+            return None
+        if now >= self.expires_at - self.refresh_ahead:
+            self._refresh_in_background()
+        return value
+
+    def get(self):
+        """Valid token, fetching one synchronously if there is none"""
+        value = self.current()
+        if value is not None:
+            return value
+        with self._lock:
+            value = self.current()
+            if value is None:
+                value = self.store(self.connection.fetch_token())
+            return value
+
+    def store(self, body):
+        """Record a token response body and return the token"""
+        self.value = body['access_token']
+        self.expires_at = time.monotonic() + int(body.get('expires_in', 0)) - TOKEN_MARGIN
+        return self.value
+
+    def reset(self):
+        self.value = None
+
+    def _bearer_token(self):
+        return f'Bearer {self.get()}'
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh():
+            try:
+                self.store(self.connection.fetch_token())
+            except Exception:
+                pass  # the current token is still valid; the next caller retries
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=refresh, name='amadeus-token-refresh', daemon=True).start()
+
+
+class PooledResponse:
+    """The subset of urllib's HTTPResponse the SDK's parser reads."""
+
+    def __init__(self, response):
+        self.status = self.code = response.status_code
+        self._response = response
+
+    def getheaders(self):
+        return list(self._response.headers.items())
+
+    def read(self):
+        return self._response.content
+
+
+class RequestQuota:
+    """Start slots for upstream calls: at most `rate` per second, pausable after a 429."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def reserve(self):
+        """Claim the next free slot; returns the seconds to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+            return start - now
+
+    def wait(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def await_turn(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        """Hold back every later call for `seconds`, e.g. after a rate-limit response"""
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+class AmadeusConnection:
+    """Credentials, pooled session, shared token and quota for one Amadeus host."""
+
+    def __init__(self, client_id=None, client_secret=None, hostname=None):
+        self.client_id = client_id or settings.AMADEUS_CLIENT_ID
+        self.client_secret = client_secret or settings.AMADEUS_CLIENT_SECRET
+        self.hostname = hostname or settings.AMADEUS_HOSTNAME
+        self.base_url = HOSTS.get(self.hostname, self.hostname)
+        self.timeout = getattr(settings, 'AMADEUS_HTTP_TIMEOUT', 10.0)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_maxsize=getattr(settings, 'AMADEUS_HTTP_MAX_KEEPALIVE', 50)
+        )
+        self.session.mount('https://', adapter)
+        self.token = AccessToken(self)
+        self.quota = RequestQuota(getattr(settings, 'AMADEUS_MAX_REQUESTS_PER_SECOND', 10))
+
+    def token_request(self):
+        return {
+            'grant_type': 'client_credentials',
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+        }
+
+    def fetch_token(self):
+        """POST for a new access token and return the response body"""
+        response = self.session.post(self.base_url + TOKEN_PATH, data=self.token_request(), timeout=self.timeout)
+        body = response_body(response)
+        if response.status_code >= 400:
+            raise AmadeusHTTPError(response.status_code, body)
+        return body
+
+    def http(self, request):
+        """`http` hook for amadeus.Client: send a urllib Request over the pool"""
+        try:
+            response = self.session.request(
+                request.get_method(), request.full_url,
+                data=request.data, headers=dict(request.header_items()), timeout=self.timeout,
+            )
+        except requests.RequestException as e:
+            # The SDK turns URLErrors into NetworkError responses
+            raise URLError(e)
+        return PooledResponse(response)
+
+
+class LoopClient:
+    """httpx client and token lock bound to one event loop."""
+
+    def __init__(self, http):
+        self.http = http
+        self.token_lock = asyncio.Lock()
+        self.closer = None
+
+
+class AsyncAmadeusClient:
+    """Pooled async client using the connection's shared access token."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._lock = threading.Lock()
+        self._loops = weakref.WeakKeyDictionary()
+
+    async def _client(self):
+        """LoopClient for the running event loop, created on first use"""
+        if httpx is None:
+            raise ImproperlyConfigured("The async Amadeus client requires httpx (pip install httpx)")
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loops.get(loop)
+            created = state is None
+            if created:
+                state = self._loops[loop] = LoopClient(httpx.AsyncClient(
+                    base_url=self.connection.base_url,
+                    timeout=self.connection.timeout,
+                    limits=httpx.Limits(
+                        max_connections=getattr(settings, 'AMADEUS_HTTP_MAX_CONNECTIONS', 200),
+                        max_keepalive_connections=getattr(settings, 'AMADEUS_HTTP_MAX_KEEPALIVE', 50),
+                    ),
+                ))
+        if created:
+            # asyncio.run() closes open async generators before it closes the
+            # loop, so the pool is shut down on the loop that owns it
+            state.closer = self._close_with_loop(loop, state)
+            await state.closer.asend(None)
+        return state
+
+    async def _close_with_loop(self, loop, state):
+        try:
+            yield
+        finally:
+            with self._lock:
+                if self._loops.get(loop) is state:
+                    del self._loops[loop]
+            await state.http.aclose()
+
+    async def access_token(self):
+        """Shared bearer token; only a cold start fetches it on this loop"""
+        token = self.connection.token.current()
+        if token is not None:
+            return token
+        state = await self._client()
+        async with state.token_lock:
+            token = self.connection.token.current()
+            if token is not None:
+                return token
+            response = await state.http.post(TOKEN_PATH, data=self.connection.token_request())
+            body = response_body(response)
+            if response.status_code >= 400:
+                raise AmadeusHTTPError(response.status_code, body)
+            return self.connection.token.store(body)
+
+    async def get(self, path, **params):
+        """GET an API path and return the decoded `data` member"""
+        http = (await self._client()).http
+        token = await self.access_token()
+        response = await http.get(path, params=params, headers={'Authorization': f'Bearer {token}'})
+        if response.status_code == 401:
+            # Token revoked or expired early; fetch a new one and retry once
+            self.connection.token.reset()
+            token = await self.access_token()
+            response = await http.get(path, params=params, headers={'Authorization': f'Bearer {token}'})
+        body = response_body(response)
+        if response.status_code >= 400:
+            raise AmadeusHTTPError(response.status_code, body)
+        return body.get('data', [])
+
+    async def aclose(self):
+        """Close the running loop's pool now instead of when the loop shuts down"""
+        with self._lock:
+            state = self._loops.get(asyncio.get_running_loop())
+        if state is not None:
+            await state.closer.aclose()
@@ -9,22 +9,44 @@ from amadeus import Client, ResponseError
 from django.conf import settings
 from django.core.cache import cache
 from datetime import datetime, timedelta
+import asyncio
+import itertools
 import logging
-import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .amadeus_http import AmadeusConnection, AsyncAmadeusClient, AmadeusHTTPError
+from .offer_cache import offer_cache
+from .offers import OfferTable
+from .airlines import get_airline_registry
 
-# Configure logging for detailed debugging
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-
-# Create console handler if it doesn't exist
-if not logger.handlers:
-    handler = logging.StreamHandler()
-    handler.setLevel(logging.DEBUG)
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+_payload_samples = itertools.count()
+RATE_LIMITED = 429
+
+
+def sample_payload():
+    """
+    True for one in every AMADEUS_LOG_PAYLOAD_SAMPLE calls (0 disables).
+    Only consulted when DEBUG is enabled, so it costs nothing otherwise.
+    """
+    rate = getattr(settings, 'AMADEUS_LOG_PAYLOAD_SAMPLE', 0)
+    return rate > 0 and next(_payload_samples) % rate == 0
+
+
+class Truncated:
+    """Log argument that stringifies (and truncates) a payload only if emitted."""
+    __slots__ = ('value', 'limit')
+
+    def __init__(self, value, limit=1000):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self):
+        text = str(self.value)
+        return text if len(text) <= self.limit else text[:self.limit] + '...'
+
 
 class AmadeusService:
     """
@@ -33,21 +55,74 @@ class AmadeusService:
     """
     
     def __init__(self):
-        """Initialize Amadeus client with credentials from settings"""
-        logger.debug("Initializing AmadeusService")
-        logger.debug(f"Client ID: {settings.AMADEUS_CLIENT_ID[:10]}..." if settings.AMADEUS_CLIENT_ID else "No Client ID")
-        logger.debug(f"Hostname: {settings.AMADEUS_HOSTNAME}")
-        
+        """Nothing is set up until the first API call; see `client`"""
+        self._lock = threading.Lock()
+        self._connection = None
+        self._client = None
+        self._async_client = None
+
+    @property
+    def connection(self):
+        """Shared session pool and access token for this worker"""
+        if self._connection is None:
+            with self._lock:
+                if self._connection is None:
+                    self._connection = AmadeusConnection()
+        return self._connection
+
+    @property
+    def client(self):
+        """amadeus SDK client, created on first use over the shared connection"""
+        if self._client is None:
+            connection = self.connection
+            with self._lock:
+                if self._client is None:
+                    self._client = self._create_client(connection)
+        return self._client
+
+    @property
+    def async_client(self):
+        """Pooled async transport used by the a*-prefixed methods"""
+        if self._async_client is None:
+            connection = self.connection
+            with self._lock:
+                if self._async_client is None:
+                    self._async_client = AsyncAmadeusClient(connection)
+        return self._async_client
+
+    def _create_client(self, connection):
+        logger.debug("Amadeus client id %s..., hostname %s", (connection.client_id or '')[:10], connection.hostname)
+
         try:
-            self.client = Client(
-                client_id=settings.AMADEUS_CLIENT_ID,
-                client_secret=settings.AMADEUS_CLIENT_SECRET,
-                hostname=settings.AMADEUS_HOSTNAME
+            client = Client(
+                client_id=connection.client_id,
+                client_secret=connection.client_secret,
+                hostname=connection.hostname,
+                http=connection.http
             )
-            logger.info("Amadeus client initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Amadeus client: {str(e)}")
             raise
+        # The SDK memoizes its token on this attribute; share ours instead
+        client.access_token = connection.token
+        logger.info("Amadeus client initialized successfully")
+        return client
+
+    def _flight_search_params(self, origin_code, destination_code, departure_date,
+                              return_date, adults, travel_class, max_results):
+        """Flight Offers Search query parameters"""
+        search_params = {
+            'originLocationCode': origin_code,
+            'destinationLocationCode': destination_code,
+            'departureDate': departure_date,
+            'adults': adults,
+            'travelClass': travel_class,
+            'max': max_results
+        }
+        # Add return date for round trip
+        if return_date:
+            search_params['returnDate'] = return_date
+        return search_params
     
     def search_flights(self, origin_code, destination_code, departure_date, 
                       return_date=None, adults=1, travel_class='ECONOMY', 
@@ -67,70 +142,76 @@ class AmadeusService:
         Returns:
             dict: Flight search results or error message
         """
-        logger.info("=== AMADEUS FLIGHT SEARCH DEBUG ===")
-        logger.info(f"Input parameters:")
-        logger.info(f"  Origin: {origin_code}")
-        logger.info(f"  Destination: {destination_code}")
-        logger.info(f"  Departure Date: {departure_date}")
-        logger.info(f"  Return Date: {return_date}")
-        logger.info(f"  Adults: {adults}")
-        logger.info(f"  Travel Class: {travel_class}")
-        logger.info(f"  Max Results: {max_results}")
-        
+        # Prepare search parameters
+        search_params = self._flight_search_params(
+            origin_code, destination_code, departure_date,
+            return_date, adults, travel_class, max_results
+        )
+        # Identical searches within the TTL (or in flight) share one API call
+        return offer_cache.get_or_fetch(
+            search_params,
+            lambda: self._fetch_flight_offers(search_params),
+            cacheable=lambda result: not result.get('error')
+        )
+
+    def search_dates(self, searches, adults=1, travel_class='ECONOMY', max_results=20, concurrency=None):
+        """
+        Run several flight searches concurrently and yield (search, result)
+        pairs as each one completes. `searches` are (origin_code,
+        destination_code, departure_date, return_date) tuples; at most
+        `concurrency` (default settings.AMADEUS_BATCH_CONCURRENCY) run at once,
+        each goes through the offer cache and the request quota, and a search
+        rejected by the rate limit is retried once after the quota pause.
+        """
+        searches = list(searches)
+        if not searches:
+            return
+        concurrency = concurrency or getattr(settings, 'AMADEUS_BATCH_CONCURRENCY', 8)
+
+        def run(search):
+            origin_code, destination_code, departure_date, return_date = search
+            for attempt in range(2):
+                result = self.search_flights(origin_code, destination_code, departure_date, return_date,
+                                             adults, travel_class, max_results)
+                if not self._rate_limited(result):
+                    break
+            return result
+
+        executor = ThreadPoolExecutor(max_workers=min(concurrency, len(searches)),
+                                      thread_name_prefix='amadeus-batch')
+        try:
+            futures = {executor.submit(run, search): search for search in searches}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # Stop queued searches if the consumer goes away early
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _rate_limited(self, result):
+        return result.get('error') and result.get('api_error', {}).get('status_code') == RATE_LIMITED
+
+    def _check_quota(self, status_code):
+        if status_code == RATE_LIMITED:
+            self.connection.quota.pause(getattr(settings, 'AMADEUS_RATE_LIMIT_PAUSE', 1.0))
+
+    def _fetch_flight_offers(self, search_params):
+        """Call Flight Offers Search and normalize the response"""
+        self.connection.quota.wait()
+        started = time.perf_counter()
         try:
-            # Prepare search parameters
-            search_params = {
-                'originLocationCode': origin_code,
-                'destinationLocationCode': destination_code,
-                'departureDate': departure_date,
-                'adults': adults,
-                'travelClass': travel_class,
-                'max': max_results
-            }
-            
-            # Add return date for round trip
-            if return_date:
-                search_params['returnDate'] = return_date
-            
-            logger.info(f"API Request Parameters: {json.dumps(search_params, indent=2)}")
-            
-            # Call Amadeus API
-            logger.info("Making API call to Amadeus...")
             response = self.client.shopping.flight_offers_search.get(**search_params)
-            
-            logger.info(f"API Response Status: {response.status_code}")
-            
-            # Note: Amadeus SDK response headers access varies by version
-            try:
-                if hasattr(response, 'response') and hasattr(response.response, 'headers'):
-                    logger.info(f"API Response Headers: {dict(response.response.headers)}")
-                elif hasattr(response, 'headers'):
-                    logger.info(f"API Response Headers: {dict(response.headers)}")
-                else:
-                    logger.info("API Response Headers: Not accessible in this SDK version")
-            except Exception as e:
-                logger.debug(f"Could not access response headers: {e}")
-            
-            # Log raw response data (first 1000 chars for brevity)
-            raw_data = str(response.data)
-            if len(raw_data) > 1000:
-                logger.info(f"API Response Data (truncated): {raw_data[:1000]}...")
-            else:
-                logger.info(f"API Response Data: {raw_data}")
-            
-            logger.info(f"Number of flight offers returned: {len(response.data) if response.data else 0}")
-            
-            # Process and normalize the response
             normalized_results = self._normalize_flight_results(response.data)
-            logger.info(f"Normalized results: {len(normalized_results.get('flights', []))} flights")
-            
+            self._log_offers(search_params, response.status_code, response.data, normalized_results, started)
+            if logger.isEnabledFor(logging.DEBUG) and sample_payload():
+                logger.debug("Amadeus flight offers payload: headers=%s data=%s",
+                             getattr(response, 'headers', None), Truncated(response.data))
             return normalized_results
             
         except ResponseError as error:
-            logger.error(f"=== AMADEUS API ERROR ===")
-            logger.error(f"Error Code: {error.response.status_code}")
-            logger.error(f"Error Body: {error.response.body}")
-            logger.error(f"Error Description: {error.description}")
+            logger.error("Amadeus flight search failed: status=%s description=%s params=%s body=%s",
+                         error.response.status_code, error.description, search_params,
+                         Truncated(error.response.body))
+            self._check_quota(error.response.status_code)
             
             return {
                 'error': True,
@@ -142,17 +223,27 @@ class AmadeusService:
                     'description': error.description
                 }
             }
-        except Exception as e:
-            logger.error(f"=== UNEXPECTED ERROR ===")
-            logger.error(f"Exception type: {type(e).__name__}")
-            logger.error(f"Exception message: {str(e)}")
-            logger.error(f"Exception details: {repr(e)}")
+        except Exception:
+            logger.exception("Unexpected error in Amadeus flight search: params=%s", search_params)
             
             return {
                 'error': True,
                 'message': "An unexpected error occurred during flight search",
                 'flights': []
             }
+
+    def _log_offers(self, search_params, status_code, data, normalized_results, started):
+        """One INFO line per upstream search; arguments are formatted only if emitted"""
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Amadeus flight search %s-%s %s%s: status=%s offers=%d flights=%d in %.0f ms",
+                search_params['originLocationCode'], search_params['destinationLocationCode'],
+                search_params['departureDate'],
+                f"/{search_params['returnDate']}" if 'returnDate' in search_params else '',
+                status_code, len(data or ()), len(normalized_results.get('flights', ())),
+                (time.perf_counter() - started) * 1000,
+                extra={'amadeus_params': search_params},
+            )
     
     def get_airport_suggestions(self, keyword):
         """
@@ -166,7 +257,7 @@ class AmadeusService:
         """
         try:
             # Cache key for airport suggestions (URL safe)
-            cache_key = f"amadeus_airports_{keyword.lower().replace(' ', '_')}"
+            cache_key = self._airport_cache_key(keyword)
             cached_result = cache.get(cache_key)
             
             if cached_result:
@@ -177,16 +268,7 @@ class AmadeusService:
                 subType='AIRPORT,CITY'
             )
             
-            suggestions = []
-            for location in response.data:
-                suggestion = {
-                    'code': location.get('iataCode', ''),
-                    'name': location.get('name', ''),
-                    'city': location.get('address', {}).get('cityName', ''),
-                    'country': location.get('address', {}).get('countryName', ''),
-                    'type': location.get('subType', '')
-                }
-                suggestions.append(suggestion)
+            suggestions = self._location_suggestions(response.data)
             
             # Cache for 1 hour
             cache.set(cache_key, suggestions, 3600)
@@ -218,11 +300,7 @@ class AmadeusService:
                 departureDate=departure_date
             )
             
-            return {
-                'error': False,
-                'currency': response.data[0].get('currencyCode', 'USD'),
-                'price_metrics': response.data[0].get('priceMetrics', [])
-            }
+            return self._price_metrics(response.data)
             
         except ResponseError as error:
             logger.error(f"Price analysis error: {error}")
@@ -231,6 +309,138 @@ class AmadeusService:
             logger.error(f"Unexpected error in price analysis: {e}")
             return {'error': True, 'message': str(e)}
     
+    async def asearch_flights(self, origin_code, destination_code, departure_date,
+                              return_date=None, adults=1, travel_class='ECONOMY',
+                              max_results=20):
+        """Async version of search_flights(); same arguments and result shape"""
+        search_params = self._flight_search_params(
+            origin_code, destination_code, departure_date,
+            return_date, adults, travel_class, max_results
+        )
+        return await offer_cache.aget_or_fetch(
+            search_params,
+            lambda: self._afetch_flight_offers(search_params),
+            cacheable=lambda result: not result.get('error')
+        )
+
+    async def asearch_dates(self, searches, adults=1, travel_class='ECONOMY', max_results=20, concurrency=None):
+        """Async version of search_dates(); an async generator of (search, result)"""
+        searches = list(searches)
+        gate = asyncio.Semaphore(concurrency or getattr(settings, 'AMADEUS_BATCH_CONCURRENCY', 8))
+
+        async def run(search):
+            async with gate:
+                for attempt in range(2):
+                    result = await self.asearch_flights(*search, adults, travel_class, max_results)
+                    if not self._rate_limited(result):
+                        break
+            return search, result
+
+        tasks = [asyncio.ensure_future(run(search)) for search in searches]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _afetch_flight_offers(self, search_params):
+        await self.connection.quota.await_turn()
+        started = time.perf_counter()
+        try:
+            data = await self.async_client.get('/v2/shopping/flight-offers', **search_params)
+            normalized_results = self._normalize_flight_results(data)
+            self._log_offers(search_params, 200, data, normalized_results, started)
+            if logger.isEnabledFor(logging.DEBUG) and sample_payload():
+                logger.debug("Amadeus flight offers payload: data=%s", Truncated(data))
+            return normalized_results
+        except AmadeusHTTPError as error:
+            logger.error("Amadeus flight search failed: status=%s description=%s params=%s body=%s",
+                         error.status_code, error.description, search_params, Truncated(error.body))
+            self._check_quota(error.status_code)
+            return {
+                'error': True,
+                'message': f"Flight search failed: {error.description}",
+                'flights': [],
+                'api_error': {
+                    'status_code': error.status_code,
+                    'body': error.body,
+                    'description': error.description
+                }
+            }
+        except Exception:
+            logger.exception("Unexpected error in Amadeus flight search: params=%s", search_params)
+            return {
+                'error': True,
+                'message': "An unexpected error occurred during flight search",
+                'flights': []
+            }
+
+    async def aget_airport_suggestions(self, keyword):
+        """Async version of get_airport_suggestions()"""
+        try:
+            cache_key = self._airport_cache_key(keyword)
+            cached_result = await cache.aget(cache_key)
+            if cached_result:
+                return cached_result
+
+            data = await self.async_client.get(
+                '/v1/reference-data/locations', keyword=keyword, subType='AIRPORT,CITY'
+            )
+            suggestions = self._location_suggestions(data)
+            await cache.aset(cache_key, suggestions, 3600)
+            return suggestions
+
+        except AmadeusHTTPError as error:
+            logger.error(f"Airport search error: {error}")
+            return []
+        except Exception as e:
+            logger.error(f"Unexpected error in airport search: {e}")
+            return []
+
+    async def aget_flight_price_analysis(self, origin_code, destination_code, departure_date):
+        """Async version of get_flight_price_analysis()"""
+        try:
+            data = await self.async_client.get(
+                '/v1/analytics/itinerary-price-metrics',
+                originIataCode=origin_code,
+                destinationIataCode=destination_code,
+                departureDate=departure_date
+            )
+            return self._price_metrics(data)
+
+        except AmadeusHTTPError as error:
+            logger.error(f"Price analysis error: {error}")
+            return {'error': True, 'message': str(error)}
+        except Exception as e:
+            logger.error(f"Unexpected error in price analysis: {e}")
+            return {'error': True, 'message': str(e)}
+
+    def _airport_cache_key(self, keyword):
+        # Cache key for airport suggestions (URL safe)
+        return f"amadeus_airports_{keyword.lower().replace(' ', '_')}"
+
+    def _location_suggestions(self, locations):
+        """Format Locations API records as airport suggestions"""
+        suggestions = []
+        for location in locations:
+            suggestion = {
+                'code': location.get('iataCode', ''),
+                'name': location.get('name', ''),
+                'city': location.get('address', {}).get('cityName', ''),
+                'country': location.get('address', {}).get('countryName', ''),
+                'type': location.get('subType', '')
+            }
+            suggestions.append(suggestion)
+        return suggestions
+
+    def _price_metrics(self, data):
+        return {
+            'error': False,
+            'currency': data[0].get('currencyCode', 'USD'),
+            'price_metrics': data[0].get('priceMetrics', [])
+        }
+
     def _normalize_flight_results(self, amadeus_data):
         """
         Normalize Amadeus flight data to match our application format
@@ -239,52 +449,14 @@ class AmadeusService:
             amadeus_data (list): Raw Amadeus flight data
             
         Returns:
-            dict: Normalized flight results
+            dict: Normalized flight results; `flights` is an OfferTable
         """
-        normalized_flights = []
-        
         try:
-            for offer in amadeus_data:
-                for itinerary in offer.get('itineraries', []):
-                    for segment in itinerary.get('segments', []):
-                        # Extract flight details
-                        flight_data = {
-                            'offer_id': offer.get('id'),
-                            'amadeus_id': segment.get('id'),
-                            'airline_code': segment.get('carrierCode'),
-                            'airline_name': self._get_airline_name(segment.get('carrierCode')),
-                            'flight_number': segment.get('number'),
-                            'aircraft': segment.get('aircraft', {}).get('code', ''),
-                            
-                            # Origin details
-                            'origin_code': segment.get('departure', {}).get('iataCode'),
-                            'origin_terminal': segment.get('departure', {}).get('terminal'),
-                            'departure_time': segment.get('departure', {}).get('at'),
-                            
-                            # Destination details
-                            'destination_code': segment.get('arrival', {}).get('iataCode'),
-                            'destination_terminal': segment.get('arrival', {}).get('terminal'),
-                            'arrival_time': segment.get('arrival', {}).get('at'),
-                            
-                            # Duration
-                            'duration': segment.get('duration'),
-                            
-                            # Pricing from the offer
-                            'price': self._extract_pricing(offer.get('price', {})),
-                            'available_seats': segment.get('numberOfBookableSeats', 0),
-                            'booking_class': segment.get('bookingClass'),
-                            
-                            # Additional info
-                            'stops': len(itinerary.get('segments', [])) - 1,
-                            'is_direct': len(itinerary.get('segments', [])) == 1
-                        }
-                        
-                        normalized_flights.append(flight_data)
-            
+            flights = OfferTable.from_amadeus(amadeus_data, self._get_airline_name)
             return {
                 'error': False,
-                'flights': normalized_flights,
-                'count': len(normalized_flights)
+                'flights': flights,
+                'count': len(flights)
             }
             
         except Exception as e:
@@ -295,34 +467,9 @@ class AmadeusService:
                 'flights': []
             }
     
-    def _extract_pricing(self, price_data):
-        """Extract and normalize pricing information"""
-        return {
-            'total': float(price_data.get('total', 0)),
-            'currency': price_data.get('currency', 'USD'),
-            'base': float(price_data.get('base', 0)),
-            'fees': price_data.get('fees', []),
-            'taxes': price_data.get('taxes', [])
-        }
-    
     def _get_airline_name(self, airline_code):
-        """Get airline name from code (could be cached or from a lookup table)"""
-        # This is a simplified version - in production you'd want a more comprehensive lookup
-        airline_names = {
-            'AA': 'American Airlines',
-            'DL': 'Delta Air Lines', 
-            'UA': 'United Airlines',
-            'SW': 'Southwest Airlines',
-            'BA': 'British Airways',
-            'LH': 'Lufthansa',
-            'AF': 'Air France',
-            'KL': 'KLM',
-            'TK': 'Turkish Airlines',
-            'EK': 'Emirates',
-            'QR': 'Qatar Airways',
-            'SQ': 'Singapore Airlines'
-        }
-        return airline_names.get(airline_code, airline_code)
+        """Get airline name from code via the shared airline registry"""
+        return get_airline_registry().name(airline_code)
     
     def validate_booking_offer(self, offer_id):
         """
@@ -354,5 +501,5 @@ class AmadeusService:
             }
 
 
-# Global instance
+# Global instance; cheap to create, the client is built on first use
 amadeus_service = AmadeusService()
@@ -1,5 +1,35 @@
+import logging
+
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
+
+logger = logging.getLogger(__name__)
+
+
+def check_bootstrap_once(sender, **kwargs):
+    """Warn about unseeded tables on the first request, then stop listening."""
+    request_started.disconnect(check_bootstrap_once, dispatch_uid='flight_bootstrap_check')
+    from .utils import bootstrap_status
+    try:
+        missing = bootstrap_status()
+    except Exception as e:
+        logger.warning("Bootstrap check failed: %s", e)
+        return
+    if missing:
+        logger.warning(
+            "Database is missing %s; run `python manage.py bootstrap` to seed it.",
+            ", ".join(missing)
+        )
 
 
 class FlightConfig(AppConfig):
     name = 'flight'
+
+    def ready(self):
+        from . import airports, instances, inventory, route_calendar, timetable  # noqa: F401  (registers invalidation receivers)
+
+        # Seeding lives in `manage.py bootstrap`; workers only run an optional
+        # EXISTS-based check, once, on their first request.
+        if getattr(settings, 'FLIGHT_BOOTSTRAP_CHECK', False):
+            request_started.connect(check_bootstrap_once, dispatch_uid='flight_bootstrap_check')
@@ -0,0 +1,63 @@
+"""
+Bookings page: a user's tickets, newest first, a page at a time.
+
+One query fetches a page with each ticket's flight, origin and destination
+joined in and its passenger count annotated, so rendering a page costs the
+same number of queries however many tickets the user holds. Pages are cut
+with a keyset on (booking_date, id), served from the ticket user index:
+the cursor carries the last ticket's booking date and id and the next page
+starts right after it, without an OFFSET scan over the pages before it.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Count, Q
+
+from .models import Ticket
+
+PAGE_SIZE = 20
+
+
+class InvalidCursor(ValueError):
+    """A bookings page cursor that does not decode to a ticket position."""
+
+
+def encode_cursor(ticket):
+    payload = json.dumps([ticket.booking_date.isoformat(), ticket.id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(booking date, id) of the last ticket on the previous page"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        booking_date, ticket_id = json.loads(base64.urlsafe_b64decode(padded))
+        booking_date = datetime.fromisoformat(booking_date)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(ticket_id, int):
+        raise InvalidCursor("Invalid cursor")
+    return booking_date, ticket_id
+
+
+def user_tickets(user):
+    """A user's tickets, newest first, with what the bookings page shows of each"""
+    return (Ticket.objects.filter(user=user)
+            .select_related('flight__origin', 'flight__destination')
+            .annotate(passenger_count=Count('passengers'))
+            .order_by('-booking_date', '-id'))
+
+
+def booking_page(user, cursor=None, limit=PAGE_SIZE):
+    """(tickets, cursor of the next page or None)"""
+    tickets = user_tickets(user)
+    if cursor:
+        booking_date, ticket_id = decode_cursor(cursor)
+        tickets = tickets.filter(Q(booking_date__lt=booking_date) | Q(booking_date=booking_date, id__lt=ticket_id))
+    tickets = list(tickets[:limit + 1])
+    if len(tickets) > limit:
+        return tickets[:limit], encode_cursor(tickets[limit - 1])
+    return tickets, None
@@ -0,0 +1,190 @@
+"""
+One- and two-stop connection search over the local weekly schedule.
+
+The timetable is turned into a time-dependent graph once per timetable
+version: every flight becomes a leg with absolute departure/arrival minutes
+within the week, and legs are kept per route sorted by departure so the
+onward flights inside a layover window are found by bisection. The week is
+laid out twice so windows that run past Sunday night wrap into Monday.
+
+A query expands the first legs leaving the origin on the requested day,
+follows only routes that can still reach the destination, and keeps the
+best itineraries by total fare or total duration in a bounded heap.
+"""
+
+import bisect
+import heapq
+import itertools
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+
+from .timetable import get_timetable
+
+DAY_MINUTES = 24 * 60
+WEEK_MINUTES = 7 * DAY_MINUTES
+
+
+def minutes(value):
+    return value.hour * 60 + value.minute
+
+
+class Leg:
+    """One scheduled departure placed on the weekly clock."""
+    __slots__ = ('flight', 'depart', 'arrive')
+
+    def __init__(self, flight, depart, arrive):
+        self.flight = flight
+        self.depart = depart
+        self.arrive = arrive
+
+
+class Itinerary:
+    """A chain of legs; `day_offset` of each leg is relative to the search date."""
+    __slots__ = ('legs', 'seat', 'total_fare', 'total_minutes')
+
+    def __init__(self, legs, seat):
+        self.legs = legs
+        self.seat = seat
+        self.total_fare = sum(leg.flight.fare(seat) for leg in legs)
+        self.total_minutes = legs[-1].arrive - legs[0].depart
+
+    @property
+    def stops(self):
+        return len(self.legs) - 1
+
+    @property
+    def via(self):
+        return [leg.flight.origin for leg in self.legs[1:]]
+
+    @property
+    def duration(self):
+        return timedelta(minutes=self.total_minutes)
+
+    def segments(self):
+        """(flight, day_offset) pairs for booking each leg on the right date"""
+        start_day = self.legs[0].depart // DAY_MINUTES
+        return [(leg.flight, leg.depart // DAY_MINUTES - start_day) for leg in self.legs]
+
+    def as_dict(self):
+        return {
+            'stops': self.stops,
+            'total_fare': self.total_fare,
+            'duration_minutes': self.total_minutes,
+            'legs': [{
+                'flight_id': flight.id,
+                'airline': flight.airline,
+                'plane': flight.plane,
+                'origin': flight.origin.code,
+                'destination': flight.destination.code,
+                'depart_time': flight.depart_time.strftime('%H:%M'),
+                'arrival_time': flight.arrival_time.strftime('%H:%M'),
+                'day_offset': offset,
+                'fare': flight.fare(self.seat),
+            } for flight, offset in self.segments()],
+        }
+
+
+class ConnectionGraph:
+    """Per-seat-class route graph over two consecutive weeks of legs."""
+
+    def __init__(self, timetable, seat):
+        self.seat = seat
+        routes = {}
+        for (origin, destination, weekday, key_seat), flights in timetable.routes.items():
+            if key_seat != seat:
+                continue
+            legs = routes.setdefault((origin, destination), [])
+            for flight in flights:
+                duration = int(flight.duration.total_seconds() // 60) if flight.duration else 0
+                for week in (0, WEEK_MINUTES):
+                    depart = week + weekday * DAY_MINUTES + minutes(flight.depart_time)
+                    legs.append(Leg(flight, depart, depart + duration))
+
+        self.routes = {}
+        self.outbound = {}
+        self.inbound = {}
+        for (origin, destination), legs in routes.items():
+            legs.sort(key=lambda leg: leg.depart)
+            self.routes[(origin, destination)] = ([leg.depart for leg in legs], legs)
+            self.outbound.setdefault(origin, set()).add(destination)
+            self.inbound.setdefault(destination, set()).add(origin)
+
+    def departures(self, origin, destination, earliest, latest):
+        """Legs on a route departing within [earliest, latest]"""
+        route = self.routes.get((origin, destination))
+        if route is None:
+            return ()
+        departs, legs = route
+        start = bisect.bisect_left(departs, earliest)
+        end = bisect.bisect_right(departs, latest, lo=start)
+        return legs[start:end]
+
+    def search(self, origin, destination, weekday, max_stops=2, sort='fare', limit=20,
+               min_connection=None, max_layover=None):
+        """Best connecting itineraries leaving `origin` on `weekday` (0 = Monday)"""
+        if min_connection is None:
+            min_connection = getattr(settings, 'FLIGHT_MIN_CONNECTION_MINUTES', 60)
+        if max_layover is None:
+            max_layover = getattr(settings, 'FLIGHT_MAX_LAYOVER_MINUTES', 12 * 60)
+        origin, destination = origin.upper(), destination.upper()
+        reaches_destination = self.inbound.get(destination, set())
+        if not reaches_destination or origin not in self.outbound:
+            return []
+
+        score = (lambda itinerary: itinerary.total_minutes) if sort == 'duration' else \
+            (lambda itinerary: itinerary.total_fare)
+        heap = []
+        counter = itertools.count()
+
+        def offer(legs):
+            itinerary = Itinerary(legs, self.seat)
+            entry = (-score(itinerary), next(counter), itinerary)
+            if len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif entry[0] > heap[0][0]:
+                heapq.heapreplace(heap, entry)
+
+        def onward(leg, hub):
+            return self.departures(leg.flight.destination.code, hub,
+                                   leg.arrive + min_connection, leg.arrive + max_layover)
+
+        day_start = weekday * DAY_MINUTES
+        for first_hub in self.outbound[origin] - {origin, destination}:
+            for first in self.departures(origin, first_hub, day_start, day_start + DAY_MINUTES - 1):
+                if first_hub in reaches_destination:
+                    for last in onward(first, destination):
+                        offer((first, last))
+                if max_stops < 2:
+                    continue
+                for second_hub in (self.outbound.get(first_hub, set()) & reaches_destination) - {origin, first_hub}:
+                    for second in onward(first, second_hub):
+                        for last in onward(second, destination):
+                            offer((first, second, last))
+
+        return [entry[2] for entry in sorted(heap, key=lambda entry: (-entry[0], entry[1]))]
+
+
+_graphs = {}
+_lock = threading.Lock()
+
+
+def get_connection_graph(seat):
+    """Connection graph for a seat class, rebuilt whenever the timetable is"""
+    timetable = get_timetable()
+    seat = seat.lower()
+    cached = _graphs.get(seat)
+    if cached is not None and cached[0] is timetable:
+        return cached[1]
+    with _lock:
+        cached = _graphs.get(seat)
+        if cached is None or cached[0] is not timetable:
+            cached = (timetable, ConnectionGraph(timetable, seat))
+            _graphs[seat] = cached
+        return cached[1]
+
+
+def find_connections(origin_code, destination_code, weekday, seat, **options):
+    """Connecting itineraries for a route and day; see ConnectionGraph.search"""
+    return get_connection_graph(seat).search(origin_code, destination_code, weekday, **options)
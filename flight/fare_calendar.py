@@ -0,0 +1,95 @@
+"""
+Flexible-date fare calendar over the weekly schedule.
+
+The local schedule repeats every week, so the cheapest fare on any date is
+the cheapest fare of its weekday. A route's seven weekday minimums come from
+the in-memory timetable or, when search legs are planned from the database,
+from its RouteCalendar row; both directions of a round trip are fetched in
+one query and cached per route until the calendar changes. A ±N-day window
+or a departure x return matrix is then filled in without further lookups.
+"""
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import RouteCalendar
+from .planner import use_timetable
+from .route_calendar import calendar_version
+from .timetable import get_timetable
+
+MAX_WINDOW_DAYS = 7
+CACHE_TIMEOUT = 60 * 60
+
+
+def fares_from_timetable(routes, seat):
+    timetable = get_timetable()
+    weekly = {}
+    for origin, destination in routes:
+        fares = []
+        for day in range(7):
+            flights = timetable.flights(origin, destination, day, seat)
+            fares.append(flights[0].fare(seat) if flights else None)
+        weekly[(origin, destination)] = fares
+    return weekly
+
+
+def fares_from_calendar(routes, seat):
+    key = f"fare_calendar:{calendar_version()}:{seat}:" + ','.join(f"{o}-{d}" for o, d in routes)
+    weekly = cache.get(key)
+    if weekly is None:
+        match = Q()
+        for origin, destination in routes:
+            match |= Q(origin_code=origin, destination_code=destination)
+        weekly = {route: [None] * 7 for route in routes}
+        for origin, destination, min_fares in RouteCalendar.objects.filter(match, seat_class=seat).values_list(
+                'origin_code', 'destination_code', 'min_fares'):
+            weekly[(origin, destination)] = min_fares
+        cache.set(key, weekly, CACHE_TIMEOUT)
+    return weekly
+
+
+def weekly_fares(routes, seat):
+    """{(origin code, destination code): cheapest fare per weekday, Monday first}"""
+    routes = [(origin.upper(), destination.upper()) for origin, destination in routes]
+    seat = seat.lower()
+    if use_timetable():
+        return fares_from_timetable(routes, seat)
+    return fares_from_calendar(routes, seat)
+
+
+def window(center, days, earliest=None):
+    """Dates within `days` of `center`, skipping any before `earliest`"""
+    dates = [center + timedelta(days=offset) for offset in range(-days, days + 1)]
+    return [date for date in dates if earliest is None or date >= earliest]
+
+
+def fare_calendar(origin, destination, seat, depart_date, return_date=None, days=3, today=None):
+    """
+    Cheapest local fare per date around `depart_date` and, for round trips,
+    the combined fare for every departure x return date pair (None where a
+    leg does not operate or the return would precede the departure).
+    """
+    days = max(0, min(days, MAX_WINDOW_DAYS))
+    outbound_route = (origin.upper(), destination.upper())
+    return_route = (destination.upper(), origin.upper())
+    weekly = weekly_fares([outbound_route, return_route] if return_date else [outbound_route], seat)
+
+    departures = window(depart_date, days, today)
+    outbound = [weekly[outbound_route][date.weekday()] for date in departures]
+    calendar = {
+        'departures': [date.isoformat() for date in departures],
+        'outbound': outbound,
+    }
+    if return_date:
+        returns = window(return_date, days, today)
+        inbound = [weekly[return_route][date.weekday()] for date in returns]
+        calendar['returns'] = [date.isoformat() for date in returns]
+        calendar['inbound'] = inbound
+        calendar['matrix'] = [
+            [out_fare + in_fare if out_fare is not None and in_fare is not None and back >= out else None
+             for back, in_fare in zip(returns, inbound)]
+            for out, out_fare in zip(departures, outbound)
+        ]
+    return calendar
@@ -0,0 +1,145 @@
+"""
+Dated flight instances: the weekly schedule expanded into concrete
+departures for a rolling horizon.
+
+rebuild_flight_instances() replaces every instance with the departures from
+today through FLIGHT_INSTANCE_DAYS ahead, from one scan of the Flight
+table. Run it daily
+(`manage.py generate_flight_instances`) to roll the horizon forward; bulk
+schedule loads rebuild it too, while a schedule sync or a single saved
+Flight refreshes only the departures of the flights it changed. Dates inside the materialized window (read from the
+table and cached for HORIZON_CACHE_TIMEOUT, so a rebuild in another
+process is picked up) are searched with a range scan of FlightInstance's
+route index; dates outside it fall back to the weekly schedule.
+"""
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Min
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .inventory import DEFAULT_CAPACITY
+from .models import Flight, FlightInstance, SEAT_CLASSES, day_bit
+
+HORIZON_CACHE_KEY = 'flight_instance_horizon'
+HORIZON_CACHE_TIMEOUT = 60 * 60
+FLIGHT_FIELDS = ('id', 'origin_id', 'destination_id', 'depart_time', 'duration', 'arrival_time',
+                 'depart_days', 'economy_fare', 'business_fare', 'first_fare')
+
+
+def horizon_days():
+    return getattr(settings, 'FLIGHT_INSTANCE_DAYS', 60)
+
+
+def day_start(day):
+    """Aware midnight starting `day` in the current time zone"""
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def expand(flights, start, days):
+    """FlightInstances for FLIGHT_FIELDS tuples on every date they operate in [start, start + days)"""
+    capacity = getattr(settings, 'FLIGHT_SEAT_CAPACITY', DEFAULT_CAPACITY)
+    by_weekday = [[] for _ in range(7)]
+    for flight in flights:
+        for day in range(7):
+            if flight[6] & day_bit(day):
+                by_weekday[day].append(flight)
+
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        for (flight_id, origin_id, destination_id, depart_time, duration, arrival_time,
+             _, *fares) in by_weekday[day.weekday()]:
+            departure = timezone.make_aware(datetime.combine(day, depart_time))
+            if duration is not None:
+                arrival = departure + duration
+            else:
+                arrival = timezone.make_aware(datetime.combine(day, arrival_time))
+                if arrival <= departure:
+                    arrival += timedelta(days=1)
+            # Blank fares are loaded as 0.0: the class is not sold on that flight
+            seats = {f'{seat}_seats': capacity[seat] if fare else 0
+                     for seat, fare in zip(SEAT_CLASSES, fares)}
+            yield FlightInstance(
+                flight_id=flight_id, origin_id=origin_id, destination_id=destination_id,
+                departure=departure, arrival=arrival,
+                economy_fare=fares[0], business_fare=fares[1], first_fare=fares[2], **seats,
+            )
+
+
+def rebuild_flight_instances(days=None, today=None, batch_size=1000):
+    """Replace all instances with the departures of the next `days` days"""
+    days = horizon_days() if days is None else days
+    today = today or timezone.localdate()
+    flights = Flight.objects.values_list(*FLIGHT_FIELDS).iterator()
+    count = 0
+    with transaction.atomic():
+        FlightInstance.objects.all().delete()
+        batch = []
+        for instance in expand(flights, today, days):
+            batch.append(instance)
+            if len(batch) >= batch_size:
+                FlightInstance.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        FlightInstance.objects.bulk_create(batch)
+        count += len(batch)
+    window = (today, today + timedelta(days=days)) if count else ()
+    transaction.on_commit(lambda: cache.set(HORIZON_CACHE_KEY, window, HORIZON_CACHE_TIMEOUT))
+    return count
+
+
+def horizon():
+    """(first date, end date exclusive) of the materialized window, or None"""
+    window = cache.get(HORIZON_CACHE_KEY)
+    if window is None:
+        bounds = FlightInstance.objects.aggregate(first=Min('departure'), last=Max('departure'))
+        window = ()
+        if bounds['first'] is not None:
+            window = (timezone.localdate(bounds['first']), timezone.localdate(bounds['last']) + timedelta(days=1))
+        cache.set(HORIZON_CACHE_KEY, window, HORIZON_CACHE_TIMEOUT)
+    return window or None
+
+
+def in_horizon(day):
+    window = horizon()
+    return window is not None and window[0] <= day < window[1]
+
+
+def refresh_flights(flight_ids, batch_size=1000):
+    """Regenerate the departures of `flight_ids` inside the current window"""
+    window = horizon()
+    if window is None:
+        return
+    start, end = window
+    flight_ids = sorted(set(flight_ids))
+    for first in range(0, len(flight_ids), batch_size):
+        batch = flight_ids[first:first + batch_size]
+        flights = Flight.objects.filter(id__in=batch).values_list(*FLIGHT_FIELDS)
+        with transaction.atomic():
+            FlightInstance.objects.filter(flight_id__in=batch).delete()
+            FlightInstance.objects.bulk_create(expand(flights, start, (end - start).days), batch_size=batch_size)
+
+
+def refresh_flight(flight_id):
+    """Regenerate one flight's departures inside the current window"""
+    refresh_flights([flight_id])
+
+
+def instances_on(origin_code, destination_code, day, seat):
+    """Departures on a route on `day` with seats left in a class, cheapest first, with their flights"""
+    return (FlightInstance.objects.route(origin_code, destination_code, seat)
+            .departing(day_start(day), day_start(day + timedelta(days=1)))
+            .with_seats_left(day, seat)
+            .select_related('flight__origin', 'flight__destination')
+            .order_by(f'{seat.lower()}_fare', 'flight_id'))
+
+
+@receiver(post_save, sender=Flight)
+def flight_changed(sender, instance, **kwargs):
+    flight_id = instance.id
+    transaction.on_commit(lambda: refresh_flight(flight_id))
@@ -0,0 +1,141 @@
+"""
+Seat inventory per flight, date and seat class.
+
+Seats are taken with a single conditional statement,
+
+    UPDATE flight_seatinventory SET available = available - n
+    WHERE id = ... AND available >= n
+
+so concurrent bookers never read-modify-write a stale count: the database
+applies the decrements one at a time and the one that would oversell
+matches no row. A booking holds its seats from the moment its tickets are
+written (Ticket.seats_held); cancelling it, leaving it unpaid past the
+hold period or deleting it gives them back. Releases claim the ticket's
+seats with a conditional UPDATE of their own, so a ticket is never
+released twice.
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Least
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import FlightInstance, SeatInventory, Ticket
+
+DEFAULT_CAPACITY = {'economy': 150, 'business': 30, 'first': 8}
+
+
+class SoldOut(Exception):
+    """Fewer seats are left than a booking asks for."""
+
+
+def capacity(seat_class):
+    """Seats a flight sells in a class, from FLIGHT_SEAT_CAPACITY"""
+    return getattr(settings, 'FLIGHT_SEAT_CAPACITY', DEFAULT_CAPACITY)[seat_class.lower()]
+
+
+def hold_minutes():
+    return getattr(settings, 'FLIGHT_SEAT_HOLD_MINUTES', 15)
+
+
+def inventory_row(flight_id, flight_date, seat_class):
+    """
+    SeatInventory id for a flight, date and class, creating it with the
+    seats of the dated FlightInstance, or FLIGHT_SEAT_CAPACITY without one.
+    """
+    seat_class = seat_class.lower()
+    key = {'flight_id': flight_id, 'flight_date': flight_date, 'seat_class': seat_class}
+    row_id = SeatInventory.objects.filter(**key).values_list('id', flat=True).first()
+    if row_id is not None:
+        return row_id
+    start = timezone.make_aware(datetime.combine(flight_date, datetime.min.time()))
+    seats = FlightInstance.objects.filter(flight_id=flight_id).departing(start, start + timedelta(days=1)) \
+        .values_list(f'{seat_class}_seats', flat=True).first()
+    if seats is None:
+        seats = capacity(seat_class)
+    SeatInventory.objects.bulk_create([SeatInventory(capacity=seats, available=seats, **key)], ignore_conflicts=True)
+    return SeatInventory.objects.filter(**key).values_list('id', flat=True).get()
+
+
+def take_seats(row_id, seats):
+    """Conditionally decrement one inventory row; True if the seats were taken"""
+    return SeatInventory.objects.filter(id=row_id, available__gte=seats).update(
+        available=F('available') - seats) == 1
+
+
+def reserve(flight_id, flight_date, seat_class, seats):
+    """
+    Take `seats` seats or raise SoldOut. Holds that have expired on this
+    flight are released first when the row looks full.
+    """
+    row_id = inventory_row(flight_id, flight_date, seat_class)
+    if take_seats(row_id, seats):
+        return
+    if expire_holds(flight_id=flight_id, flight_date=flight_date, seat_class=seat_class.lower()) \
+            and take_seats(row_id, seats):
+        return
+    raise SoldOut(f"Fewer than {seats} {seat_class.lower()} seats left on this flight")
+
+
+def release(flight_id, flight_date, seat_class, seats):
+    SeatInventory.objects.filter(flight_id=flight_id, flight_date=flight_date, seat_class=seat_class).update(
+        available=Least(F('available') + seats, F('capacity')))
+
+
+def release_tickets(tickets, status='CANCELLED', pending_only=False):
+    """
+    Give back the seats `tickets` hold and set their status, in one
+    transaction. Seats already released by a concurrent cancel or expiry are
+    not released again; with `pending_only`, tickets paid for in the meantime
+    are left alone. Returns the number of seats released.
+    """
+    released = Counter()
+    with transaction.atomic():
+        for ticket in tickets:
+            match = Ticket.objects.filter(id=ticket.id)
+            if pending_only:
+                match = match.filter(status='PENDING')
+            if ticket.seats_held and match.filter(seats_held=ticket.seats_held).update(seats_held=0, status=status):
+                released[(ticket.flight_id, ticket.flight_ddate, ticket.seat_class)] += ticket.seats_held
+            elif pending_only or not match.update(status=status):
+                continue
+            ticket.seats_held, ticket.status = 0, status
+        for (flight_id, flight_date, seat_class), seats in released.items():
+            release(flight_id, flight_date, seat_class, seats)
+    return sum(released.values())
+
+
+def hold_cutoff(now=None):
+    return (now or timezone.now()) - timedelta(minutes=hold_minutes())
+
+
+def expired_holds(now=None):
+    """Unpaid tickets still holding seats past the hold period"""
+    cutoff = hold_cutoff(now)
+    return Ticket.objects.filter(status='PENDING', seats_held__gt=0, booking_date__lt=cutoff)
+
+
+def hold_expired(ticket, now=None):
+    """Whether an unpaid ticket has outlived its seat hold"""
+    cutoff = hold_cutoff(now)
+    return ticket.status == 'PENDING' and ticket.seats_held > 0 and ticket.booking_date < cutoff
+
+
+def expire_holds(now=None, **route):
+    """Cancel expired holds, optionally only on one flight/date/class; returns seats released"""
+    route = {('flight_ddate' if name == 'flight_date' else name): value for name, value in route.items()}
+    tickets = expired_holds(now).filter(**route).only('id', 'flight_id', 'flight_ddate', 'seat_class', 'seats_held')
+    return release_tickets(list(tickets), pending_only=True)
+
+
+@receiver(post_delete, sender=Ticket)
+def ticket_deleted(sender, instance, **kwargs):
+    # Deleting a ticket (admin, or a cascade from its user or flight) gives its seats back
+    if instance.seats_held:
+        release(instance.flight_id, instance.flight_ddate, instance.seat_class, instance.seats_held)
@@ -0,0 +1,91 @@
+"""
+Django management command to compare sequential and batched flexible-date Amadeus searches
+Run with: python manage.py bench_amadeus_dates [--days 3] [--latency 0.8]
+
+A stub SDK client sleeps for `--latency` seconds per call and returns a
+synthetic Flight Offers Search payload. The same ±days window is searched
+one date after another, then with AmadeusService.search_dates(), both with
+the offer cache disabled; the batch is then repeated with the cache on to
+show per-date reuse. Calls still go through the request quota.
+"""
+
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from flight.amadeus_service import AmadeusService
+from flight.sample_offers import sample_offers
+
+
+class StubResponse:
+    status_code = 200
+    headers = {'Content-Type': 'application/vnd.amadeus+json'}
+
+    def __init__(self, data):
+        self.data = data
+
+
+class Command(BaseCommand):
+    help = 'Compare sequential and batched Amadeus flight searches over a date window'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=3,
+            help='Dates on each side of the centre date (default: 3)'
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.8,
+            help='Simulated upstream latency in seconds (default: 0.8)'
+        )
+
+    def handle(self, *args, **options):
+        latency = options['latency']
+
+        def get(**params):
+            time.sleep(latency)
+            return StubResponse(sample_offers(50, params['originLocationCode'], params['destinationLocationCode'],
+                                              params['departureDate'], return_date=None))
+
+        service = AmadeusService()
+        service._client = SimpleNamespace(shopping=SimpleNamespace(
+            flight_offers_search=SimpleNamespace(get=get)
+        ))
+        centre = date.today() + timedelta(days=30)
+        searches = [('DEL', 'CDG', (centre + timedelta(days=offset)).isoformat(), None)
+                    for offset in range(-options['days'], options['days'] + 1)]
+
+        def sequential():
+            for search in searches:
+                service.search_flights(*search)
+
+        def batched():
+            for search, result in service.search_dates(searches):
+                arrivals.append(time.perf_counter() - started)
+
+        timings = {}
+        arrivals = []
+        with override_settings(AMADEUS_OFFER_CACHE_TTL=0):
+            for name, run in (('sequential', sequential), ('batched', batched)):
+                started = time.perf_counter()
+                run()
+                timings[name] = time.perf_counter() - started
+        first_result = arrivals[0]
+
+        # Fill the offer cache, then time a batch that is answered from it
+        list(service.search_dates(searches))
+        started = time.perf_counter()
+        list(service.search_dates(searches))
+        timings['batched, cached'] = time.perf_counter() - started
+
+        self.stdout.write(f"{len(searches)} dates, {latency * 1000:.0f} ms simulated latency")
+        for name, seconds in timings.items():
+            self.stdout.write(f"  {name:<16}: {seconds * 1000:7.0f} ms ({seconds / latency:.1f}x latency)")
+        self.stdout.write(f"  first batched result after {first_result * 1000:.0f} ms")
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,116 @@
+"""
+Django management command to measure the logging overhead of Amadeus flight searches
+Run with: python manage.py bench_amadeus_logging [--offers 250] [--calls 200]
+
+A stub SDK client returns a synthetic Flight Offers Search payload, so the
+timings cover normalization plus logging without any network I/O. Each
+logging level is timed against a baseline with logging disabled: the
+baseline and the levels take turns within every round, in a rotating
+order, and each reports its best round. Garbage is collected between
+timed runs rather than during them, and records are formatted into an
+in-memory stream instead of the console.
+"""
+
+import gc
+import io
+import logging
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from flight import amadeus_service as service_module
+from flight.amadeus_http import RequestQuota
+from flight.amadeus_service import AmadeusService
+from flight.sample_offers import sample_offers
+
+LEVELS = ('WARNING', 'INFO', 'DEBUG')
+DISABLED = 'logging disabled'
+ROUNDS = 10
+
+
+class StubResponse:
+    status_code = 200
+    headers = {'Content-Type': 'application/vnd.amadeus+json'}
+
+    def __init__(self, data):
+        self.data = data
+
+
+class Command(BaseCommand):
+    help = 'Measure per-call logging overhead of AmadeusService flight searches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--offers',
+            type=int,
+            default=250,
+            help='Offers in the synthetic response (default: 250)'
+        )
+        parser.add_argument(
+            '--calls',
+            type=int,
+            default=200,
+            help='Searches to time per logging level (default: 200)'
+        )
+
+    def handle(self, *args, **options):
+        response = StubResponse(sample_offers(options['offers']))
+        service = AmadeusService()
+        service._client = SimpleNamespace(shopping=SimpleNamespace(
+            flight_offers_search=SimpleNamespace(get=lambda **params: response)
+        ))
+        # Time the service itself, not the spacing the request quota adds
+        service.connection.quota = RequestQuota(0)
+        params = service._flight_search_params('DEL', 'CDG', '2026-11-02', '2026-11-09', 1, 'ECONOMY', 250)
+
+        logger = service_module.logger
+        sink = io.StringIO()
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        saved = (logger.level, logger.propagate, logger.handlers)
+        logger.handlers, logger.propagate = [handler], False
+
+        calls = options['calls'] // ROUNDS or 1
+        configs = [(DISABLED, None)] + [(level, level) for level in LEVELS]
+        best = dict.fromkeys(name for name, _ in configs)
+        logged = dict.fromkeys((name for name, _ in configs), 0)
+
+        def per_call():
+            started = time.perf_counter()
+            for _ in range(calls):
+                service._fetch_flight_offers(params)
+            return (time.perf_counter() - started) / calls
+
+        try:
+            service._fetch_flight_offers(params)
+            for round_no in range(ROUNDS):
+                # Rotate the order, so no configuration always runs first in a round
+                shift = round_no % len(configs)
+                for name, level in configs[shift:] + configs[:shift]:
+                    if level is None:
+                        logging.disable(logging.CRITICAL)
+                    else:
+                        logging.disable(logging.NOTSET)
+                        logger.setLevel(level)
+                    # Each search leaves cyclic offer tables behind; collect them outside the timed region
+                    gc.collect()
+                    written = sink.tell()
+                    seconds = per_call()
+                    logged[name] += sink.tell() - written
+                    best[name] = seconds if best[name] is None else min(best[name], seconds)
+        finally:
+            logging.disable(logging.NOTSET)
+            logger.level, logger.propagate, logger.handlers = saved
+
+        baseline = best[DISABLED]
+        self.stdout.write(f"{options['offers']} offers, {calls * ROUNDS} calls per level in {ROUNDS} interleaved rounds")
+        self.stdout.write(f"  {DISABLED:<16}: {baseline * 1e6:9.1f} us/call")
+        for level in LEVELS:
+            overhead = best[level] - baseline
+            self.stdout.write(
+                f"  {level:<16}: {best[level] * 1e6:9.1f} us/call "
+                f"(overhead {overhead * 1e6:+.1f} us, {overhead / baseline:+.2%}), "
+                f"{logged[level] / (calls * ROUNDS):.0f} bytes logged per call"
+            )
+        self.stdout.write(self.style.SUCCESS('Done'))
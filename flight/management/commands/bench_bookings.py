@@ -0,0 +1,144 @@
+"""
+Django management command to measure booking write throughput
+Run with: python manage.py bench_bookings [--bookings 200] [--passengers 9] [--one-way]
+
+Books the same round trip, 400 days out, repeatedly through the previous
+write path (one INSERT per passenger, an empty ticket INSERT, one M2M add
+per passenger and a final UPDATE, in autocommit mode) and through the
+transactional path `book` uses now, reporting bookings/sec and queries
+per booking for the configured database. Run it once per database backend
+(SQLite, PostgreSQL) to compare them. The transactional path reserves
+seats from inventory rows created for the run. Everything it creates, inventory
+included, is deleted afterwards.
+"""
+
+import secrets
+import time
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from capstone.utils import createtickets, parse_ticket_date
+from flight.constant import FEE
+from flight.models import Flight, Passenger, SeatInventory, Ticket, User
+
+# Largest PositiveSmallIntegerField value
+SEAT_LIMIT = 32767
+
+
+def legacy_booking(user, names, legs):
+    """The write pattern of book/createticket before they were batched"""
+    passengers = [Passenger.objects.create(first_name=first, last_name=last, gender='female')
+                  for first, last in names]
+    tickets = []
+    for flight, flight_date, seat_class in legs:
+        ticket = Ticket.objects.create()
+        ticket.user = user
+        ticket.ref_no = secrets.token_hex(3).upper()
+        for passenger in passengers:
+            ticket.passengers.add(passenger)
+        ticket.flight = flight
+        ticket.flight_ddate = parse_ticket_date(flight_date)
+        arrival = ticket.flight_ddate.replace(hour=flight.depart_time.hour,
+                                              minute=flight.depart_time.minute) + flight.duration
+        ticket.flight_adate = datetime(arrival.year, arrival.month, arrival.day)
+        ticket.flight_fare = flight.fare(seat_class) * len(passengers)
+        ticket.other_charges = FEE
+        ticket.total_fare = ticket.flight_fare + FEE
+        ticket.seat_class = seat_class.lower()
+        ticket.status = 'PENDING'
+        ticket.mobile = '+1 5550100'
+        ticket.email = 'bench@example.com'
+        ticket.save()
+        tickets.append(ticket)
+    return passengers, tickets
+
+
+def batched_booking(user, names, legs):
+    with transaction.atomic():
+        passengers = Passenger.objects.bulk_create(
+            [Passenger(first_name=first, last_name=last, gender='female') for first, last in names])
+        tickets = createtickets(user, passengers, legs, None, '1', 'bench@example.com', '5550100')
+    return passengers, tickets
+
+
+class Command(BaseCommand):
+    help = 'Measure bookings/sec of the legacy and transactional booking write paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bookings',
+            type=int,
+            default=200,
+            help='Bookings per write path (default: 200)'
+        )
+        parser.add_argument(
+            '--passengers',
+            type=int,
+            default=9,
+            help='Passengers per booking (default: 9)'
+        )
+        parser.add_argument(
+            '--one-way',
+            action='store_true',
+            help='Book a single leg instead of a round trip'
+        )
+
+    def handle(self, *args, **options):
+        flights = list(Flight.objects.filter(duration__isnull=False, economy_fare__gt=0)
+                       .select_related('origin', 'destination')[:2])
+        if len(flights) < 2:
+            raise CommandError('Load flights first: python manage.py bootstrap')
+        # Dates far enough out to hold no real bookings, each with its own inventory row
+        # sized for every booking the transactional path makes
+        first_date = date.today() + timedelta(days=400)
+        legs = [(flights[0], first_date, 'Economy')]
+        if not options['one_way']:
+            legs.append((flights[1], first_date + timedelta(days=7), 'Economy'))
+        seats = (options['bookings'] + 1) * options['passengers']
+        if seats > SEAT_LIMIT:
+            raise CommandError(f'At most {SEAT_LIMIT} seats per flight; use fewer bookings or passengers')
+        if SeatInventory.objects.filter(flight__in=flights, flight_date__in=[day for _, day, _ in legs]).exists():
+            raise CommandError('Seat inventory already exists for the benchmark flights and dates')
+        inventory = SeatInventory.objects.bulk_create([
+            SeatInventory(flight=flight, flight_date=day, seat_class='economy', capacity=seats, available=seats)
+            for flight, day, _ in legs
+        ])
+        legs = [(flight, day.strftime('%d-%m-%Y'), seat_class) for flight, day, seat_class in legs]
+        names = [(f'Bench{i}', 'Passenger') for i in range(options['passengers'])]
+        user, created_user = User.objects.get_or_create(username='bench-bookings')
+
+        self.stdout.write(
+            f"{connection.vendor}: {options['bookings']} bookings of {len(legs)} leg(s) "
+            f"x {options['passengers']} passengers"
+        )
+        created_passengers, created_tickets = [], []
+        try:
+            for name, book in (('legacy', legacy_booking), ('transactional', batched_booking)):
+                # The query log is a bounded deque; a full one would hide this booking's queries
+                connection.queries_log.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    passengers, tickets = book(user, names, legs)
+                created_passengers += passengers
+                created_tickets += tickets
+                per_booking = len(queries)
+
+                started = time.perf_counter()
+                for _ in range(options['bookings']):
+                    passengers, tickets = book(user, names, legs)
+                    created_passengers += passengers
+                    created_tickets += tickets
+                seconds = time.perf_counter() - started
+                self.stdout.write(
+                    f"  {name:<14}: {options['bookings'] / seconds:8.1f} bookings/sec, "
+                    f"{per_booking} queries per booking"
+                )
+        finally:
+            Ticket.objects.filter(id__in=[ticket.id for ticket in created_tickets]).delete()
+            Passenger.objects.filter(id__in=[passenger.id for passenger in created_passengers]).delete()
+            SeatInventory.objects.filter(id__in=[row.id for row in inventory]).delete()
+            if created_user:
+                user.delete()
+        self.stdout.write(self.style.SUCCESS('Done'))
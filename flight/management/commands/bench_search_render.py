@@ -0,0 +1,110 @@
+"""
+Django management command to measure search page render cost for Amadeus results
+Run with: python manage.py bench_search_render [--offers 250] [--runs 10]
+
+Renders flight/search.html for a synthetic Amadeus response twice: with
+the legacy per-segment dicts carrying ISO strings (parsed by the template
+filters on every row) and with the pre-parsed OfferTable rows. The page
+without any Amadeus rows is rendered as well and subtracted, so the
+reported figure is the cost per result row. The time the date/time
+filters alone take per row is reported separately, as is the difference
+between the variants for both.
+
+Pre-parsing only shrinks the filter share of a row: the rest of the
+per-row cost is Django's variable resolution, which is the same for both
+variants, so the whole-row difference stays within run-to-run noise.
+"""
+
+import gc
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.template.loader import get_template
+
+from flight.amadeus_service import AmadeusService
+from flight.models import Place
+from flight.sample_offers import sample_offers
+from flight.templatetags.custom_filters import format_duration, parse_iso_date, parse_iso_time
+
+
+class Command(BaseCommand):
+    help = 'Measure per-row template cost of Amadeus results on the search page'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--offers',
+            type=int,
+            default=250,
+            help='Offers in the synthetic response (default: 250)'
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=10,
+            help='Renders per variant; the best one is reported (default: 10)'
+        )
+
+    def handle(self, *args, **options):
+        template = get_template('flight/search.html')
+        table = AmadeusService()._normalize_flight_results(sample_offers(options['offers'], return_date=None))['flights']
+        origin = Place(city='Delhi', airport='Indira Gandhi International Airport', code='DEL', country='India')
+        destination = Place(city='Paris', airport='Charles de Gaulle Airport', code='CDG', country='France')
+        context = {
+            'flights': (),
+            'origin': origin,
+            'destination': destination,
+            'seat': 'Economy',
+            'trip_type': '1',
+            'depart_date': datetime(2026, 11, 2),
+            'return_date': None,
+            'max_price': 1000,
+            'min_price': 0,
+            'include_amadeus': True,
+            'available_days': [],
+        }
+
+        def render(rows):
+            template.render({**context, 'amadeus_flights': rows})
+            started = time.perf_counter()
+            template.render({**context, 'amadeus_flights': rows})
+            return time.perf_counter() - started
+
+        def filters(rows):
+            # The four parse_iso_time calls per row on search.html, plus the
+            # date and duration formatters other pages use
+            started = time.perf_counter()
+            for row in rows:
+                for _ in range(2):
+                    parse_iso_time(row['departure_time'])
+                    parse_iso_time(row['arrival_time'])
+                parse_iso_date(row['departure_time'])
+                format_duration(row['duration'])
+            return time.perf_counter() - started
+
+        legacy = table.as_dicts()
+        rows = {'ISO strings (legacy dicts)': legacy, 'pre-parsed OfferTable': table}
+        # Interleave the variants and keep each one's best run, so machine
+        # noise hits them equally; garbage is collected between renders
+        renders = {'empty': [], **rows}
+        best = dict.fromkeys(renders, float('inf'))
+        for _ in range(options['runs']):
+            for name, variant in renders.items():
+                gc.collect()
+                best[name] = min(best[name], render(variant))
+        empty = best['empty']
+        variants = {name: (best[name], filters(variant)) for name, variant in rows.items()}
+
+        self.stdout.write(f"{len(table.offers)} offers, {len(table)} rows; page without rows {empty * 1000:.1f} ms")
+        for name, (seconds, filter_seconds) in variants.items():
+            per_row = (seconds - empty) / len(table)
+            self.stdout.write(
+                f"  {name:<28}: {seconds * 1000:7.1f} ms/page, {per_row * 1e6:6.1f} us/row "
+                f"(date/time filters {filter_seconds / len(table) * 1e6:.1f} us/row)"
+            )
+        (legacy_seconds, legacy_filters), (parsed_seconds, parsed_filters) = variants.values()
+        self.stdout.write(
+            f"  pre-parsing saves {(legacy_seconds - parsed_seconds) / len(table) * 1e6:.1f} us/row "
+            f"of render time and {(legacy_filters - parsed_filters) / len(table) * 1e6:.1f} us/row of filter time"
+        )
+        self.stdout.write(self.style.SUCCESS('Done'))
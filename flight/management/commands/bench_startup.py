@@ -0,0 +1,62 @@
+"""
+Django management command to measure worker cold-start time
+Run with: python manage.py bench_startup [--runs 5]
+
+Each run starts a fresh interpreter that sets up Django and imports the
+URLconf (and through it every view module), which is what a gunicorn
+worker does before serving its first request.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+
+STARTUP_SCRIPT = """
+import time
+started = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(time.perf_counter() - started)
+"""
+
+
+class Command(BaseCommand):
+    help = 'Measure cold-start time of a worker importing the URLconf'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=5,
+            help='Number of fresh interpreters to time (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        timings = []
+        for _ in range(options['runs']):
+            result = subprocess.run(
+                [sys.executable, '-c', STARTUP_SCRIPT],
+                env=os.environ.copy(),
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                text=True,
+                timeout=120,
+            )
+            if result.returncode != 0:
+                self.stdout.write(self.style.ERROR(result.stderr.strip()))
+                return
+            timings.append(float(result.stdout.strip().splitlines()[-1]))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"URLconf import over {len(timings)} runs: "
+                f"min {min(timings) * 1000:.1f} ms, "
+                f"median {statistics.median(timings) * 1000:.1f} ms, "
+                f"max {max(timings) * 1000:.1f} ms"
+            )
+        )
@@ -0,0 +1,53 @@
+"""
+Django management command to seed an empty database from the CSV files in Data/
+Run with: python manage.py bootstrap [--no-flights]
+"""
+
+from django.core.management.base import BaseCommand
+from flight.utils import bootstrap_status, createWeekDays, addPlaces, load_schedules
+
+
+class Command(BaseCommand):
+    help = 'Seed weekdays, airports and flight schedules into an empty database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-flights',
+            action='store_true',
+            help='Only seed weekdays and airports'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report which tables are empty without seeding them'
+        )
+
+    def handle(self, *args, **options):
+        missing = bootstrap_status()
+
+        if options['check']:
+            if missing:
+                self.stdout.write(self.style.WARNING(f"Missing: {', '.join(missing)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS('Database is seeded.'))
+            return
+
+        if not missing:
+            self.stdout.write(self.style.SUCCESS('Database is already seeded.'))
+            return
+
+        if 'weekdays' in missing:
+            createWeekDays()
+            self.stdout.write('Added weekdays.')
+
+        if 'places' in missing:
+            addPlaces()
+
+        if 'flights' in missing and not options['no_flights']:
+            report = load_schedules()
+            self.stdout.write(
+                f"Added {report['created']} flights in {report['seconds']:.2f}s "
+                f"({len(report['rejected'])} rows rejected)."
+            )
+
+        self.stdout.write(self.style.SUCCESS('Bootstrap complete.'))
@@ -0,0 +1,21 @@
+"""
+Django management command to release the seats of unpaid bookings
+Run with: python manage.py expire_seat_holds
+
+Cancels PENDING tickets older than FLIGHT_SEAT_HOLD_MINUTES and returns
+their seats to the inventory. Booking does the same for a flight it finds
+full, so running this periodically (e.g. from cron) only keeps the
+availability of quieter flights accurate.
+"""
+
+from django.core.management.base import BaseCommand
+
+from flight.inventory import expire_holds
+
+
+class Command(BaseCommand):
+    help = 'Release the seats held by unpaid bookings past the hold period'
+
+    def handle(self, *args, **options):
+        seats = expire_holds()
+        self.stdout.write(self.style.SUCCESS(f'Released {seats} seats'))
@@ -0,0 +1,40 @@
+"""
+Django management command to expand the weekly schedule into dated flight instances
+Run with: python manage.py generate_flight_instances [--days 60]
+
+Replaces every FlightInstance with the departures from today through
+--days ahead. Run it daily (e.g. from cron) to roll the search horizon
+forward; dates past the horizon are searched on the weekly schedule.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from flight.instances import horizon_days, rebuild_flight_instances
+
+
+class Command(BaseCommand):
+    help = 'Generate dated flight instances for a rolling horizon'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Days ahead to generate (default: FLIGHT_INSTANCE_DAYS, 60)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per bulk_create batch (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else horizon_days()
+        started = time.perf_counter()
+        count = rebuild_flight_instances(days=days, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {count} departures over {days} days in {time.perf_counter() - started:.2f}s"
+        ))
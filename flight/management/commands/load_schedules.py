@@ -0,0 +1,85 @@
+"""
+Django management command to bulk-load flight schedules from the CSV files in Data/
+Run with: python manage.py load_schedules [paths ...]
+Use --sync to apply only the differences against the stored schedule.
+"""
+
+from django.core.management.base import BaseCommand
+from flight.models import Flight
+from flight.utils import SCHEDULE_FILES, load_schedules, sync_schedules
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load flight schedules from CSV files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            default=SCHEDULE_FILES,
+            help='Schedule CSV files (default: Data/domestic_flights.csv Data/international_flights.csv)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per bulk_create batch (default: 1000)'
+        )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Insert, update and retire only the flights that changed'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='With --sync, report the changes without writing them'
+        )
+        parser.add_argument(
+            '--show-rejected',
+            type=int,
+            default=10,
+            help='Number of rejected rows to print (default: 10)'
+        )
+
+    def handle(self, *args, **options):
+        if options['sync']:
+            report = sync_schedules(
+                options['paths'],
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run']
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{'Would apply' if options['dry_run'] else 'Applied'}: "
+                    f"{report['inserted']} inserted, {report['updated']} updated, "
+                    f"{report['retired']} retired, {report['unchanged']} unchanged "
+                    f"({report['rows']} rows in {report['seconds']:.2f}s)"
+                )
+            )
+            self.report_rejected(report['rejected'], options['show_rejected'])
+            return
+
+        if Flight.objects.exists():
+            self.stdout.write(
+                self.style.WARNING('Flights already exist; new rows will be added alongside them.')
+            )
+
+        report = load_schedules(options['paths'], batch_size=options['batch_size'])
+
+        rate = report['rows'] / report['seconds'] if report['seconds'] else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Loaded {report['created']} of {report['rows']} rows in "
+                f"{report['seconds']:.2f}s ({rate:,.0f} rows/sec)"
+            )
+        )
+
+        self.report_rejected(report['rejected'], options['show_rejected'])
+
+    def report_rejected(self, rejected, limit):
+        """Print the rejected-row summary"""
+        if rejected:
+            self.stdout.write(self.style.WARNING(f'{len(rejected)} rows rejected:'))
+            for path, line_no, reason in rejected[:limit]:
+                self.stdout.write(f'  {path}:{line_no}: {reason}')
@@ -0,0 +1,152 @@
+"""
+Django management command to stress the seat inventory with parallel bookers
+Run with: python manage.py stress_seat_inventory [--workers 16] [--seats 60] [--attempts 20]
+
+Every worker thread books the same flight, date and class through the
+booking write path (passengers, seat reservation and tickets in one
+transaction) until its attempts run out, with far more demand than seats.
+The command fails unless the seats sold never exceed the capacity and the
+inventory row agrees with the seats the tickets hold. Half the tickets are
+then cancelled by two workers each, which must release every seat exactly
+once. Reports bookings/sec under contention. Everything it creates is
+deleted afterwards.
+"""
+
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+from django.db.models import Sum
+
+from capstone.utils import createtickets
+from flight.inventory import SoldOut, release_tickets
+from flight.models import Flight, Passenger, SeatInventory, Ticket, User
+
+
+class Command(BaseCommand):
+    help = 'Book one flight from many threads at once and check it is never oversold'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=16,
+            help='Parallel booking threads (default: 16)'
+        )
+        parser.add_argument(
+            '--seats',
+            type=int,
+            default=60,
+            help='Economy seats on the flight (default: 60)'
+        )
+        parser.add_argument(
+            '--attempts',
+            type=int,
+            default=20,
+            help='Booking attempts per thread (default: 20)'
+        )
+        parser.add_argument(
+            '--passengers',
+            type=int,
+            default=3,
+            help='Largest party per booking; each books 1..N (default: 3)'
+        )
+
+    def handle(self, *args, **options):
+        flight = Flight.objects.filter(economy_fare__gt=0, duration__isnull=False).first()
+        if flight is None:
+            raise CommandError('Load flights first: python manage.py bootstrap')
+        flight_date = date.today() + timedelta(days=400)
+        SeatInventory.objects.filter(flight=flight, flight_date=flight_date, seat_class='economy').delete()
+        row = SeatInventory.objects.create(flight=flight, flight_date=flight_date, seat_class='economy',
+                                           capacity=options['seats'], available=options['seats'])
+        user, created_user = User.objects.get_or_create(username='stress-seat-inventory')
+        leg = [(flight, flight_date.strftime('%d-%m-%Y'), 'Economy')]
+
+        outcomes = Counter()
+        tickets, passenger_ids = [], []
+        lock = threading.Lock()
+        start = threading.Barrier(options['workers'])
+
+        def book(party):
+            with transaction.atomic():
+                passengers = Passenger.objects.bulk_create(
+                    [Passenger(first_name=f'Stress{i}', last_name='Passenger', gender='male') for i in range(party)])
+                return passengers, createtickets(user, passengers, leg, None, '1', 'stress@example.com', '5550100')
+
+        def booker():
+            try:
+                start.wait()
+                for _ in range(options['attempts']):
+                    try:
+                        passengers, booked = book(random.randint(1, options['passengers']))
+                    except SoldOut:
+                        outcomes['sold out'] += 1
+                        continue
+                    except OperationalError:
+                        # SQLite gives up on a busy database after its lock timeout
+                        outcomes['lock timeout'] += 1
+                        continue
+                    with lock:
+                        outcomes['booked'] += 1
+                        tickets.extend(booked)
+                        passenger_ids.extend(passenger.id for passenger in passengers)
+            finally:
+                connection.close()
+
+        def cancel(batch):
+            try:
+                start.wait()
+                release_tickets([Ticket.objects.get(id=ticket.id) for ticket in batch])
+            finally:
+                connection.close()
+
+        def run(target, batches):
+            threads = [threading.Thread(target=target, args=batch) for batch in batches]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return time.perf_counter() - started
+
+        try:
+            seconds = run(booker, [()] * options['workers'])
+            sold = sum(ticket.seats_held for ticket in tickets)
+            row.refresh_from_db()
+            self.stdout.write(
+                f"{connection.vendor}: {options['workers']} workers x {options['attempts']} attempts "
+                f"on {options['seats']} seats"
+            )
+            self.stdout.write(
+                f"  {outcomes['booked']} booked ({sold} seats), {outcomes['sold out']} sold out, "
+                f"{outcomes['lock timeout']} lock timeouts in {seconds * 1000:.0f} ms "
+                f"({sum(outcomes.values()) / seconds:.0f} attempts/sec)"
+            )
+            held = Ticket.objects.filter(id__in=[t.id for t in tickets]).aggregate(seats=Sum('seats_held'))['seats'] or 0
+            if sold > row.capacity or row.available != row.capacity - sold or held != sold:
+                raise CommandError(f'Inventory mismatch: capacity {row.capacity}, available {row.available}, '
+                                   f'sold {sold}, held by tickets {held}')
+
+            # Each cancelled ticket is released by two workers racing each other
+            cancelled = tickets[::2]
+            workers = max(1, options['workers'] // 2)
+            batches = [cancelled[i::workers] for i in range(workers)]
+            start = threading.Barrier(2 * workers)
+            run(cancel, [(batch,) for batch in batches + batches])
+            row.refresh_from_db()
+            expected = row.capacity - sold + sum(ticket.seats_held for ticket in cancelled)
+            if row.available != expected:
+                raise CommandError(f'Release mismatch: available {row.available}, expected {expected}')
+            self.stdout.write(f"  cancelled {len(cancelled)} bookings twice each; {row.available} seats available")
+        finally:
+            Ticket.objects.filter(id__in=[ticket.id for ticket in tickets]).delete()
+            Passenger.objects.filter(id__in=passenger_ids).delete()
+            row.delete()
+            if created_user:
+                user.delete()
+        self.stdout.write(self.style.SUCCESS('No seat oversold'))
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+
+
+def days_to_bitmask(apps, schema_editor):
+    Flight = apps.get_model('flight', 'Flight')
+    Through = Flight.depart_day.through
+    masks = {}
+    for flight_id, number in Through.objects.values_list('flight_id', 'week__number').iterator():
+        masks[flight_id] = masks.get(flight_id, 0) | (1 << number)
+    flights = [Flight(id=flight_id, depart_days=mask) for flight_id, mask in masks.items()]
+    Flight.objects.bulk_update(flights, ['depart_days'], batch_size=1000)
+
+
+def bitmask_to_days(apps, schema_editor):
+    Flight = apps.get_model('flight', 'Flight')
+    Week = apps.get_model('flight', 'Week')
+    Through = Flight.depart_day.through
+    weeks = dict(Week.objects.values_list('number', 'id'))
+    rows = []
+    for flight_id, mask in Flight.objects.values_list('id', 'depart_days').iterator():
+        for number, week_id in weeks.items():
+            if mask & (1 << number):
+                rows.append(Through(flight_id=flight_id, week_id=week_id))
+    Through.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='depart_days',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Bitmask of operating weekdays: Monday=1, Tuesday=2, Wednesday=4 ... Sunday=64'),
+        ),
+        migrations.RunPython(days_to_bitmask, bitmask_to_days),
+        migrations.RemoveField(
+            model_name='flight',
+            name='depart_day',
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['origin', 'destination', 'depart_days', 'economy_fare', 'business_fare', 'first_fare'], name='flight_route_days_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:01
+
+from django.db import migrations, models
+
+
+def build_calendar(apps, schema_editor):
+    Flight = apps.get_model('flight', 'Flight')
+    RouteCalendar = apps.get_model('flight', 'RouteCalendar')
+    seats = ('economy', 'business', 'first')
+    rows = {}
+    flights = Flight.objects.values_list('origin__code', 'destination__code', 'depart_days',
+                                         'economy_fare', 'business_fare', 'first_fare')
+    for origin, destination, depart_days, *fares in flights.iterator():
+        for seat, fare in zip(seats, fares):
+            if fare is None or not depart_days:
+                continue
+            row = rows.setdefault((origin, destination, seat), RouteCalendar(
+                origin_code=origin, destination_code=destination, seat_class=seat, min_fares=[None] * 7))
+            row.depart_days |= depart_days
+            row.flight_count += 1
+            for day in range(7):
+                if depart_days & (1 << day) and (row.min_fares[day] is None or fare < row.min_fares[day]):
+                    row.min_fares[day] = fare
+    RouteCalendar.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0002_flight_depart_days'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteCalendar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin_code', models.CharField(max_length=3)),
+                ('destination_code', models.CharField(max_length=3)),
+                ('seat_class', models.CharField(choices=[('economy', 'Economy'), ('business', 'Business'), ('first', 'First')], max_length=20)),
+                ('depart_days', models.PositiveSmallIntegerField(default=0, help_text='Bitmask of operating weekdays, as on Flight')),
+                ('min_fares', models.JSONField(default=list, help_text='Cheapest fare per weekday, Monday first; null when not operating')),
+                ('flight_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('origin_code', 'destination_code', 'seat_class'), name='route_calendar_key')],
+            },
+        ),
+        migrations.RunPython(build_calendar, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0003_route_calendar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='seats_held',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Seats taken from SeatInventory; 0 once released'),
+        ),
+        migrations.CreateModel(
+            name='SeatInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('flight_date', models.DateField()),
+                ('seat_class', models.CharField(choices=[('economy', 'Economy'), ('business', 'Business'), ('first', 'First')], max_length=20)),
+                ('capacity', models.PositiveSmallIntegerField()),
+                ('available', models.PositiveSmallIntegerField()),
+                ('flight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory', to='flight.flight')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('flight', 'flight_date', 'seat_class'), name='seat_inventory_key'), models.CheckConstraint(condition=models.Q(('available__lte', models.F('capacity'))), name='seat_inventory_within_capacity')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0004_seat_inventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightInstance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('departure', models.DateTimeField()),
+                ('arrival', models.DateTimeField()),
+                ('economy_fare', models.FloatField(null=True)),
+                ('business_fare', models.FloatField(null=True)),
+                ('first_fare', models.FloatField(null=True)),
+                ('economy_seats', models.PositiveSmallIntegerField(default=0)),
+                ('business_seats', models.PositiveSmallIntegerField(default=0)),
+                ('first_seats', models.PositiveSmallIntegerField(default=0)),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='flight.place')),
+                ('flight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='instances', to='flight.flight')),
+                ('origin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='flight.place')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['origin', 'destination', 'departure'], name='flight_instance_route_idx')],
+                'constraints': [models.UniqueConstraint(fields=('flight', 'departure'), name='flight_instance_key')],
+            },
+        ),
+    ]
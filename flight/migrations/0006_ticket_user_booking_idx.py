@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0005_flight_instance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['user', 'booking_date', 'id'], name='ticket_user_booking_idx'),
+        ),
+    ]
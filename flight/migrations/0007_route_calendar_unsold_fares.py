@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def rebuild_calendar(apps, schema_editor):
+    # 0003 only skipped NULL fares, so classes loaded with a blank (0.0) fare
+    # were listed as sold at 0.0. Rebuild every row, skipping them.
+    Flight = apps.get_model('flight', 'Flight')
+    RouteCalendar = apps.get_model('flight', 'RouteCalendar')
+    seats = ('economy', 'business', 'first')
+    rows = {}
+    flights = Flight.objects.values_list('origin__code', 'destination__code', 'depart_days',
+                                         'economy_fare', 'business_fare', 'first_fare')
+    for origin, destination, depart_days, *fares in flights.iterator():
+        for seat, fare in zip(seats, fares):
+            if not fare or not depart_days:
+                continue
+            row = rows.setdefault((origin, destination, seat), RouteCalendar(
+                origin_code=origin, destination_code=destination, seat_class=seat, min_fares=[None] * 7))
+            row.depart_days |= depart_days
+            row.flight_count += 1
+            for day in range(7):
+                if depart_days & (1 << day) and (row.min_fares[day] is None or fare < row.min_fares[day]):
+                    row.min_fares[day] = fare
+    RouteCalendar.objects.all().delete()
+    RouteCalendar.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0006_ticket_user_booking_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_calendar, migrations.RunPython.noop),
+    ]
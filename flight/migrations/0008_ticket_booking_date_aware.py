@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 21:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0007_route_calendar_unsold_fares'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ticket',
+            name='booking_date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
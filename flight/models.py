@@ -1,7 +1,8 @@
 from django.db import models
+from django.db.models import Exists, OuterRef
 from django.contrib.auth.models import AbstractUser
 
-from datetime import datetime
+from django.utils import timezone
 
 # Create your models here.
 
@@ -27,11 +28,39 @@ class Week(models.Model):
         return f"{self.name} ({self.number})"
 
 
+WEEKDAYS = ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']
+
+def day_bit(weekday):
+    """Bit for a weekday (0 = Monday) in Flight.depart_days"""
+    return 1 << weekday
+
+class FlightQuerySet(models.QuerySet):
+    def on_day(self, weekday):
+        """Flights operating on the given weekday (0 = Monday)"""
+        return self.alias(
+            day_flag=models.F('depart_days').bitand(day_bit(weekday))
+        ).filter(day_flag__gt=0)
+
+    def route(self, origin_code, destination_code, seat):
+        """Flights on a route that sell the given seat class"""
+        return self.filter(
+            origin__code=origin_code.upper(),
+            destination__code=destination_code.upper(),
+            **{f'{seat.lower()}_fare__gt': 0},
+        )
+
+    def operating_weekdays(self):
+        """Weekday numbers (0 = Monday) any of these flights operates on, in one query"""
+        depart_days = 0
+        for days in self.order_by().values_list('depart_days', flat=True).distinct():
+            depart_days |= days
+        return [day for day in range(7) if depart_days & day_bit(day)]
+
 class Flight(models.Model):
     origin = models.ForeignKey(Place, on_delete=models.CASCADE, related_name="departures")
     destination = models.ForeignKey(Place, on_delete=models.CASCADE, related_name="arrivals")
     depart_time = models.TimeField(auto_now=False, auto_now_add=False)
-    depart_day = models.ManyToManyField(Week, related_name="flights_of_the_day")
+    depart_days = models.PositiveSmallIntegerField(default=0, help_text="Bitmask of operating weekdays: Monday=1, Tuesday=2, Wednesday=4 ... Sunday=64")
     duration = models.DurationField(null=True)
     arrival_time = models.TimeField(auto_now=False, auto_now_add=False)
     plane = models.CharField(max_length=24)
@@ -40,9 +69,29 @@ class Flight(models.Model):
     business_fare = models.FloatField(null=True)
     first_fare = models.FloatField(null=True)
 
+    objects = FlightQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['origin', 'destination', 'depart_days', 'economy_fare', 'business_fare', 'first_fare'], name='flight_route_days_idx'),
+        ]
+
     def __str__(self):
         return f"{self.id}: {self.origin} to {self.destination}"
 
+    def fare(self, seat):
+        """Fare for the given seat class"""
+        return getattr(self, f'{seat.lower()}_fare')
+
+    @property
+    def weekdays(self):
+        """Operating weekday numbers (0 = Monday)"""
+        return [day for day in range(7) if self.depart_days & day_bit(day)]
+
+    @property
+    def weekday_names(self):
+        return [WEEKDAYS[day] for day in self.weekdays]
+
 
 
 GENDER = (
@@ -67,6 +116,7 @@ SEAT_CLASS = (
     ('business', 'Business'),
     ('first', 'First')
 )
+SEAT_CLASSES = tuple(seat for seat, _ in SEAT_CLASS)
 
 TICKET_STATUS =(
     ('PENDING', 'Pending'),
@@ -87,10 +137,131 @@ class Ticket(models.Model):
     coupon_discount = models.FloatField(default=0.0)
     total_fare = models.FloatField(blank=True, null=True)
     seat_class = models.CharField(max_length=20, choices=SEAT_CLASS)
-    booking_date = models.DateTimeField(default=datetime.now)
+    booking_date = models.DateTimeField(default=timezone.now)
     mobile = models.CharField(max_length=20,blank=True)
     email = models.EmailField(max_length=45, blank=True)
     status = models.CharField(max_length=45, choices=TICKET_STATUS)
+    seats_held = models.PositiveSmallIntegerField(default=0, help_text="Seats taken from SeatInventory; 0 once released")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'booking_date', 'id'], name='ticket_user_booking_idx'),
+        ]
 
     def __str__(self):
-        return self.ref_no
\ No newline at end of file
+        return self.ref_no
+
+class FlightInstanceQuerySet(models.QuerySet):
+    def route(self, origin_code, destination_code, seat):
+        """Departures on a route that sell the given seat class"""
+        # Place ids as subqueries, so the route index is range-scanned rather than joined to
+        return self.filter(
+            origin__in=Place.objects.filter(code=origin_code.upper()),
+            destination__in=Place.objects.filter(code=destination_code.upper()),
+            **{f'{seat.lower()}_fare__gt': 0},
+        )
+
+    def departing(self, start, end):
+        """Departures from `start` up to, not including, `end` (a range scan of the route index)"""
+        return self.filter(departure__gte=start, departure__lt=end)
+
+    def with_seats_left(self, flight_date, seat):
+        """Departures on `flight_date` whose seat class is not sold out in SeatInventory"""
+        # No inventory row yet means no seat has been taken
+        return self.exclude(Exists(SeatInventory.objects.filter(
+            flight=OuterRef('flight'), flight_date=flight_date, seat_class=seat.lower(), available=0)))
+
+class FlightInstance(models.Model):
+    """
+    One dated departure of a weekly Flight, materialized for a rolling
+    horizon by flight.instances. Route and fares are copied from the Flight
+    so a date window is one range scan of the route index.
+    """
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name="instances")
+    origin = models.ForeignKey(Place, on_delete=models.CASCADE, related_name="+")
+    destination = models.ForeignKey(Place, on_delete=models.CASCADE, related_name="+")
+    departure = models.DateTimeField()
+    arrival = models.DateTimeField()
+    economy_fare = models.FloatField(null=True)
+    business_fare = models.FloatField(null=True)
+    first_fare = models.FloatField(null=True)
+    economy_seats = models.PositiveSmallIntegerField(default=0)
+    business_seats = models.PositiveSmallIntegerField(default=0)
+    first_seats = models.PositiveSmallIntegerField(default=0)
+
+    objects = FlightInstanceQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['flight', 'departure'], name='flight_instance_key'),
+        ]
+        indexes = [
+            models.Index(fields=['origin', 'destination', 'departure'], name='flight_instance_route_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.flight_id}: {self.origin_id} to {self.destination_id} at {self.departure}"
+
+    def fare(self, seat):
+        return getattr(self, f'{seat.lower()}_fare')
+
+    def seats(self, seat):
+        """Seats offered in a class; what is left is tracked by SeatInventory"""
+        return getattr(self, f'{seat.lower()}_seats')
+
+class SeatInventory(models.Model):
+    """
+    Seats left on one flight, date and seat class. Only changed through the
+    conditional UPDATEs in flight.inventory, so `available` never goes negative.
+    """
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name="inventory")
+    flight_date = models.DateField()
+    seat_class = models.CharField(max_length=20, choices=SEAT_CLASS)
+    capacity = models.PositiveSmallIntegerField()
+    available = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['flight', 'flight_date', 'seat_class'], name='seat_inventory_key'),
+            models.CheckConstraint(condition=models.Q(available__lte=models.F('capacity')), name='seat_inventory_within_capacity'),
+        ]
+
+    def __str__(self):
+        return f"{self.flight_id} on {self.flight_date} ({self.seat_class}): {self.available}/{self.capacity}"
+
+class RouteCalendar(models.Model):
+    """
+    Materialized weekly summary of one route in one seat class, kept in sync
+    with Flight by flight.route_calendar. Looked up by its unique key.
+    """
+    origin_code = models.CharField(max_length=3)
+    destination_code = models.CharField(max_length=3)
+    seat_class = models.CharField(max_length=20, choices=SEAT_CLASS)
+    depart_days = models.PositiveSmallIntegerField(default=0, help_text="Bitmask of operating weekdays, as on Flight")
+    min_fares = models.JSONField(default=list, help_text="Cheapest fare per weekday, Monday first; null when not operating")
+    flight_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['origin_code', 'destination_code', 'seat_class'], name='route_calendar_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.origin_code} to {self.destination_code} ({self.seat_class})"
+
+    @property
+    def weekdays(self):
+        """Operating weekday numbers (0 = Monday)"""
+        return [day for day in range(7) if self.depart_days & day_bit(day)]
+
+    @property
+    def weekday_names(self):
+        return [WEEKDAYS[day] for day in self.weekdays]
+
+    def cheapest_day(self):
+        """(weekday name, fare) of the cheapest operating weekday, or None"""
+        fares = [(fare, day) for day, fare in enumerate(self.min_fares) if fare is not None]
+        if not fares:
+            return None
+        fare, day = min(fares)
+        return WEEKDAYS[day], fare
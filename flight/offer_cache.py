@@ -0,0 +1,149 @@
+"""
+Short-lived cache for Amadeus flight-offer searches.
+
+Searches are keyed by their canonicalized parameters (upper-cased codes,
+dates, adults, class, max results), so the same route and date searched by
+many users within the TTL costs one upstream call. Concurrent identical
+searches that miss the cache are coalesced: the first caller fetches and
+the rest wait for its result instead of issuing their own request.
+
+Hit, miss and coalesced counts are kept in the Django cache so every worker
+sharing the cache backend reports into the same counters.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+COUNTERS = ('hits', 'misses', 'coalesced')
+
+
+def canonical_params(params):
+    """Normalize Flight Offers Search parameters so equivalent searches match"""
+    canonical = {
+        'originLocationCode': str(params['originLocationCode']).strip().upper(),
+        'destinationLocationCode': str(params['destinationLocationCode']).strip().upper(),
+        'departureDate': str(params['departureDate']).strip(),
+        'adults': int(params.get('adults', 1)),
+        'travelClass': str(params.get('travelClass', 'ECONOMY')).strip().upper(),
+        'max': int(params.get('max', 20)),
+    }
+    if params.get('returnDate'):
+        canonical['returnDate'] = str(params['returnDate']).strip()
+    return canonical
+
+
+class OfferCache:
+    """TTL cache with per-key single-flight for thread and asyncio callers."""
+
+    def __init__(self, prefix='amadeus_offers'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'AMADEUS_OFFER_CACHE_TTL', 120)
+
+    def key(self, params):
+        digest = hashlib.sha1(json.dumps(canonical_params(params), sort_keys=True).encode()).hexdigest()
+        return f"{self.prefix}_{digest}"
+
+    def get_or_fetch(self, params, fetch, cacheable=lambda result: True):
+        """Cached result for `params`, calling `fetch()` at most once per key at a time"""
+        key = self.key(params)
+        result = cache.get(key)
+        if result is not None:
+            self._count('hits')
+            return result
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = Future()
+        if not leader:
+            self._count('coalesced')
+            return call.result()
+
+        self._count('misses')
+        try:
+            result = fetch()
+            if self.ttl and cacheable(result):
+                cache.set(key, result, self.ttl)
+            call.set_result(result)
+            return result
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    async def aget_or_fetch(self, params, fetch, cacheable=lambda result: True):
+        """Async version of get_or_fetch(); `fetch` is a coroutine function"""
+        key = self.key(params)
+        result = await cache.aget(key)
+        if result is not None:
+            await self._acount('hits')
+            return result
+
+        # asyncio futures belong to one event loop, so coalesce per loop
+        loop = asyncio.get_running_loop()
+        call = self._inflight.get((loop, key))
+        if call is not None:
+            await self._acount('coalesced')
+            return await asyncio.shield(call)
+        call = self._inflight[(loop, key)] = loop.create_future()
+
+        await self._acount('misses')
+        try:
+            result = await fetch()
+            if self.ttl and cacheable(result):
+                await cache.aset(key, result, self.ttl)
+            call.set_result(result)
+            return result
+        except BaseException as e:
+            call.set_exception(e)
+            # Mark the exception retrieved when nobody else was waiting
+            call.exception()
+            raise
+        finally:
+            del self._inflight[(loop, key)]
+
+    def stats(self):
+        """Hit/miss/coalesced counters and the hit ratio across all workers"""
+        counts = cache.get_many([self._counter_key(name) for name in COUNTERS])
+        stats = {name: counts.get(self._counter_key(name), 0) for name in COUNTERS}
+        served = stats['hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_ratio'] = round((stats['hits'] + stats['coalesced']) / served, 4) if served else 0.0
+        stats['ttl'] = self.ttl
+        return stats
+
+    def reset_stats(self):
+        cache.delete_many([self._counter_key(name) for name in COUNTERS])
+
+    def _counter_key(self, name):
+        return f"{self.prefix}_stats_{name}"
+
+    def _count(self, name):
+        key = self._counter_key(name)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr(); counters are best effort
+            pass
+
+    async def _acount(self, name):
+        # BaseCache.aincr() is a non-atomic get/set, so use the sync incr()
+        await sync_to_async(self._count, thread_sensitive=False)(name)
+
+
+offer_cache = OfferCache()
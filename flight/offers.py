@@ -0,0 +1,274 @@
+"""
+Compact, offer-keyed representation of Amadeus Flight Offers Search results.
+
+A response is normalized once into an OfferTable: one Offer per flight
+offer holding its (single, shared) OfferPrice and its itineraries, and one
+slotted Segment record per flight segment pointing back at its offer. No
+per-segment copies of the price block or dicts are created, which keeps a
+250-offer round-trip response to a few thousand small objects.
+
+Departure/arrival timestamps and durations are parsed here, once per
+response, into datetimes and timedeltas; they travel with the table through
+the offer cache, so the template filters only have to format them.
+
+The table is also a read-only sequence of its segments, and a Segment
+exposes the same names as the old per-segment dicts (`offer_id`, `price`,
+`stops`, `is_direct`, ...), so templates iterating `amadeus_flights` keep
+working unchanged. `as_dicts()` and `as_columns()` build JSON payloads with
+the timestamps and durations back in their ISO string form.
+"""
+
+import re
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from operator import attrgetter
+
+ISO_DURATION = re.compile(r'P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+
+
+def parse_at(value):
+    """Amadeus local timestamp ("2026-11-02T10:05:00") as a naive datetime"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_duration(value):
+    """ISO 8601 duration ("PT2H30M", "P1DT2H") as a timedelta"""
+    match = ISO_DURATION.match(value) if value else None
+    if not match:
+        return None
+    days, hours, minutes, seconds = (int(part) if part else 0 for part in match.groups())
+    return timedelta(days=days, hours=hours, minutes=minutes, seconds=seconds)
+
+
+def iso_duration(value):
+    """Inverse of parse_duration, in the PT..H..M form Amadeus uses"""
+    if value is None:
+        return None
+    minutes = int(value.total_seconds() // 60)
+    hours, minutes = divmod(minutes, 60)
+    return 'PT' + (f'{hours}H' if hours else '') + (f'{minutes}M' if minutes or not hours else '')
+
+
+def iso_at(value):
+    return value.isoformat() if value is not None else None
+
+
+class OfferPrice:
+    """Price block of one offer, shared by all of its segments."""
+    __slots__ = ('total', 'currency', 'base', 'fees', 'taxes')
+
+    def __init__(self, price_data):
+        self.total = float(price_data.get('total', 0))
+        self.currency = price_data.get('currency', 'USD')
+        self.base = float(price_data.get('base', 0))
+        self.fees = price_data.get('fees', [])
+        self.taxes = price_data.get('taxes', [])
+
+    # Template variable lookups try item access before attributes
+    __getitem__ = object.__getattribute__
+
+    def as_dict(self):
+        return {'total': self.total, 'currency': self.currency, 'base': self.base,
+                'fees': self.fees, 'taxes': self.taxes}
+
+
+class Offer:
+    """One flight offer: id, shared price and its itineraries of segments."""
+    __slots__ = ('id', 'price', 'itineraries')
+
+    def __init__(self, offer_id, price):
+        self.id = offer_id
+        self.price = price
+        self.itineraries = []
+
+    @property
+    def segments(self):
+        return [segment for itinerary in self.itineraries for segment in itinerary]
+
+
+class Segment:
+    """
+    One flight segment; attribute names match the old normalized dicts.
+    `departure_time`/`arrival_time` are datetimes and `duration` a timedelta.
+    """
+    # Values parsed from the segment itself, in pickling order
+    FIELDS = ('itinerary', 'amadeus_id', 'airline_code', 'airline_name', 'flight_number',
+              'aircraft', 'origin_code', 'origin_terminal', 'departure_time', 'destination_code',
+              'destination_terminal', 'arrival_time', 'duration', 'available_seats', 'booking_class',
+              'stops')
+    # Plus the owning offer and references derived from it; these are plain
+    # slots rather than properties because templates read them on every row
+    __slots__ = ('offer', 'offer_id', 'price', 'is_direct') + FIELDS
+
+    # Columns of as_columns(), in order; offer-level values come first
+    COLUMNS = ('offer_id', 'itinerary', 'amadeus_id', 'airline_code', 'airline_name', 'flight_number',
+               'aircraft', 'origin_code', 'origin_terminal', 'departure_time', 'destination_code',
+               'destination_terminal', 'arrival_time', 'duration', 'available_seats', 'booking_class',
+               'stops')
+
+    # Template variable lookups try item access before attributes; answering
+    # it directly avoids a caught TypeError per lookup
+    __getitem__ = object.__getattribute__
+
+    def attach(self, offer):
+        self.offer = offer
+        self.offer_id = offer.id
+        self.price = offer.price
+        self.is_direct = self.stops == 0
+
+    def as_dict(self):
+        """The per-segment dict shape served before the offer table existed"""
+        return {
+            'offer_id': self.offer.id,
+            'amadeus_id': self.amadeus_id,
+            'airline_code': self.airline_code,
+            'airline_name': self.airline_name,
+            'flight_number': self.flight_number,
+            'aircraft': self.aircraft,
+            'origin_code': self.origin_code,
+            'origin_terminal': self.origin_terminal,
+            'departure_time': iso_at(self.departure_time),
+            'destination_code': self.destination_code,
+            'destination_terminal': self.destination_terminal,
+            'arrival_time': iso_at(self.arrival_time),
+            'duration': iso_duration(self.duration),
+            'price': self.offer.price.as_dict(),
+            'available_seats': self.available_seats,
+            'booking_class': self.booking_class,
+            'stops': self.stops,
+            'is_direct': self.stops == 0,
+        }
+
+
+def _identity(value):
+    return value
+
+
+# Converters for the typed columns when building JSON rows
+JSON_COLUMNS = {'departure_time': iso_at, 'arrival_time': iso_at, 'duration': iso_duration}
+
+
+class OfferTable(Sequence):
+    """Offers plus a flat segment table; iterates over segments."""
+
+    def __init__(self, offers=(), segments=()):
+        self.offers = list(offers)
+        self.segments = list(segments)
+
+    @classmethod
+    def from_amadeus(cls, amadeus_data, airline_name=lambda code: code):
+        """Build the table from a Flight Offers Search `data` list"""
+        table = cls()
+        names = {}
+        empty = {}
+        for raw_offer in amadeus_data or ():
+            offer = Offer(raw_offer.get('id'), OfferPrice(raw_offer.get('price', empty)))
+            for index, raw_itinerary in enumerate(raw_offer.get('itineraries', ())):
+                raw_segments = raw_itinerary.get('segments', ())
+                stops = len(raw_segments) - 1
+                itinerary = []
+                for raw in raw_segments:
+                    departure = raw.get('departure', empty)
+                    arrival = raw.get('arrival', empty)
+                    code = raw.get('carrierCode')
+                    if code not in names:
+                        names[code] = airline_name(code)
+
+                    segment = Segment()
+                    segment.itinerary = index
+                    segment.amadeus_id = raw.get('id')
+                    segment.airline_code = code
+                    segment.airline_name = names[code]
+                    segment.flight_number = raw.get('number')
+                    segment.aircraft = raw.get('aircraft', empty).get('code', '')
+                    segment.origin_code = departure.get('iataCode')
+                    segment.origin_terminal = departure.get('terminal')
+                    segment.departure_time = parse_at(departure.get('at'))
+                    segment.destination_code = arrival.get('iataCode')
+                    segment.destination_terminal = arrival.get('terminal')
+                    segment.arrival_time = parse_at(arrival.get('at'))
+                    segment.duration = parse_duration(raw.get('duration'))
+                    segment.available_seats = raw.get('numberOfBookableSeats', 0)
+                    segment.booking_class = raw.get('bookingClass')
+                    segment.stops = stops
+                    segment.attach(offer)
+                    itinerary.append(segment)
+                    table.segments.append(segment)
+                offer.itineraries.append(tuple(itinerary))
+            table.offers.append(offer)
+        return table
+
+    def __reduce__(self):
+        # Pickle as plain tuples; the generic path for slotted objects is
+        # an order of magnitude slower and the offer cache pickles every result
+        rows = {id(segment): row for row, segment in enumerate(self.segments)}
+        price_values = attrgetter(*OfferPrice.__slots__)
+        offers = [(offer.id, price_values(offer.price),
+                   [[rows[id(segment)] for segment in itinerary] for itinerary in offer.itineraries])
+                  for offer in self.offers]
+        offer_rows = {id(offer): row for row, offer in enumerate(self.offers)}
+        segment_values = attrgetter(*Segment.FIELDS)
+        segments = [(offer_rows[id(segment.offer)],) + segment_values(segment) for segment in self.segments]
+        return (_restore_table, (type(self), offers, segments))
+
+    def __getitem__(self, index):
+        return self.segments[index]
+
+    def __len__(self):
+        return len(self.segments)
+
+    def __iter__(self):
+        return iter(self.segments)
+
+    def price_range(self):
+        """(min, max) offer total, or (0, 0) when there are no offers"""
+        totals = [offer.price.total for offer in self.offers]
+        return (min(totals), max(totals)) if totals else (0, 0)
+
+    def cheapest(self):
+        """The lowest-priced Offer, or None when there are no offers"""
+        return min(self.offers, key=lambda offer: offer.price.total, default=None)
+
+    def as_dicts(self):
+        """Flat per-segment dicts, the historical JSON shape"""
+        return [segment.as_dict() for segment in self.segments]
+
+    def as_columns(self):
+        """Compact JSON: offers with shared prices, segments as column-ordered rows"""
+        rows = {id(segment): row for row, segment in enumerate(self.segments)}
+        return {
+            'offers': [{
+                'id': offer.id,
+                'price': offer.price.as_dict(),
+                'itineraries': [[rows[id(segment)] for segment in itinerary]
+                                for itinerary in offer.itineraries],
+            } for offer in self.offers],
+            'segments': {
+                'columns': Segment.COLUMNS,
+                'rows': [[JSON_COLUMNS.get(column, _identity)(getattr(segment, column)) for column in Segment.COLUMNS]
+                         for segment in self.segments],
+            },
+        }
+
+
+def _restore_table(cls, offers, segments):
+    table = cls()
+    for offer_id, price_values, _ in offers:
+        price = OfferPrice.__new__(OfferPrice)
+        for name, value in zip(OfferPrice.__slots__, price_values):
+            setattr(price, name, value)
+        table.offers.append(Offer(offer_id, price))
+    for values in segments:
+        segment = Segment()
+        for name, value in zip(Segment.FIELDS, values[1:]):
+            setattr(segment, name, value)
+        segment.attach(table.offers[values[0]])
+        table.segments.append(segment)
+    for offer, (_, _, itineraries) in zip(table.offers, offers):
+        offer.itineraries = [tuple(table.segments[row] for row in itinerary) for itinerary in itineraries]
+    return table
@@ -0,0 +1,98 @@
+"""
+Round-trip pairing: outbound and return options combined into itineraries
+ranked by total fare or total duration.
+
+Both legs are sorted by their own score once; the cheapest pair is then
+(0, 0) and every other pair (i, j) scores at least as much as (i - 1, j)
+and (i, j - 1). A heap frontier seeded with (0, 0) that pushes those two
+neighbours as each pair is popped yields pairs in score order, so the best
+k of n x m candidates cost O(k log k) pops instead of building all n * m
+combinations. Pairs whose return leaves before the outbound has landed
+(plus a minimum turnaround) are skipped as they are popped.
+
+Amadeus round-trip offers are already priced as a pair; they are merged
+into the ranking as fixed candidates rather than re-paired with local legs.
+"""
+
+import heapq
+from itertools import islice
+
+from django.conf import settings
+
+DEFAULT_PAIRS = 50
+
+SCORES = {
+    'fare': lambda result: result.price,
+    'duration': lambda result: result.duration_minutes,
+}
+
+
+class RoundTrip:
+    """An outbound and a return option booked together."""
+    __slots__ = ('outbound', 'inbound', 'total_fare', 'total_minutes', 'offer_id')
+
+    def __init__(self, outbound, inbound, total_fare, offer_id=None):
+        self.outbound = outbound
+        self.inbound = inbound
+        self.total_fare = total_fare
+        self.total_minutes = outbound.duration_minutes + inbound.duration_minutes
+        self.offer_id = offer_id
+
+    def as_dict(self):
+        return {
+            'total_fare': self.total_fare,
+            'currency': self.outbound.currency,
+            'duration_minutes': self.total_minutes,
+            'offer_id': self.offer_id,
+            'outbound': self.outbound.as_dict(),
+            'return': self.inbound.as_dict(),
+        }
+
+
+def ranked_pairs(outbound, inbound, sort='fare', min_turnaround=None):
+    """Generate RoundTrips of separately priced legs, best `sort` score first"""
+    if min_turnaround is None:
+        min_turnaround = getattr(settings, 'FLIGHT_MIN_TURNAROUND_MINUTES', 120)
+    score = SCORES[sort]
+    outbound = sorted(outbound, key=score)
+    inbound = sorted(inbound, key=score)
+    if not outbound or not inbound:
+        return
+    turnaround = min_turnaround * 60
+
+    heap = [(score(outbound[0]) + score(inbound[0]), 0, 0)]
+    seen = {(0, 0)}
+    while heap:
+        _, i, j = heapq.heappop(heap)
+        for next_i, next_j in ((i + 1, j), (i, j + 1)):
+            if next_i < len(outbound) and next_j < len(inbound) and (next_i, next_j) not in seen:
+                seen.add((next_i, next_j))
+                heapq.heappush(heap, (score(outbound[next_i]) + score(inbound[next_j]), next_i, next_j))
+        first, second = outbound[i], inbound[j]
+        if (second.depart - first.arrive).total_seconds() >= turnaround:
+            yield RoundTrip(first, second, first.price + second.price)
+
+
+def offer_pairs(outbound, inbound, sort='fare'):
+    """RoundTrips for Amadeus offers priced as a whole, best `sort` score first"""
+    returns = {result.offer_id: result for result in inbound}
+    pairs = [RoundTrip(result, returns[result.offer_id], result.price, offer_id=result.offer_id)
+             for result in outbound if result.offer_id in returns]
+    return sorted(pairs, key=pair_score(sort))
+
+
+def pair_score(sort):
+    return (lambda pair: pair.total_minutes) if sort == 'duration' else (lambda pair: pair.total_fare)
+
+
+def top_round_trips(outbound, inbound, offers=((), ()), sort='fare', limit=DEFAULT_PAIRS):
+    """
+    Best `limit` round trips from separately priced legs (`outbound` x
+    `inbound`) and whole round-trip offers (`offers`: their outbound and
+    return rows, matched by offer id).
+    """
+    if sort not in SCORES:
+        raise ValueError(f"Unknown sort order {sort!r}")
+    merged = heapq.merge(ranked_pairs(outbound, inbound, sort), offer_pairs(*offers, sort=sort),
+                         key=pair_score(sort))
+    return list(islice(merged, limit))
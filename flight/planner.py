@@ -0,0 +1,102 @@
+"""
+Search planner: everything a search page needs for one leg in a single pass.
+
+A leg of a search (route, weekday, seat class) needs the flights operating
+that day cheapest first, their fare bounds for the price filter and, when
+nothing operates that day, the weekdays the route does operate as a
+fallback. plan_leg() derives all three from one ordered result set:
+
+- from the in-memory timetable (the default) without any query, or
+- with settings.FLIGHT_SEARCH_TIMETABLE = False, from the database with at
+  most two queries: the ordered flights (origin and destination joined in),
+  and only when that is empty, a RouteCalendar lookup by its unique key.
+  Dates inside the materialized FlightInstance horizon read that day's
+  departures with a range scan of the instance route index; other dates
+  match the weekly schedule on the weekday.
+
+A leg with no flights also gets a hint for the route's cheapest weekday.
+
+Fare bounds are the first and last fares of the ordered result, never
+separate MIN/MAX or first()/last() queries.
+"""
+
+from datetime import datetime
+
+from django.conf import settings
+
+from .instances import in_horizon, instances_on
+from .models import Flight, Place, WEEKDAYS
+from .route_calendar import route_calendar
+from .timetable import get_timetable, fare_bounds
+
+
+class LegPlan:
+    """Flights for one search leg with their fare bounds and fallback days."""
+    __slots__ = ('flights', 'min_price', 'max_price', 'available_days', 'cheapest_day')
+
+    def __init__(self, flights, seat, available_days=(), cheapest_day=None):
+        self.flights = flights
+        self.min_price, self.max_price = fare_bounds(flights, seat)
+        self.available_days = list(available_days)
+        # (weekday name, fare) of the route's cheapest day, only for empty legs
+        self.cheapest_day = cheapest_day
+
+
+def plan_from_timetable(origin_code, destination_code, weekday, seat, timetable=None):
+    timetable = timetable or get_timetable()
+    flights = timetable.flights(origin_code, destination_code, weekday, seat)
+    if flights:
+        return LegPlan(flights, seat)
+    # Each weekday's flights are cheapest first, so their first fare is the day's minimum
+    fares = []
+    for day in range(7):
+        others = timetable.flights(origin_code, destination_code, day, seat)
+        if others:
+            fares.append((others[0].fare(seat), day))
+    if not fares:
+        return LegPlan(flights, seat)
+    fare, day = min(fares)
+    return LegPlan(flights, seat, [WEEKDAYS[other] for _, other in fares], (WEEKDAYS[day], fare))
+
+
+def plan_from_database(origin_code, destination_code, weekday, seat):
+    flights = list(Flight.objects.route(origin_code, destination_code, seat).on_day(weekday)
+                   .select_related('origin', 'destination').order_by(f'{seat.lower()}_fare', 'id'))
+    return with_fallback(flights, origin_code, destination_code, seat)
+
+
+def plan_from_instances(origin_code, destination_code, day, seat):
+    flights = [instance.flight for instance in instances_on(origin_code, destination_code, day, seat)]
+    return with_fallback(flights, origin_code, destination_code, seat)
+
+
+def with_fallback(flights, origin_code, destination_code, seat):
+    calendar = None if flights else route_calendar(origin_code, destination_code, seat)
+    if calendar is None:
+        return LegPlan(flights, seat)
+    return LegPlan(flights, seat, calendar.weekday_names, calendar.cheapest_day())
+
+
+def use_timetable():
+    return getattr(settings, 'FLIGHT_SEARCH_TIMETABLE', True)
+
+
+def find_place(code):
+    """Place for an airport code; raises Place.DoesNotExist like the ORM"""
+    if use_timetable():
+        return get_timetable().place(code)
+    place = Place.objects.filter(code=code.upper()).order_by('id').first()
+    if place is None:
+        raise Place.DoesNotExist(f"No airport with code {code!r}")
+    return place
+
+
+def plan_leg(origin_code, destination_code, day, seat):
+    """LegPlan for a route on the date `day` in a seat class"""
+    if isinstance(day, datetime):
+        day = day.date()
+    if use_timetable():
+        return plan_from_timetable(origin_code, destination_code, day.weekday(), seat)
+    if in_horizon(day):
+        return plan_from_instances(origin_code, destination_code, day, seat)
+    return plan_from_database(origin_code, destination_code, day.weekday(), seat)
@@ -0,0 +1,252 @@
+"""
+Flat, filterable search results for the JSON search API.
+
+Local timetable flights, connecting itineraries and Amadeus offers are
+turned into one slotted SearchResult row each, with the values the filters
+and sort orders need (price, departure/arrival, duration, stops, airline)
+precomputed. Filtering and sorting run over those rows on the server, and
+pages are cut with an opaque keyset cursor: the cursor carries the sort
+value and id of the last row served, so the next page starts right after
+it even if rows were added or dropped in between. Only the rows of the page
+being served are converted to JSON.
+"""
+
+import base64
+import bisect
+import binascii
+import json
+from datetime import datetime, timedelta
+
+from .airlines import get_airline_registry, normalize_name
+
+LOCAL_CURRENCY = 'EUR'
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Sort values, all numeric so descending orders can simply negate them
+SORT_KEYS = {
+    'price': lambda result: result.price,
+    'duration': lambda result: result.duration_minutes,
+    'departure': lambda result: result.depart_minutes,
+    'arrival': lambda result: result.arrive_minutes,
+}
+
+
+class InvalidQuery(ValueError):
+    """A filter, sort order or cursor the API cannot use."""
+
+
+def minutes_since(moment, day):
+    return int((moment - day).total_seconds() // 60)
+
+
+class SearchResult:
+    """One bookable option on a search leg, local or from Amadeus."""
+    __slots__ = ('id', 'source', 'airline', 'airline_code', 'origin', 'destination', 'depart',
+                 'arrive', 'depart_minutes', 'arrive_minutes', 'duration_minutes', 'stops',
+                 'price', 'currency', 'offer_id', 'legs')
+
+    def __init__(self, id, source, legs, day, price, currency, airline, airline_code, offer_id=None):
+        first, last = legs[0], legs[-1]
+        self.id = id
+        self.source = source
+        self.legs = legs
+        self.origin = first['origin']
+        self.destination = last['destination']
+        self.depart = first['depart']
+        self.arrive = last['arrive']
+        self.depart_minutes = minutes_since(self.depart, day)
+        self.arrive_minutes = minutes_since(self.arrive, day)
+        self.duration_minutes = self.arrive_minutes - self.depart_minutes
+        self.stops = len(legs) - 1
+        self.price = price
+        self.currency = currency
+        self.airline = airline
+        self.airline_code = airline_code
+        self.offer_id = offer_id
+
+    @classmethod
+    def from_local(cls, flights, day, seat, id):
+        """Row for a chain of timetable flights as (flight, day_offset) pairs"""
+        legs = []
+        for flight, offset in flights:
+            depart = datetime.combine(day + timedelta(days=offset), flight.depart_time)
+            arrive = depart + flight.duration if flight.duration else \
+                datetime.combine(depart.date(), flight.arrival_time)
+            legs.append({
+                'flight_id': flight.id,
+                'airline': flight.airline,
+                'flight_number': None,
+                'plane': flight.plane,
+                'origin': flight.origin.code,
+                'destination': flight.destination.code,
+                'depart': depart,
+                'arrive': arrive,
+            })
+        airline = flights[0][0].airline
+        return cls(id, 'local', legs, day, sum(flight.fare(seat) for flight, _ in flights), LOCAL_CURRENCY,
+                   airline, get_airline_registry().code(airline))
+
+    @classmethod
+    def from_offer(cls, offer, itinerary, day):
+        """Row for one itinerary of an Amadeus offer (0 = outbound, 1 = return)"""
+        segments = offer.itineraries[itinerary]
+        legs = [{
+            'flight_id': None,
+            'airline': segment.airline_name,
+            'flight_number': f"{segment.airline_code}{segment.flight_number}",
+            'plane': segment.aircraft,
+            'origin': segment.origin_code,
+            'destination': segment.destination_code,
+            'depart': segment.departure_time,
+            'arrive': segment.arrival_time,
+        } for segment in segments]
+        first = segments[0]
+        return cls(f"amadeus-{offer.id}", 'amadeus', legs, day, offer.price.total, offer.price.currency,
+                   first.airline_name, first.airline_code, offer_id=offer.id)
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'source': self.source,
+            'offer_id': self.offer_id,
+            'airline': self.airline,
+            'airline_code': self.airline_code,
+            'origin': self.origin,
+            'destination': self.destination,
+            'depart': self.depart.isoformat(),
+            'arrive': self.arrive.isoformat(),
+            'duration_minutes': self.duration_minutes,
+            'stops': self.stops,
+            'price': self.price,
+            'currency': self.currency,
+            'legs': [{**leg, 'depart': leg['depart'].isoformat(), 'arrive': leg['arrive'].isoformat()}
+                     for leg in self.legs],
+        }
+
+
+def local_results(flights, connections, day, seat):
+    """Rows for direct timetable flights and connecting itineraries"""
+    results = [SearchResult.from_local([(flight, 0)], day, seat, f"local-{flight.id}") for flight in flights]
+    for itinerary in connections:
+        segments = itinerary.segments()
+        results.append(SearchResult.from_local(
+            segments, day, seat, 'local-' + '-'.join(str(flight.id) for flight, _ in segments)))
+    return results
+
+
+def amadeus_results(table, itinerary, day):
+    """Rows for one itinerary of every offer in an OfferTable"""
+    results = []
+    for offer in table.offers:
+        segments = offer.itineraries[itinerary] if len(offer.itineraries) > itinerary else ()
+        # Offers with unparseable timestamps cannot be filtered or sorted by time
+        if segments and segments[0].departure_time and segments[-1].arrival_time:
+            results.append(SearchResult.from_offer(offer, itinerary, day))
+    return results
+
+
+class ResultQuery:
+    """Server-side filters, sort order and page position for result rows."""
+
+    def __init__(self, min_price=None, max_price=None, depart_from=None, depart_to=None,
+                 airlines=(), max_stops=None, sort='price', limit=DEFAULT_PAGE_SIZE, cursor=None):
+        self.min_price = min_price
+        self.max_price = max_price
+        # Hours of the day, like the departure time slots on the search page
+        self.depart_from = depart_from
+        self.depart_to = depart_to
+        self.max_stops = max_stops
+        self.descending = sort.startswith('-')
+        self.sort = sort.lstrip('-')
+        if self.sort not in SORT_KEYS:
+            raise InvalidQuery(f"Unknown sort order {sort!r}")
+        self.limit = max(1, min(limit, MAX_PAGE_SIZE))
+        self.cursor = decode_cursor(cursor, sort) if cursor else None
+
+        registry = get_airline_registry()
+        self.airline_codes = set()
+        self.airline_names = set()
+        for airline in airlines:
+            match = registry.get(airline) or registry.find(airline)
+            if match:
+                self.airline_codes.add(match.code)
+            self.airline_names.add(normalize_name(airline))
+
+    @classmethod
+    def from_request(cls, params):
+        """Build a query from GET parameters; raises InvalidQuery on bad values"""
+        def number(name, cast=float):
+            value = params.get(name)
+            if value in (None, ''):
+                return None
+            try:
+                return cast(value)
+            except ValueError:
+                raise InvalidQuery(f"Invalid value for {name}")
+
+        airlines = [airline.strip() for airline in params.get('Airline', '').split(',') if airline.strip()]
+        return cls(
+            min_price=number('MinPrice'),
+            max_price=number('MaxPrice'),
+            depart_from=number('DepartFrom', int),
+            depart_to=number('DepartTo', int),
+            airlines=airlines,
+            max_stops=number('MaxStops', int),
+            sort=params.get('sort', 'price'),
+            limit=number('limit', int) or DEFAULT_PAGE_SIZE,
+            cursor=params.get('cursor'),
+        )
+
+    def matches(self, result):
+        if self.min_price is not None and result.price < self.min_price:
+            return False
+        if self.max_price is not None and result.price > self.max_price:
+            return False
+        if self.max_stops is not None and result.stops > self.max_stops:
+            return False
+        hour = result.depart.hour
+        if self.depart_from is not None and hour < self.depart_from:
+            return False
+        if self.depart_to is not None and hour >= self.depart_to:
+            return False
+        if (self.airline_codes or self.airline_names) and result.airline_code not in self.airline_codes \
+                and normalize_name(result.airline) not in self.airline_names:
+            return False
+        return True
+
+    def key(self, result):
+        value = SORT_KEYS[self.sort](result)
+        return (-value if self.descending else value, result.id)
+
+    def page(self, results):
+        """(page rows, total matching rows, cursor of the next page or None)"""
+        ordered = sorted(((self.key(result), result) for result in results if self.matches(result)),
+                         key=lambda entry: entry[0])
+        keys = [entry[0] for entry in ordered]
+        start = bisect.bisect_right(keys, self.cursor) if self.cursor else 0
+        end = start + self.limit
+        rows = [entry[1] for entry in ordered[start:end]]
+        next_cursor = encode_cursor(self.sort_name, keys[end - 1]) if end < len(ordered) else None
+        return rows, len(ordered), next_cursor
+
+    @property
+    def sort_name(self):
+        return ('-' if self.descending else '') + self.sort
+
+
+def encode_cursor(sort, key):
+    payload = json.dumps([sort, key[0], key[1]], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """(sort value, id) position of a cursor issued for the same sort order"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, value, result_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidQuery("Invalid cursor")
+    if cursor_sort != sort or not isinstance(value, (int, float)) or not isinstance(result_id, str):
+        raise InvalidQuery("Cursor does not belong to this sort order")
+    return (value, result_id)
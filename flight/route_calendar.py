@@ -0,0 +1,117 @@
+"""
+Materialized route calendar: per route and seat class, the weekdays it
+operates, the cheapest fare on each of them and its number of flights.
+
+The "available on other days" fallback and the cheapest-day hint on the
+search page read one RouteCalendar row by its unique key instead of
+scanning the route's flights. Rows are rebuilt in full after bulk schedule
+loads (which bypass model signals) and per route whenever a single Flight
+is saved or deleted. Migrations of this app bump the calendar version, as
+data migrations may rewrite rows.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Flight, Place, RouteCalendar, SEAT_CLASSES, day_bit
+from .versions import bump_version, current_version
+
+VERSION_CACHE_KEY = 'route_calendar_version'
+
+
+def calendar_version():
+    """Stamp that changes whenever any calendar row does; part of derived cache keys"""
+    return current_version(VERSION_CACHE_KEY)
+
+
+def bump_calendar_version():
+    bump_version(VERSION_CACHE_KEY)
+
+
+def summarize(flights):
+    """RouteCalendar rows for (origin code, destination code, depart_days, fares...) tuples"""
+    summaries = {}
+    for origin, destination, depart_days, *fares in flights:
+        for seat, fare in zip(SEAT_CLASSES, fares):
+            # Blank fares are loaded as 0.0: the class is not sold on that flight
+            if not fare or not depart_days:
+                continue
+            entry = summaries.get((origin, destination, seat))
+            if entry is None:
+                entry = summaries[(origin, destination, seat)] = RouteCalendar(
+                    origin_code=origin, destination_code=destination, seat_class=seat,
+                    min_fares=[None] * 7)
+            entry.depart_days |= depart_days
+            entry.flight_count += 1
+            for day in range(7):
+                if depart_days & day_bit(day) and (entry.min_fares[day] is None or fare < entry.min_fares[day]):
+                    entry.min_fares[day] = fare
+    return list(summaries.values())
+
+
+def flight_rows(flights):
+    return flights.values_list('origin__code', 'destination__code', 'depart_days',
+                               *(f'{seat}_fare' for seat in SEAT_CLASSES))
+
+
+def rebuild_route_calendar(batch_size=1000):
+    """Recompute every route from one scan of the Flight table"""
+    rows = summarize(flight_rows(Flight.objects.all()).iterator())
+    with transaction.atomic():
+        RouteCalendar.objects.all().delete()
+        RouteCalendar.objects.bulk_create(rows, batch_size=batch_size)
+    bump_calendar_version()
+    return len(rows)
+
+
+def refresh_route(origin_id, destination_id):
+    """Recompute the calendar rows of one route after a single-flight change"""
+    codes = dict(Place.objects.filter(id__in=[origin_id, destination_id]).values_list('id', 'code'))
+    if origin_id not in codes or destination_id not in codes:
+        return
+    flights = Flight.objects.filter(origin__code=codes[origin_id], destination__code=codes[destination_id])
+    with transaction.atomic():
+        RouteCalendar.objects.filter(origin_code=codes[origin_id], destination_code=codes[destination_id]).delete()
+        RouteCalendar.objects.bulk_create(summarize(flight_rows(flights)))
+    bump_calendar_version()
+
+
+def route_calendar(origin_code, destination_code, seat):
+    """RouteCalendar row for a route and seat class, or None"""
+    return RouteCalendar.objects.filter(
+        origin_code=origin_code.upper(), destination_code=destination_code.upper(), seat_class=seat.lower()
+    ).first()
+
+
+@receiver(pre_save, sender=Flight)
+def remember_route(sender, instance, **kwargs):
+    # A flight moved to another route leaves its old route stale as well
+    instance._calendar_route = None
+    if instance.pk:
+        instance._calendar_route = Flight.objects.filter(pk=instance.pk).values_list(
+            'origin_id', 'destination_id').first()
+
+
+@receiver(post_save, sender=Flight)
+@receiver(post_delete, sender=Flight)
+def flight_route_changed(sender, instance, **kwargs):
+    route = (instance.origin_id, instance.destination_id)
+    previous = getattr(instance, '_calendar_route', None)
+    transaction.on_commit(lambda: refresh_route(*route))
+    if previous and previous != route:
+        transaction.on_commit(lambda: refresh_route(*previous))
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def place_changed(sender, **kwargs):
+    # Rows are keyed by airport code, so a renamed code affects every route of the place
+    transaction.on_commit(rebuild_route_calendar)
+
+
+@receiver(post_migrate)
+def calendar_migrated(sender, app_config, plan=None, **kwargs):
+    # Data migrations rewrite rows without touching the cache; orphan fare calendars built from the old ones
+    if app_config.name == 'flight' and any(migration.app_label == 'flight' for migration, _ in plan or ()):
+        bump_calendar_version()
@@ -0,0 +1,78 @@
+"""
+Synthetic Flight Offers Search payloads for the Amadeus benchmarks.
+
+The offers follow the shape of the real API response (offers, itineraries,
+segments, shared price block) closely enough to exercise normalization,
+logging and rendering without network access.
+"""
+
+from datetime import datetime, timedelta
+
+CARRIERS = ('AF', 'BA', 'LH', 'KL', 'TK', 'EK', 'QR', 'AI')
+HUBS = ('CDG', 'LHR', 'FRA', 'AMS', 'IST', 'DXB', 'DOH', 'BOM')
+
+
+def sample_segment(number, origin, destination, depart, minutes, carrier):
+    arrive = depart + timedelta(minutes=minutes)
+    return {
+        'id': str(number),
+        'carrierCode': carrier,
+        'number': str(100 + number),
+        'aircraft': {'code': '320'},
+        'departure': {'iataCode': origin, 'terminal': '1', 'at': depart.strftime('%Y-%m-%dT%H:%M:%S')},
+        'arrival': {'iataCode': destination, 'terminal': '2', 'at': arrive.strftime('%Y-%m-%dT%H:%M:%S')},
+        'duration': f'PT{minutes // 60}H{minutes % 60}M',
+        'numberOfStops': 0,
+    }
+
+
+def sample_itinerary(index, origin, destination, depart, stops, segment_ids):
+    carrier = CARRIERS[index % len(CARRIERS)]
+    airports = [origin] + [HUBS[(index + i) % len(HUBS)] for i in range(stops)] + [destination]
+    segments = []
+    for leg in range(stops + 1):
+        minutes = 75 + (index * 17 + leg * 31) % 300
+        segments.append(sample_segment(next(segment_ids), airports[leg], airports[leg + 1], depart, minutes, carrier))
+        depart += timedelta(minutes=minutes + 90)
+    total = (depart - timedelta(minutes=90)) - datetime.strptime(segments[0]['departure']['at'], '%Y-%m-%dT%H:%M:%S')
+    total_minutes = int(total.total_seconds() // 60)
+    return {'duration': f'PT{total_minutes // 60}H{total_minutes % 60}M', 'segments': segments}
+
+
+def sample_offers(count=250, origin='DEL', destination='CDG', departure_date='2026-11-02',
+                  return_date='2026-11-09', max_stops=2):
+    """`count` flight offers; round trips when `return_date` is given"""
+    def ids():
+        number = 1
+        while True:
+            yield number
+            number += 1
+
+    offers = []
+    outbound_day = datetime.strptime(departure_date, '%Y-%m-%d')
+    return_day = datetime.strptime(return_date, '%Y-%m-%d') if return_date else None
+    for index in range(count):
+        segment_ids = ids()
+        depart = outbound_day + timedelta(minutes=(index * 37) % (20 * 60))
+        stops = index % (max_stops + 1)
+        itineraries = [sample_itinerary(index, origin, destination, depart, stops, segment_ids)]
+        if return_day:
+            depart = return_day + timedelta(minutes=(index * 53) % (20 * 60))
+            itineraries.append(sample_itinerary(index + 1, destination, origin, depart, stops, segment_ids))
+        base = 150 + (index * 7919) % 900
+        offers.append({
+            'type': 'flight-offer',
+            'id': str(index + 1),
+            'source': 'GDS',
+            'numberOfBookableSeats': 1 + index % 9,
+            'itineraries': itineraries,
+            'price': {
+                'currency': 'EUR',
+                'total': f'{base * 1.18:.2f}',
+                'base': f'{base:.2f}',
+                'fees': [{'amount': '0.00', 'type': 'SUPPLIER'}, {'amount': '0.00', 'type': 'TICKETING'}],
+                'grandTotal': f'{base * 1.18:.2f}',
+            },
+            'validatingAirlineCodes': [CARRIERS[index % len(CARRIERS)]],
+        })
+    return offers
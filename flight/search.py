@@ -0,0 +1,70 @@
+"""
+Search orchestration helpers shared by the flight search views.
+
+Local schedule lookups and live Amadeus searches are independent, so the
+views hand the upstream calls to a shared thread pool, run the local
+lookups on the request thread meanwhile, and wait for the pool up to one
+overall deadline. Whatever finished in time is returned and the rest is
+reported as timed out, so page latency is bounded by the slowest source
+(or the deadline) rather than the sum of all of them. Local lookups never
+wait for a pool thread, so slow upstream calls cannot hold them up.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connections
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'FLIGHT_SEARCH_WORKERS', 8),
+    thread_name_prefix='flight-search',
+)
+
+
+def _run(task):
+    try:
+        return task()
+    finally:
+        # Pool threads outlive the request, so release their DB connections
+        connections.close_all()
+
+
+def gather(tasks, inline=(), timeout=None):
+    """
+    Run `tasks` ({name: callable}) concurrently, waiting at most `timeout`
+    seconds in total (default: settings.FLIGHT_SEARCH_DEADLINE).
+
+    Tasks named in `inline` run on the calling thread once the others have
+    been submitted to the pool; they always run to completion.
+
+    Returns (results, errors, timed_out): results and errors map task names
+    to return values and raised exceptions; timed_out is the set of names
+    not finished at the deadline. Those still queued are cancelled; running
+    ones finish in the background and their results are discarded.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'FLIGHT_SEARCH_DEADLINE', 8.0)
+    deadline = time.monotonic() + timeout
+    futures = {_executor.submit(_run, task): name for name, task in tasks.items() if name not in inline}
+
+    results, errors = {}, {}
+    for name in inline:
+        if name not in tasks:
+            continue
+        try:
+            results[name] = tasks[name]()
+        except Exception as e:
+            errors[name] = e
+
+    wait(futures, timeout=max(deadline - time.monotonic(), 0))
+    timed_out = set()
+    for future, name in futures.items():
+        if not future.done():
+            future.cancel()
+            timed_out.add(name)
+        elif future.exception() is not None:
+            errors[name] = future.exception()
+        else:
+            results[name] = future.result()
+    return results, errors, timed_out
@@ -1,9 +1,19 @@
 from django import template
-from datetime import datetime
+from datetime import datetime, time, timedelta
 import re
 
+from flight.airlines import LOGO_URL, get_airline_registry
+
 register = template.Library()
 
+def readable_duration(hours, minutes):
+    """Format hours and minutes as 2h 30m, 2h or 30m"""
+    if hours > 0 and minutes > 0:
+        return f"{hours}h {minutes}m"
+    elif hours > 0:
+        return f"{hours}h"
+    return f"{minutes}m"
+
 @register.filter
 def parse_iso_time(value):
     """
@@ -12,6 +22,9 @@ def parse_iso_time(value):
     """
     if not value:
         return "--:--"
+    # Amadeus results arrive pre-parsed; only format them
+    if isinstance(value, (datetime, time)):
+        return f"{value.hour:02d}:{value.minute:02d}"
     
     try:
         # Handle various ISO datetime formats
@@ -50,6 +63,8 @@ def parse_iso_date(value):
     """
     if not value:
         return ""
+    if isinstance(value, datetime):
+        return f"{value.day:02d}/{value.month:02d}/{value.year}"
     
     try:
         if 'T' in str(value):
@@ -67,6 +82,9 @@ def format_duration(value):
     """
     if not value:
         return ""
+    if isinstance(value, timedelta):
+        hours, minutes = divmod(int(value.total_seconds() // 60), 60)
+        return readable_duration(hours, minutes)
     
     try:
         # Parse ISO 8601 duration format like PT2H30M
@@ -88,12 +106,8 @@ def format_duration(value):
                 minutes_part = duration_str.split('M')[0]
                 minutes = int(minutes_part) if minutes_part.isdigit() else 0
             
-            if hours > 0 and minutes > 0:
-                return f"{hours}h {minutes}m"
-            elif hours > 0:
-                return f"{hours}h"
-            elif minutes > 0:
-                return f"{minutes}m"
+            if hours > 0 or minutes > 0:
+                return readable_duration(hours, minutes)
         
         return str(value)
     except Exception:
@@ -110,7 +124,7 @@ def get_airline_logo(carrier_code):
     # Clean the carrier code and make it uppercase
     clean_code = str(carrier_code).strip().upper()
     if clean_code:
-        return f"https://www.gstatic.com/flights/airline_logos/70px/{clean_code}.png"
+        return LOGO_URL.format(code=clean_code)
     return ""
 
 @register.filter
@@ -124,7 +138,7 @@ def get_airline_logo_fallback(carrier_code):
     # Clean the carrier code and make it uppercase
     clean_code = str(carrier_code).strip().upper()
     if clean_code:
-        return f"https://www.gstatic.com/flights/airline_logos/70px/{clean_code}.png"
+        return LOGO_URL.format(code=clean_code)
     return "data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iNzAiIGhlaWdodD0iNzAiIHZpZXdCb3g9IjAgMCA3MCA3MCIgZmlsbD0ibm9uZSIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHJlY3Qgd2lkdGg9IjcwIiBoZWlnaHQ9IjcwIiByeD0iMzUiIGZpbGw9IiMwMDdiZmYiLz4KPHN2ZyB4PSIxNSIgeT0iMjAiIHdpZHRoPSI0MCIgaGVpZ2h0PSIzMCIgdmlld0JveD0iMCAwIDQ0MCAzODQiIGZpbGw9IndoaXRlIj4KPHA+CQ=="
 
 @register.filter
@@ -135,50 +149,11 @@ def get_airline_code_from_name(airline_name):
     if not airline_name:
         return ""
     
-    # Map common airline names to codes
-    airline_mapping = {
-        'Air India': 'AI',
-        'IndiGo': '6E',
-        'SpiceJet': 'SG',
-        'Vistara': 'UK',
-        'Go First': 'G8',
-        'AirAsia India': 'I5',
-        'American Airlines': 'AA',
-        'Delta Air Lines': 'DL',
-        'United Airlines': 'UA',
-        'Southwest Airlines': 'WN',
-        'British Airways': 'BA',
-        'Lufthansa': 'LH',
-        'Air France': 'AF',
-        'KLM': 'KL',
-        'Emirates': 'EK',
-        'Qatar Airways': 'QR',
-        'Singapore Airlines': 'SQ',
-        'Turkish Airlines': 'TK',
-        'Cathay Pacific': 'CX',
-        'Japan Airlines': 'JL',
-        'All Nippon Airways': 'NH',
-        'Korean Air': 'KE',
-        'Thai Airways': 'TG',
-        'Malaysian Airlines': 'MH',
-        'China Airlines': 'CI',
-        'Air Canada': 'AC',
-        'Air China': 'CA',
-        'China Eastern': 'MU',
-        'China Southern': 'CZ',
-    }
-    
-    # Clean airline name
+    # Known carriers resolve through the shared registry
     clean_name = str(airline_name).strip()
-    
-    # Direct mapping
-    if clean_name in airline_mapping:
-        return airline_mapping[clean_name]
-    
-    # Try partial matching
-    for name, code in airline_mapping.items():
-        if name.lower() in clean_name.lower() or clean_name.lower() in name.lower():
-            return code
+    airline_code = get_airline_registry().code(clean_name)
+    if airline_code:
+        return airline_code
     
     # Fallback: create code from first letters
     words = clean_name.split()
@@ -201,6 +176,6 @@ def get_local_airline_logo(airline_name):
     airline_code = get_airline_code_from_name(airline_name)
     
     if airline_code:
-        return f"https://www.gstatic.com/flights/airline_logos/70px/{airline_code}.png"
+        return LOGO_URL.format(code=airline_code)
     
     return ""
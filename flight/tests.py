@@ -1,3 +1,764 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time as clock
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .airports import AirportIndex
+from .amadeus_http import AmadeusConnection, AsyncAmadeusClient
+from .bookings import PAGE_SIZE
+from .connections import find_connections
+from .fare_calendar import fare_calendar
+from .offer_cache import OfferCache
+from .offers import OfferTable
+from .pairing import top_round_trips
+from .instances import rebuild_flight_instances, refresh_flights
+from .inventory import SoldOut, capacity, expire_holds, hold_minutes, release_tickets, reserve
+from .models import Flight, FlightInstance, Passenger, Place, SEAT_CLASSES, SeatInventory, Ticket, User, day_bit
+from .planner import plan_from_database, plan_from_instances, plan_from_timetable
+from .route_calendar import rebuild_route_calendar
+from .search import _executor, gather
+from .timetable import get_timetable, invalidate_timetable
+from .utils import load_schedules, sync_schedules
+from .views import amadeus_service
+
+# Version stamps and cached horizons must not leak in from the shared cache
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def add_flight(origin, destination, weekdays, depart, economy, business=0.0, first=0.0, airline='Air India'):
+    days = 0
+    for day in weekdays:
+        days |= day_bit(day)
+    return Flight.objects.create(
+        origin=origin, destination=destination, depart_time=depart, depart_days=days,
+        duration=timedelta(hours=2), arrival_time=time((depart.hour + 2) % 24, depart.minute),
+        plane='A320', airline=airline, economy_fare=economy, business_fare=business, first_fare=first,
+    )
+
+
+def schedule_row(origin, destination, depart, weekday, economy='4589', business='', airline='Go First', plane='G8334'):
+    return (f"0,{origin},{destination},{depart},{weekday},02:10:00,10:10:00,{weekday},{plane},G8,{airline},"
+            f"{economy},{business},\n")
+
+
+def amadeus_segment(segment_id, carrier, number, origin, depart, destination, arrive, duration):
+    return {
+        'id': segment_id, 'carrierCode': carrier, 'number': number, 'aircraft': {'code': '320'},
+        'departure': {'iataCode': origin, 'terminal': '3', 'at': depart},
+        'arrival': {'iataCode': destination, 'at': arrive},
+        'duration': duration, 'numberOfBookableSeats': 4, 'bookingClass': 'Y',
+    }
+
+
+# Two Flight Offers Search offers: a round trip and a one-stop one-way
+AMADEUS_OFFERS = [
+    {'id': '1', 'price': {'total': '412.50', 'base': '380.00', 'currency': 'EUR'}, 'itineraries': [
+        {'segments': [amadeus_segment('1', 'AI', '101', 'DEL', '2026-11-02T09:30:00', 'CDG', '2026-11-02T15:00:00', 'PT9H')]},
+        {'segments': [amadeus_segment('2', 'AI', '102', 'CDG', '2026-11-09T19:00:00', 'DEL', '2026-11-10T07:10:00', 'PT7H40M')]},
+    ]},
+    {'id': '2', 'price': {'total': '298.00', 'base': '260.00', 'currency': 'EUR'}, 'itineraries': [
+        {'segments': [
+            amadeus_segment('3', '6E', '21', 'DEL', '2026-11-02T01:00:00', 'DXB', '2026-11-02T03:30:00', 'PT4H'),
+            amadeus_segment('4', 'EK', '73', 'DXB', '2026-11-02T06:00:00', 'CDG', '2026-11-02T11:00:00', 'PT7H'),
+        ]},
+    ]},
+]
+
+
+class ScheduleTestCase(TestCase):
+    """A small weekly schedule; blank business/first fares are 0.0, as the CSV loader stores them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.delhi = Place.objects.create(city='Delhi', airport='Indira Gandhi', code='DEL', country='India')
+        cls.mumbai = Place.objects.create(city='Mumbai', airport='Chhatrapati Shivaji', code='BOM', country='India')
+        cls.paris = Place.objects.create(city='Paris', airport='Charles de Gaulle', code='CDG', country='France')
+        # Economy-only flights next to ones selling every class
+        add_flight(cls.delhi, cls.mumbai, [0, 2], time(6, 0), 80.0, airline='Go First')
+        add_flight(cls.delhi, cls.mumbai, [0], time(9, 30), 120.0, 300.0, 500.0)
+        add_flight(cls.delhi, cls.mumbai, [0, 4], time(18, 0), 95.0, 280.0)
+        # Same economy fare as the 18:00 flight: ties are broken by id
+        add_flight(cls.delhi, cls.mumbai, [0], time(13, 0), 95.0, airline='Go First')
+        add_flight(cls.mumbai, cls.delhi, [1, 3], time(7, 15), 85.0, 310.0)
+        add_flight(cls.mumbai, cls.delhi, [3], time(20, 0), 70.0, airline='Go First')
+        add_flight(cls.delhi, cls.paris, [5], time(1, 45), 450.0, 1200.0, 2400.0)
+        rebuild_route_calendar()
+
+    def setUp(self):
+        invalidate_timetable()
+
+    def routes(self):
+        return [('DEL', 'BOM'), ('BOM', 'DEL'), ('DEL', 'CDG'), ('CDG', 'DEL')]
+
+    def assertSamePlan(self, plan, expected):
+        self.assertEqual([flight.id for flight in plan.flights], [flight.id for flight in expected.flights])
+        self.assertEqual((plan.min_price, plan.max_price), (expected.min_price, expected.max_price))
+        self.assertEqual(plan.available_days, expected.available_days)
+        self.assertEqual(plan.cheapest_day, expected.cheapest_day)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class SearchPlanQueryTests(ScheduleTestCase):
+    def test_database_plan_matches_timetable_in_at_most_two_queries(self):
+        timetable = get_timetable()
+        for origin, destination in self.routes():
+            for seat in SEAT_CLASSES:
+                for weekday in range(7):
+                    with self.subTest(route=(origin, destination), seat=seat, weekday=weekday):
+                        with self.assertNumQueries(0):
+                            expected = plan_from_timetable(origin, destination, weekday, seat, timetable)
+                        # The day's flights, plus the route calendar only when there are none
+                        with self.assertNumQueries(1 if expected.flights else 2):
+                            plan = plan_from_database(origin, destination, weekday, seat)
+                        self.assertSamePlan(plan, expected)
+
+    def test_equal_fares_are_ordered_by_id(self):
+        flights = get_timetable().flights('DEL', 'BOM', 0, 'economy')
+        self.assertEqual([flight.fare('economy') for flight in flights], [80.0, 95.0, 95.0, 120.0])
+        self.assertLess(flights[1].id, flights[2].id)
+
+    def test_unsold_classes_are_not_offered(self):
+        plan = plan_from_database('DEL', 'BOM', 0, 'business')
+        self.assertEqual([flight.fare('business') for flight in plan.flights], [280.0, 300.0])
+        # Wednesday only has the economy-only flight
+        plan = plan_from_database('DEL', 'BOM', 2, 'business')
+        self.assertEqual(plan.flights, [])
+        self.assertEqual(plan.available_days, ['Monday', 'Friday'])
+        self.assertEqual(plan.cheapest_day, ('Monday', 280.0))
+        self.assertEqual(plan_from_database('BOM', 'DEL', 3, 'first').flights, [])
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class InstancePlanTests(ScheduleTestCase):
+    # A Monday
+    START = date(2026, 11, 2)
+
+    def setUp(self):
+        super().setUp()
+        rebuild_flight_instances(days=14, today=self.START)
+
+    def test_instance_plan_matches_timetable_in_at_most_two_queries(self):
+        timetable = get_timetable()
+        for origin, destination in self.routes():
+            for seat in SEAT_CLASSES:
+                for offset in range(14):
+                    day = self.START + timedelta(days=offset)
+                    with self.subTest(route=(origin, destination), seat=seat, day=day):
+                        expected = plan_from_timetable(origin, destination, day.weekday(), seat, timetable)
+                        with self.assertNumQueries(1 if expected.flights else 2):
+                            plan = plan_from_instances(origin, destination, day, seat)
+                        self.assertSamePlan(plan, expected)
+
+    def test_unsold_classes_have_no_seats(self):
+        instances = FlightInstance.objects.filter(flight__airline='Go First')
+        self.assertTrue(instances.exists())
+        self.assertFalse(instances.exclude(business_seats=0, first_seats=0).exists())
+        self.assertFalse(instances.filter(economy_seats=0).exists())
+
+    def test_refresh_flights_only_regenerates_their_departures(self):
+        flight = Flight.objects.get(origin=self.mumbai, destination=self.delhi, airline='Go First')
+        others = set(FlightInstance.objects.exclude(flight=flight).values_list('id', flat=True))
+        # A bulk update, as a schedule sync makes, fires no post_save
+        Flight.objects.filter(id=flight.id).update(business_fare=250.0)
+        refresh_flights([flight.id])
+        self.assertEqual(set(FlightInstance.objects.exclude(flight=flight).values_list('id', flat=True)), others)
+        self.assertEqual(set(flight.instances.values_list('business_fare', 'business_seats')),
+                         {(250.0, capacity('business'))})
+        # Now the cheapest business fare on Thursday
+        plan = plan_from_instances('BOM', 'DEL', self.START + timedelta(days=3), 'business')
+        self.assertEqual([f.fare('business') for f in plan.flights], [250.0, 310.0])
+
+
+@override_settings(CACHES=LOCAL_CACHE, FLIGHT_SEAT_CAPACITY={'economy': 6, 'business': 2, 'first': 1})
+class SeatInventoryTests(ScheduleTestCase):
+    DAY = date(2026, 11, 7)
+
+    def setUp(self):
+        super().setUp()
+        self.flight = Flight.objects.get(origin=self.delhi, destination=self.paris)
+
+    def book(self, user, ref_no, seats, status='PENDING', minutes_ago=0):
+        reserve(self.flight.id, self.DAY, 'economy', seats)
+        return Ticket.objects.create(user=user, ref_no=ref_no, flight=self.flight, flight_ddate=self.DAY,
+                                     seat_class='economy', status=status, seats_held=seats,
+                                     booking_date=timezone.now() - timedelta(minutes=minutes_ago))
+
+    def available(self):
+        return SeatInventory.objects.get(flight=self.flight, flight_date=self.DAY, seat_class='economy').available
+
+    def test_reserve_stops_at_capacity(self):
+        self.book(None, 'INV001', 4)
+        with self.assertRaises(SoldOut):
+            reserve(self.flight.id, self.DAY, 'economy', 3)
+        self.assertEqual(self.available(), 2)
+        reserve(self.flight.id, self.DAY, 'economy', 2)
+        self.assertEqual(self.available(), 0)
+
+    def test_expired_holds_are_released_for_new_bookings(self):
+        expired = self.book(None, 'INV001', 4, minutes_ago=hold_minutes() + 1)
+        self.book(None, 'INV002', 2, status='CONFIRMED', minutes_ago=hold_minutes() + 1)
+        # The row is full, so reserve releases the expired hold before giving up
+        reserve(self.flight.id, self.DAY, 'economy', 3)
+        expired.refresh_from_db()
+        self.assertEqual((expired.status, expired.seats_held), ('CANCELLED', 0))
+        self.assertEqual(self.available(), 1)
+        self.assertEqual(expire_holds(), 0)
+
+    def test_release_tickets_releases_each_ticket_once(self):
+        ticket = self.book(None, 'INV001', 3)
+        self.book(None, 'INV002', 2)
+        stale = Ticket.objects.get(id=ticket.id)
+        self.assertEqual(release_tickets([ticket]), 3)
+        # A concurrent cancel still holding the old seat count releases nothing
+        self.assertEqual(release_tickets([stale]), 0)
+        self.assertEqual(self.available(), 4)
+
+    def test_pending_only_leaves_tickets_paid_in_the_meantime(self):
+        ticket = self.book(None, 'INV001', 3, minutes_ago=hold_minutes() + 1)
+        Ticket.objects.filter(id=ticket.id).update(status='CONFIRMED')
+        self.assertEqual(release_tickets([ticket], pending_only=True), 0)
+        ticket.refresh_from_db()
+        self.assertEqual((ticket.status, ticket.seats_held), ('CONFIRMED', 3))
+        self.assertEqual(self.available(), 3)
+
+    def test_deleting_a_ticket_releases_its_seats(self):
+        user = User.objects.create(username='flyer')
+        ticket = self.book(user, 'DEL001', 3)
+        self.book(user, 'DEL002', 2)
+        ticket.delete()
+        self.assertEqual(self.available(), 4)
+        # Cascades from the user delete its other tickets
+        user.delete()
+        self.assertEqual(self.available(), 6)
+
+    def test_cancelled_tickets_are_not_released_again_on_delete(self):
+        ticket = self.book(User.objects.create(username='flyer'), 'DEL001', 3)
+        self.book(None, 'DEL002', 2)
+        release_tickets([ticket])
+        ticket.delete()
+        self.assertEqual(self.available(), 4)
+
+    def test_sold_out_departures_are_not_offered(self):
+        rebuild_flight_instances(days=14, today=self.DAY - timedelta(days=5))
+        self.assertEqual(plan_from_instances('DEL', 'CDG', self.DAY, 'economy').flights, [self.flight])
+        self.book(None, 'INV001', 6)
+        plan = plan_from_instances('DEL', 'CDG', self.DAY, 'economy')
+        self.assertEqual(plan.flights, [])
+        self.assertEqual(plan_from_instances('DEL', 'CDG', self.DAY, 'business').flights, [self.flight])
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class BookingsPageQueryTests(ScheduleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='frequent-flyer')
+        self.client.force_login(self.user)
+        self.passengers = Passenger.objects.bulk_create(
+            [Passenger(first_name=f'Check{i}', last_name='Passenger', gender='female') for i in range(3)])
+        self.flights = list(Flight.objects.all())
+        self.start = timezone.now()
+
+    def add_tickets(self, count, offset):
+        # Every third ticket shares its booking date with the next one, to exercise the id tie-break
+        tickets = Ticket.objects.bulk_create([
+            Ticket(user=self.user, ref_no=f'Q{offset + i:05d}', flight=self.flights[i % len(self.flights)],
+                   flight_ddate=self.start.date(), seat_class='economy', status='CONFIRMED',
+                   booking_date=self.start - timedelta(minutes=offset + i - (i % 3 == 1)))
+            for i in range(count)
+        ])
+        Through = Ticket.passengers.through
+        Through.objects.bulk_create([Through(ticket_id=ticket.id, passenger_id=passenger.id)
+                                     for ticket in tickets for passenger in self.passengers[:1 + ticket.id % 3]])
+
+    def get(self, cursor=None):
+        response = self.client.get(reverse('bookings'), {'after': cursor} if cursor else {})
+        self.assertEqual(response.status_code, 200)
+        return response.context['tickets'], response.context['next_cursor']
+
+    def test_every_page_costs_the_same_queries_as_one_ticket(self):
+        self.add_tickets(1, 0)
+        with CaptureQueriesContext(connection) as baseline:
+            self.get()
+        self.add_tickets(99, 1)
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            with self.assertNumQueries(len(baseline)):
+                tickets, cursor = self.get(cursor)
+            seen += tickets
+            pages += 1
+            if cursor is None:
+                break
+        self.assertEqual(pages, -(-100 // PAGE_SIZE))
+        # Every ticket exactly once, newest first
+        expected = Ticket.objects.filter(user=self.user).order_by('-booking_date', '-id').values_list('id', flat=True)
+        self.assertEqual([ticket.id for ticket in seen], list(expected))
+        self.assertEqual([ticket.passenger_count for ticket in seen], [1 + ticket.id % 3 for ticket in seen])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('bookings'), {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class ScheduleLoadTests(TestCase):
+    HEADER = (",origin,destination,depart_time,depart_weekday,duration,arrival_time,arrival_weekday,"
+              "flight_no,airline_code,airline,economy_fare,business_fare,first_fare\n")
+
+    @classmethod
+    def setUpTestData(cls):
+        for code, city in (('DEL', 'Delhi'), ('BOM', 'Mumbai'), ('BLR', 'Bengaluru')):
+            Place.objects.create(city=city, airport=city, code=code, country='India')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def schedule(self, *rows, name='flights.csv'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='') as f:
+            f.write(self.HEADER + ''.join(rows))
+        return path
+
+    def test_load_schedules_collects_bad_rows(self):
+        path = self.schedule(
+            schedule_row('DEL', 'BOM', '08:00:00', 2),
+            schedule_row('DEL', 'XXX', '09:00:00', 2),
+            schedule_row('DEL', 'BOM', '10:00:00', 9),
+            schedule_row('DEL', 'BOM', '25:00:00', 3),
+            schedule_row('BOM', 'BLR', '11:30:00', 4, '3200', '9800'),
+        )
+        report = load_schedules([path])
+        self.assertEqual((report['rows'], report['created']), (5, 2))
+        rejected = {line_no: reason for _, line_no, reason in report['rejected']}
+        self.assertEqual(sorted(rejected), [3, 4, 5])
+        self.assertEqual(rejected[3], "unknown code 'XXX'")
+        self.assertEqual(rejected[4], 'weekday 9 out of range')
+        self.assertIn('25:00:00', rejected[5])
+        flight = Flight.objects.get(origin__code='DEL')
+        self.assertEqual((flight.depart_days, flight.economy_fare, flight.business_fare), (day_bit(2), 4589.0, 0.0))
+        self.assertEqual(Flight.objects.get(origin__code='BOM').business_fare, 9800.0)
+
+    def test_sync_schedules_applies_only_the_differences(self):
+        load_schedules([self.schedule(
+            schedule_row('DEL', 'BOM', '08:00:00', 0),
+            schedule_row('DEL', 'BOM', '08:00:00', 2),
+            schedule_row('BOM', 'DEL', '18:00:00', 1),
+        )])
+        changed = self.schedule(
+            schedule_row('DEL', 'BOM', '08:00:00', 0, economy='4999'),
+            schedule_row('DEL', 'BOM', '08:00:00', 2),
+            schedule_row('BOM', 'BLR', '07:00:00', 5),
+            name='changed.csv',
+        )
+        counts = ('rows', 'inserted', 'updated', 'retired', 'unchanged')
+        preview = sync_schedules([changed], dry_run=True)
+        self.assertEqual(tuple(preview[name] for name in counts), (3, 1, 1, 1, 1))
+        self.assertEqual(Flight.objects.count(), 3)
+        self.assertFalse(Flight.objects.filter(economy_fare=4999.0).exists())
+
+        report = sync_schedules([changed])
+        self.assertEqual(tuple(report[name] for name in counts), (3, 1, 1, 1, 1))
+        self.assertEqual(sorted(Flight.objects.filter(origin__code='DEL').values_list('economy_fare', flat=True)),
+                         [4589.0, 4999.0])
+        self.assertEqual(Flight.objects.get(origin__code='BOM', destination__code='BLR').depart_days, day_bit(5))
+        # Retired departures keep their row (and tickets) but no longer operate
+        self.assertEqual(Flight.objects.get(origin__code='BOM', destination__code='DEL').depart_days, 0)
+
+        again = sync_schedules([changed])
+        self.assertEqual(tuple(again[name] for name in counts), (3, 0, 0, 0, 3))
+
+
+class AirportIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = AirportIndex([
+            Place(city='Adelaide', airport='Adelaide Airport', code='ADL', country='Australia'),
+            Place(city='Delhi', airport='Indira Gandhi', code='DEL', country='India'),
+            Place(city='Del Rio', airport='Del Rio International', code='DRT', country='United States'),
+            Place(city='Mumbai', airport='Chhatrapati Shivaji', code='BOM', country='India'),
+        ])
+
+    def search(self, q, **kwargs):
+        return [place.code for place in self.index.search(q, **kwargs)]
+
+    def test_exact_code_then_city_prefix_then_substring(self):
+        # Del Rio sorts before Delhi, but an exact code match ranks first
+        self.assertEqual(self.search('DEL'), ['DEL', 'DRT', 'ADL'])
+        self.assertEqual(self.search('del', limit=2), ['DEL', 'DRT'])
+        self.assertEqual(self.search('  Adl '), ['ADL'])
+
+    def test_substring_of_any_field(self):
+        self.assertEqual(self.search('india'), ['DEL', 'BOM'])
+        self.assertEqual(self.search('shivaji'), ['BOM'])
+        self.assertEqual(self.search('i', limit=3), ['ADL', 'DRT', 'DEL'])
+        self.assertEqual(self.search(''), [])
+
+
+@override_settings(CACHES=LOCAL_CACHE, FLIGHT_MIN_CONNECTION_MINUTES=60, FLIGHT_MAX_LAYOVER_MINUTES=12 * 60)
+class ConnectionSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        delhi = Place.objects.create(city='Delhi', airport='Indira Gandhi', code='DEL', country='India')
+        mumbai = Place.objects.create(city='Mumbai', airport='Chhatrapati Shivaji', code='BOM', country='India')
+        bengaluru = Place.objects.create(city='Bengaluru', airport='Kempegowda', code='BLR', country='India')
+        # Lands in Mumbai at 08:00 on Monday
+        add_flight(delhi, mumbai, [0], time(6, 0), 100.0)
+        for depart, fare in ((time(8, 30), 40.0), (time(9, 0), 90.0), (time(19, 0), 60.0), (time(21, 0), 30.0)):
+            add_flight(mumbai, bengaluru, [0], depart, fare)
+
+    def setUp(self):
+        invalidate_timetable()
+
+    def onward_departures(self, **options):
+        itineraries = find_connections('DEL', 'BLR', 0, 'economy', **options)
+        for itinerary in itineraries:
+            self.assertEqual([place.code for place in itinerary.via], ['BOM'])
+        return [itinerary.legs[1].flight.depart_time for itinerary in itineraries]
+
+    def test_connections_respect_minimum_connection_and_maximum_layover(self):
+        # 08:30 leaves 30 minutes to connect and 21:00 waits 13 hours; cheapest first
+        self.assertEqual(self.onward_departures(), [time(19, 0), time(9, 0)])
+        self.assertEqual(self.onward_departures(min_connection=30), [time(8, 30), time(19, 0), time(9, 0)])
+        self.assertEqual(self.onward_departures(max_layover=10 * 60), [time(9, 0)])
+        self.assertEqual(self.onward_departures(sort='duration'), [time(9, 0), time(19, 0)])
+
+    def test_no_connections_on_days_without_a_first_leg(self):
+        self.assertEqual(find_connections('DEL', 'BLR', 1, 'economy'), [])
+
+
+class GatherTests(SimpleTestCase):
+    def test_local_tasks_do_not_queue_behind_upstream_calls(self):
+        release = threading.Event()
+        started = []
+
+        def upstream():
+            started.append(1)
+            release.wait(5)
+            return 'late'
+
+        # One more upstream call than there are pool threads, so one is left queued
+        tasks = {f'upstream{n}': upstream for n in range(_executor._max_workers + 1)}
+        tasks['local'] = lambda: 'local'
+        try:
+            results, errors, timed_out = gather(tasks, inline=('local', 'return'), timeout=0.2)
+        finally:
+            release.set()
+        self.assertEqual(results, {'local': 'local'})
+        self.assertEqual(errors, {})
+        self.assertEqual(timed_out, set(tasks) - {'local'})
+        # The queued call was cancelled rather than run after the deadline
+        _executor.submit(lambda: None).result(5)
+        self.assertEqual(len(started), _executor._max_workers)
+
+    def test_inline_errors_are_reported(self):
+        def fail():
+            raise ValueError('bad leg')
+
+        results, errors, timed_out = gather({'outbound': fail, 'amadeus': lambda: []}, inline=('outbound',))
+        self.assertEqual(results, {'amadeus': []})
+        self.assertIsInstance(errors['outbound'], ValueError)
+        self.assertEqual(timed_out, set())
+
+
+class AsyncAmadeusClientTests(SimpleTestCase):
+    def setUp(self):
+        self.client_ = AsyncAmadeusClient(AmadeusConnection('id', 'secret', 'test'))
+
+    async def open_pool(self):
+        return await self.client_._client()
+
+    def test_each_loop_gets_its_own_pool_closed_with_the_loop(self):
+        first = asyncio.run(self.open_pool())
+        second = asyncio.run(self.open_pool())
+        self.assertIsNot(first.http, second.http)
+        self.assertTrue(first.http.is_closed)
+        self.assertTrue(second.http.is_closed)
+        self.assertEqual(len(self.client_._loops), 0)
+
+    def test_concurrent_loops_keep_their_pools(self):
+        pools = []
+        opened = threading.Barrier(2)
+
+        async def use_pool():
+            state = await self.client_._client()
+            # Both loops are running at once; neither may take over the other's pool
+            await asyncio.to_thread(opened.wait, 5)
+            self.assertIs(await self.client_._client(), state)
+            self.assertFalse(state.http.is_closed)
+            pools.append(state)
+
+        threads = [threading.Thread(target=asyncio.run, args=(use_pool(),)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(pools), 2)
+        self.assertIsNot(pools[0].http, pools[1].http)
+        self.assertTrue(all(state.http.is_closed for state in pools))
+
+    def test_aclose_closes_the_running_loops_pool(self):
+        async def open_and_close():
+            state = await self.client_._client()
+            await self.client_.aclose()
+            return state, await self.client_._client()
+
+        closed, reopened = asyncio.run(open_and_close())
+        self.assertTrue(closed.http.is_closed)
+        self.assertIsNot(reopened, closed)
+
+
+@override_settings(CACHES=LOCAL_CACHE, AMADEUS_OFFER_CACHE_TTL=60)
+class OfferCacheTests(SimpleTestCase):
+    PARAMS = {'originLocationCode': 'del', 'destinationLocationCode': 'BOM', 'departureDate': '2026-11-02'}
+
+    def test_concurrent_identical_searches_make_one_upstream_call(self):
+        offers = OfferCache(prefix='test_offers')
+        calls, results = [], []
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return {'data': ['offer']}
+
+        threads = [threading.Thread(target=lambda: results.append(offers.get_or_fetch(self.PARAMS, fetch)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        # Hold the first fetch until the other seven are waiting on it
+        deadline = clock.monotonic() + 5
+        while offers.stats()['coalesced'] < 7 and clock.monotonic() < deadline:
+            clock.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'data': ['offer']}] * 8)
+        # Codes are canonicalized, so the same search in upper case is a cache hit
+        self.assertEqual(offers.get_or_fetch(dict(self.PARAMS, originLocationCode='DEL'), fetch), {'data': ['offer']})
+        self.assertEqual(len(calls), 1)
+        stats = offers.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['coalesced']), (1, 1, 7))
+
+    def test_failed_fetches_are_not_cached(self):
+        offers = OfferCache(prefix='test_offers_failed')
+
+        def fail():
+            raise ConnectionError('upstream down')
+
+        with self.assertRaises(ConnectionError):
+            offers.get_or_fetch(self.PARAMS, fail)
+        self.assertEqual(offers.get_or_fetch(self.PARAMS, lambda: {'data': []}), {'data': []})
+
+
+class OfferTableTests(SimpleTestCase):
+    def test_pickle_round_trip_keeps_offers_shared(self):
+        table = OfferTable.from_amadeus(AMADEUS_OFFERS, airline_name={'AI': 'Air India'}.get)
+        restored = pickle.loads(pickle.dumps(table))
+
+        self.assertEqual(restored.as_dicts(), table.as_dicts())
+        self.assertEqual(restored.as_columns(), table.as_columns())
+        self.assertEqual(restored.price_range(), (298.0, 412.5))
+        self.assertEqual(restored.cheapest().id, '2')
+        # Segments still point at one offer and its single price block
+        first, second = restored.offers
+        self.assertEqual([len(itinerary) for itinerary in first.itineraries], [1, 1])
+        self.assertEqual([segment.amadeus_id for segment in second.segments], ['3', '4'])
+        self.assertTrue(all(segment.offer is second and segment.price is second.price for segment in second.segments))
+        self.assertIs(restored[0].offer, first)
+        self.assertEqual([segment.is_direct for segment in restored], [True, True, False, False])
+        self.assertEqual(restored[3].duration, timedelta(hours=7))
+        self.assertEqual(restored[1].arrival_time.isoformat(), '2026-11-10T07:10:00')
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class SearchApiTests(ScheduleTestCase):
+    def search(self, **params):
+        params = {'Origin': 'DEL', 'Destination': 'BOM', 'DepartDate': '2026-11-02', 'include_amadeus': 'false',
+                  **params}
+        return self.client.get(reverse('search_api'), params)
+
+    def results(self, **params):
+        response = self.search(**params)
+        self.assertEqual(response.status_code, 200)
+        return [(row['depart'][11:16], row['price']) for row in response.json()['results']]
+
+    def test_pages_follow_the_cursor(self):
+        first = self.search(limit=2).json()
+        self.assertEqual(first['total'], 4)
+        self.assertEqual([row['price'] for row in first['results']], [80.0, 95.0])
+        second = self.search(limit=2, cursor=first['next_cursor']).json()
+        self.assertEqual([row['price'] for row in second['results']], [95.0, 120.0])
+        self.assertIsNone(second['next_cursor'])
+        # Equal prices are split across pages without repeating or skipping a row
+        self.assertEqual(len({row['id'] for row in first['results'] + second['results']}), 4)
+
+    def test_filters(self):
+        # Equal prices keep their id order either way
+        self.assertEqual(self.results(MinPrice=90, MaxPrice=100), [('18:00', 95.0), ('13:00', 95.0)])
+        self.assertEqual(self.results(DepartFrom=12, sort='-price'), [('18:00', 95.0), ('13:00', 95.0)])
+        self.assertEqual(self.results(DepartTo=12, sort='-price'), [('09:30', 120.0), ('06:00', 80.0)])
+        self.assertEqual(self.results(Airline='Go First', sort='departure'), [('06:00', 80.0), ('13:00', 95.0)])
+        self.assertEqual(self.results(SeatClass='business'), [('18:00', 280.0), ('09:30', 300.0)])
+
+    def test_invalid_queries_are_rejected(self):
+        cursor = self.search(limit=1).json()['next_cursor']
+        for params in ({'cursor': 'not-a-cursor'}, {'cursor': cursor, 'sort': 'duration'},
+                       {'MinPrice': 'cheap'}, {'sort': 'airline'}, {'Leg': 'return'}):
+            with self.subTest(params=params):
+                response = self.search(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertTrue(response.json()['error'])
+
+
+class RoundTripPairingTests(SimpleTestCase):
+    def option(self, name, price, depart, arrive, offer_id=None):
+        depart = datetime(2026, 11, 2, *depart)
+        arrive = datetime(2026, 11, 2, *arrive)
+        return SimpleNamespace(id=name, price=price, depart=depart, arrive=arrive, offer_id=offer_id,
+                               duration_minutes=int((arrive - depart).total_seconds() // 60), currency='EUR')
+
+    def setUp(self):
+        # A day trip, so some returns leave before (or just after) the outbound lands
+        self.outbound = [self.option('B', 150.0, (12, 0), (14, 0)), self.option('A', 100.0, (8, 0), (10, 0)),
+                         self.option('C', 300.0, (6, 0), (7, 0))]
+        self.inbound = [self.option('Y', 80.0, (18, 0), (21, 0)), self.option('X', 50.0, (11, 0), (12, 0))]
+        self.offers = ([self.option('O', 200.0, (7, 0), (11, 0), offer_id='1')],
+                       [self.option('O', 200.0, (15, 0), (19, 0), offer_id='1')])
+
+    def pairs(self, *args, **kwargs):
+        return [(pair.outbound.id + pair.inbound.id, pair.total_fare)
+                for pair in top_round_trips(self.outbound, self.inbound, *args, **kwargs)]
+
+    @override_settings(FLIGHT_MIN_TURNAROUND_MINUTES=120)
+    def test_pairs_ranked_by_total_fare_with_a_minimum_turnaround(self):
+        # AX leaves 60 minutes after landing and BX before it
+        self.assertEqual(self.pairs(), [('AY', 180.0), ('BY', 230.0), ('CX', 350.0), ('CY', 380.0)])
+        self.assertEqual(self.pairs(self.offers, limit=3), [('AY', 180.0), ('OO', 200.0), ('BY', 230.0)])
+
+    @override_settings(FLIGHT_MIN_TURNAROUND_MINUTES=30)
+    def test_turnaround_limit_comes_from_settings(self):
+        self.assertEqual(self.pairs(limit=2), [('AX', 150.0), ('AY', 180.0)])
+
+    @override_settings(FLIGHT_MIN_TURNAROUND_MINUTES=120)
+    def test_pairs_ranked_by_total_duration(self):
+        pairs = top_round_trips(self.outbound, self.inbound, self.offers, sort='duration')
+        self.assertEqual([(pair.outbound.id + pair.inbound.id, pair.total_minutes) for pair in pairs],
+                         [('CX', 120), ('CY', 240), ('BY', 300), ('AY', 300), ('OO', 480)])
+        with self.assertRaises(ValueError):
+            top_round_trips(self.outbound, self.inbound, sort='stops')
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class FareCalendarTests(ScheduleTestCase):
+    # DEL-BOM is cheapest at 80 on Monday and Wednesday and 95 on Friday; BOM-DEL at 85 on Tuesday, 70 on Thursday
+    MATRIX = [
+        [165.0, None, 150.0, None, None],
+        [None, None, None, None, None],
+        [None, None, 150.0, None, None],
+        [None, None, None, None, None],
+        [None, None, None, None, None],
+    ]
+
+    def calendar(self, **kwargs):
+        return fare_calendar('del', 'bom', 'Economy', date(2026, 11, 4), date(2026, 11, 5), days=2, **kwargs)
+
+    def test_round_trip_matrix(self):
+        for timetable in (True, False):
+            with self.subTest(timetable=timetable), self.settings(FLIGHT_SEARCH_TIMETABLE=timetable):
+                calendar = self.calendar()
+                self.assertEqual(calendar['departures'][0], '2026-11-02')
+                self.assertEqual(calendar['returns'][-1], '2026-11-07')
+                self.assertEqual(calendar['outbound'], [80.0, None, 80.0, None, 95.0])
+                self.assertEqual(calendar['inbound'], [85.0, None, 70.0, None, None])
+                # No combined fare where a leg does not operate or the return comes first
+                self.assertEqual(calendar['matrix'], self.MATRIX)
+
+    def test_window_skips_past_dates(self):
+        calendar = self.calendar(today=date(2026, 11, 4))
+        self.assertEqual(calendar['departures'], ['2026-11-04', '2026-11-05', '2026-11-06'])
+        self.assertEqual(calendar['returns'][0], '2026-11-04')
+        self.assertEqual(calendar['matrix'], [[None, 150.0, None, None], [None] * 4, [None] * 4])
+
+
+class FlexibleDatesTests(SimpleTestCase):
+    def test_lines_stream_as_searches_complete(self):
+        depart = date.today() + timedelta(days=30)
+        produced = []
+
+        def search_dates(searches, travel_class):
+            yield searches[0], {'error': True, 'message': 'No offers'}
+            produced.append(searches[1])
+            yield searches[1], {'flights': SimpleNamespace(cheapest=lambda: SimpleNamespace(
+                id='7', price=SimpleNamespace(total=199.0, currency='EUR'))), 'count': 3}
+
+        amadeus_service.search_dates = search_dates
+        try:
+            response = self.client.get(reverse('amadeus_flexible_dates'), {
+                'Origin': 'del', 'Destination': 'cdg', 'DepartDate': depart.isoformat(), 'Days': 1})
+            self.assertFalse(response.is_async)
+            lines = iter(response.streaming_content)
+            first = json.loads(next(lines))
+            # The first date is sent before the second search has finished
+            self.assertEqual(produced, [])
+            second = json.loads(next(lines))
+        finally:
+            del amadeus_service.search_dates
+        self.assertEqual((first['date'], first['error'], first['cheapest']),
+                         ((depart - timedelta(days=1)).isoformat(), 'No offers', None))
+        self.assertEqual((second['date'], second['offers'], second['cheapest']),
+                         (depart.isoformat(), 3, {'offer_id': '7', 'total': 199.0, 'currency': 'EUR'}))
+
+
+@override_settings(CACHES=LOCAL_CACHE, FLIGHT_SEAT_CAPACITY={'economy': 4, 'business': 2, 'first': 1})
+class BookingWriteTests(ScheduleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create(username='flyer'))
+        self.outbound = Flight.objects.get(origin=self.delhi, destination=self.mumbai, depart_time=time(9, 30))
+        self.inbound = Flight.objects.get(origin=self.mumbai, destination=self.delhi, depart_time=time(7, 15))
+
+    def book(self, passengers):
+        form = {
+            'flight1': self.outbound.id, 'flight1Date': '02-11-2026', 'flight1Class': 'Economy',
+            'flight2': self.inbound.id, 'flight2Date': '03-11-2026', 'flight2Class': 'Economy',
+            'countryCode': '91', 'mobile': '5550100', 'email': 'flyer@example.com',
+            'passengersCount': len(passengers),
+        }
+        for i, name in enumerate(passengers, start=1):
+            form.update({f'passenger{i}FName': name, f'passenger{i}LName': 'Flyer', f'passenger{i}Gender': 'Female'})
+        return self.client.post('/flight/ticket/book', form)
+
+    def available(self, flight):
+        return SeatInventory.objects.filter(flight=flight, seat_class='economy').values_list('available', flat=True).first()
+
+    def test_round_trip_books_both_legs(self):
+        response = self.book(['Asha', 'Ravi'])
+        self.assertEqual(response.status_code, 200)
+        tickets = Ticket.objects.order_by('flight_ddate')
+        self.assertEqual([(ticket.flight_id, ticket.seats_held, ticket.passengers.count()) for ticket in tickets],
+                         [(self.outbound.id, 2, 2), (self.inbound.id, 2, 2)])
+        self.assertEqual((self.available(self.outbound), self.available(self.inbound)), (2, 2))
+
+    def test_sold_out_return_leaves_no_partial_booking(self):
+        reserve(self.inbound.id, date(2026, 11, 3), 'economy', 3)
+        response = self.book(['Asha', 'Ravi'])
+        self.assertContains(response, 'Fewer than 2 economy seats left')
+        # The outbound reservation, passengers and tickets are rolled back with it
+        self.assertFalse(Ticket.objects.exists())
+        self.assertFalse(Passenger.objects.exists())
+        self.assertIn(self.available(self.outbound), (None, 4))
+        self.assertEqual(self.available(self.inbound), 1)
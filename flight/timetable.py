@@ -0,0 +1,124 @@
+"""
+In-memory weekly timetable for local flight search.
+
+The schedule only changes when the CSV loaders run or an admin edits a
+flight, so each process keeps one index of the whole timetable keyed by
+(origin code, destination code, weekday, seat class) with fare-sorted
+flight records. Searches are answered from memory without touching the
+database.
+
+The index is built on first use. Any change to Flight or Place bumps a
+version stamp in the Django cache; each process compares its own stamp on
+lookup and rebuilds when it is stale. The cache is shared between worker
+processes (settings.CACHES), so an invalidation in one reaches them all.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Flight, Place, SEAT_CLASSES, WEEKDAYS, day_bit
+from .versions import VersionedIndex
+
+VERSION_CACHE_KEY = 'flight_timetable_version'
+
+
+class TimetableFlight:
+    """Compact, read-only view of a Flight row as used by the search templates."""
+    __slots__ = ('id', 'origin', 'destination', 'depart_time', 'arrival_time', 'duration',
+                 'plane', 'airline', 'economy_fare', 'business_fare', 'first_fare')
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    def fare(self, seat):
+        """Fare for the given seat class"""
+        return getattr(self, f'{seat.lower()}_fare')
+
+    def __repr__(self):
+        return f"<TimetableFlight {self.id}: {self.origin.code} to {self.destination.code}>"
+
+
+class Timetable:
+    """Weekly timetable index for one snapshot of the Flight table."""
+
+    def __init__(self, places, routes, version=None):
+        self.places = places
+        self.routes = routes
+        self.version = version
+
+    @classmethod
+    def build(cls, version=None):
+        """Load the whole schedule with two queries and index it"""
+        places_by_id = {place.id: place for place in Place.objects.order_by('id')}
+        places = {}
+        for place in places_by_id.values():
+            places.setdefault(place.code, place)
+
+        routes = {}
+        columns = ('id', 'origin_id', 'destination_id', 'depart_time', 'arrival_time', 'duration',
+                   'plane', 'airline', 'economy_fare', 'business_fare', 'first_fare')
+        # In id order, so the stable fare sort breaks ties by id like the database planner
+        for values in Flight.objects.values('depart_days', *columns).order_by('id').iterator():
+            depart_days = values.pop('depart_days')
+            weekdays = [day for day in range(7) if depart_days & day_bit(day)]
+            if not weekdays:
+                continue
+            values['origin'] = places_by_id[values.pop('origin_id')]
+            values['destination'] = places_by_id[values.pop('destination_id')]
+            record = TimetableFlight(**values)
+            for seat in SEAT_CLASSES:
+                if not record.fare(seat):
+                    continue
+                for weekday in weekdays:
+                    key = (record.origin.code, record.destination.code, weekday, seat)
+                    routes.setdefault(key, []).append(record)
+
+        for key, records in routes.items():
+            records.sort(key=lambda record, seat=key[3]: record.fare(seat))
+            routes[key] = tuple(records)
+        return cls(places, routes, version)
+
+    def place(self, code):
+        """Place for an airport code; raises Place.DoesNotExist like the ORM"""
+        try:
+            return self.places[code.upper()]
+        except KeyError:
+            raise Place.DoesNotExist(f"No airport with code {code!r}")
+
+    def flights(self, origin_code, destination_code, weekday, seat):
+        """Flights operating on `weekday` (0 = Monday), cheapest first"""
+        return self.routes.get((origin_code.upper(), destination_code.upper(), weekday, seat.lower()), ())
+
+    def operating_days(self, origin_code, destination_code, seat):
+        """Names of the weekdays the route operates in the given seat class"""
+        return [name for weekday, name in enumerate(WEEKDAYS)
+                if self.flights(origin_code, destination_code, weekday, seat)]
+
+
+def fare_bounds(flights, seat):
+    """(min, max) fare of a cheapest-first flight list, or (0, 0) when empty"""
+    if not flights:
+        return 0, 0
+    return flights[0].fare(seat), flights[-1].fare(seat)
+
+
+_timetable = VersionedIndex(VERSION_CACHE_KEY, Timetable.build)
+
+
+def get_timetable():
+    """Return this process's timetable, rebuilding it if it is missing or stale"""
+    return _timetable.get()
+
+
+def invalidate_timetable():
+    """Mark every process's timetable stale; call after bulk schedule writes"""
+    _timetable.invalidate()
+
+
+@receiver(post_save, sender=Flight)
+@receiver(post_delete, sender=Flight)
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def flight_changed(sender, **kwargs):
+    invalidate_timetable()
@@ -7,9 +7,15 @@ urlpatterns = [
     path("logout", views.logout_view, name="logout"),
     path("register", views.register_view, name="register"),
     path("query/places/<str:q>", views.query, name="query"),
+    path("query/connections", views.query_connections, name="query_connections"),
+    path("api/search", views.search_api, name="search_api"),
+    path("api/round-trips", views.round_trip_api, name="round_trip_api"),
+    path("api/fare-calendar", views.fare_calendar_api, name="fare_calendar_api"),
     path("amadeus/search", views.amadeus_flight_search, name="amadeus_search"),
     path("amadeus/airports/<str:q>", views.amadeus_airport_suggestions, name="amadeus_airports"),
     path("amadeus/price-analysis", views.amadeus_flight_price_analysis, name="amadeus_price_analysis"),
+    path("amadeus/flexible-dates", views.amadeus_flexible_dates, name="amadeus_flexible_dates"),
+    path("amadeus/cache-stats", views.amadeus_cache_stats, name="amadeus_cache_stats"),
     path("flight", views.unified_flight_search, name="flight"),  # Updated to use unified search
     path("unified-search", views.unified_flight_search, name="unified_search"),
     path("enhanced-search", views.enhanced_search, name="enhanced_search"),
@@ -1,93 +1,243 @@
+import csv
+import time
 from datetime import timedelta, datetime
+from django.db import transaction
+from django.db.models import F
 from flight.models import *
-from .models import Week, Place, Flight
-from tqdm import tqdm
+from .models import Week, Place, Flight, day_bit
+from .timetable import invalidate_timetable
+from .route_calendar import rebuild_route_calendar
+from .instances import rebuild_flight_instances, refresh_flights
+from .airports import invalidate_airport_index
 
-def get_number_of_lines(file):
-    with open(file) as f:
-        for i, l in enumerate(f):
-            pass
-    return i + 1
+SCHEDULE_FILES = ["./Data/domestic_flights.csv", "./Data/international_flights.csv"]
 
 def createWeekDays():
     days = ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']
-    for i,day in enumerate(days):
-        Week.objects.create(number=i, name=day)
+    Week.objects.bulk_create([Week(number=i, name=day) for i, day in enumerate(days)])
 
 def addPlaces():
-    file = open("./Data/airports.csv", "r")
     print("Adding Airports...")
-    total = get_number_of_lines("./Data/airports.csv")
-    for i, line in tqdm(enumerate(file), total=total):
-        if i == 0:
-            continue
-        data = line.split(',')
-        city = data[0].strip()
-        airport = data[1].strip()
-        code = data[2].strip()
-        country = data[3].strip()
-        try:
-            Place.objects.create(city=city, airport=airport, code=code, country=country)
-        except Exception as e:
-            continue
-    print("Done.\n")
+    with open("./Data/airports.csv", newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        places = [
+            Place(city=row[0].strip(), airport=row[1].strip(), code=row[2].strip(), country=row[3].strip())
+            for row in reader if len(row) >= 4
+        ]
+    Place.objects.bulk_create(places)
+    invalidate_timetable()
+    invalidate_airport_index()
+    print(f"Done. {len(places)} added.\n")
+
+def bootstrap_status():
+    """
+    Return the names of the reference tables that are still empty.
+    Uses EXISTS queries only, so it is cheap enough to run at worker startup.
+    """
+    missing = []
+    if not Week.objects.exists():
+        missing.append('weekdays')
+    if not Place.objects.exists():
+        missing.append('places')
+    if not Flight.objects.exists():
+        missing.append('flights')
+    return missing
+
+def parse_schedule_row(row):
+    """
+    Parse one schedule CSV row into (fields, weekday) where `fields` holds the
+    Flight column values with origin/destination still as airport codes.
+    Raises ValueError/IndexError on malformed rows.
+    """
+    duration = row[5].strip()
+    fields = {
+        'origin': row[1].strip(),
+        'destination': row[2].strip(),
+        'depart_time': datetime.strptime(row[3].strip(), "%H:%M:%S").time(),
+        'duration': timedelta(hours=int(duration[:2]), minutes=int(duration[3:5])),
+        'arrival_time': datetime.strptime(row[6].strip(), "%H:%M:%S").time(),
+        'plane': row[8].strip(),
+        'airline': row[10].strip(),
+        'economy_fare': float(row[11].strip()) if row[11].strip() else 0.0,
+        'business_fare': float(row[12].strip()) if row[12].strip() else 0.0,
+        'first_fare': float(row[13].strip()) if row[13].strip() else 0.0,
+    }
+    weekday = int(row[4].strip())
+    if not 0 <= weekday <= 6:
+        raise ValueError(f"weekday {weekday} out of range")
+    return fields, weekday
+
+def iter_schedule_rows(path):
+    """Stream (line_no, row) pairs from a schedule CSV, skipping the header."""
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for line_no, row in enumerate(reader, start=2):
+            yield line_no, row
+
+def load_schedules(paths=SCHEDULE_FILES, batch_size=1000):
+    """
+    Bulk-load flight schedules from CSV files.
+
+    Airport codes are resolved from one in-memory code->Place map and flights
+    are written with batched bulk_create inside a single transaction. Bad
+    rows are collected instead of aborting the load. Returns a dict with
+    `rows`, `created`, `rejected` (a list of (path, line_no, reason) tuples)
+    and `seconds`.
+    """
+    started = time.perf_counter()
+    places = {}
+    for place in Place.objects.all():
+        places.setdefault(place.code, place)
+
+    report = {'rows': 0, 'created': 0, 'rejected': []}
+    pending = []
+
+    def flush():
+        Flight.objects.bulk_create(pending, batch_size=batch_size)
+        report['created'] += len(pending)
+        pending.clear()
+
+    with transaction.atomic():
+        for path in paths:
+            for line_no, row in iter_schedule_rows(path):
+                report['rows'] += 1
+                try:
+                    fields, weekday = parse_schedule_row(row)
+                    origin = places[fields.pop('origin')]
+                    destination = places[fields.pop('destination')]
+                except KeyError as e:
+                    report['rejected'].append((path, line_no, f"unknown code {e}"))
+                    continue
+                except (ValueError, IndexError) as e:
+                    report['rejected'].append((path, line_no, str(e)))
+                    continue
+                pending.append(Flight(origin=origin, destination=destination, depart_days=day_bit(weekday), **fields))
+                if len(pending) >= batch_size:
+                    flush()
+        if pending:
+            flush()
+
+    invalidate_timetable()
+    rebuild_route_calendar(batch_size=batch_size)
+    rebuild_flight_instances(batch_size=batch_size)
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+SYNC_FIELDS = ['duration', 'arrival_time', 'airline', 'economy_fare', 'business_fare', 'first_fare']
+
+def schedule_key(origin, destination, plane, weekday, depart_time):
+    """Fingerprint identifying one weekly departure across CSV reloads."""
+    return (origin, destination, plane, weekday, depart_time)
+
+def sync_schedules(paths=SCHEDULE_FILES, batch_size=500, dry_run=False):
+    """
+    Diff the schedule CSVs against the stored flights and apply only the changes.
+
+    Rows are matched on schedule_key(). New departures are inserted, changed
+    fares/timings are updated in place and departures missing from the CSVs are
+    retired by removing their operating day, so Flight rows (and the tickets
+    pointing at them) are never deleted. Each batch commits in its own
+    transaction to keep SQLite write locks short while the site is serving.
+    Rows sharing a fingerprint are paired with stored flights in file/id order.
+    """
+    started = time.perf_counter()
+    places = {}
+    for place in Place.objects.all():
+        places.setdefault(place.code, place)
+
+    report = {'rows': 0, 'inserted': 0, 'updated': 0, 'retired': 0, 'unchanged': 0, 'rejected': []}
+
+    incoming = {}
+    for path in paths:
+        for line_no, row in iter_schedule_rows(path):
+            report['rows'] += 1
+            try:
+                fields, weekday = parse_schedule_row(row)
+                if fields['origin'] not in places or fields['destination'] not in places:
+                    raise KeyError(fields['origin'] if fields['origin'] not in places else fields['destination'])
+            except KeyError as e:
+                report['rejected'].append((path, line_no, f"unknown code {e}"))
+                continue
+            except (ValueError, IndexError) as e:
+                report['rejected'].append((path, line_no, str(e)))
+                continue
+            key = schedule_key(fields['origin'], fields['destination'], fields['plane'], weekday, fields['depart_time'])
+            incoming.setdefault(key, []).append(fields)
+
+    stored = {}
+    columns = ['id', 'origin__code', 'destination__code', 'plane', 'depart_time', 'depart_days'] + SYNC_FIELDS
+    for values in Flight.objects.values(*columns).order_by('id').iterator():
+        for weekday in range(7):
+            if values['depart_days'] & day_bit(weekday):
+                key = schedule_key(values['origin__code'], values['destination__code'], values['plane'], weekday, values['depart_time'])
+                stored.setdefault(key, []).append(values)
+
+    inserts, updates, retirements = [], [], []
+    for key, rows in incoming.items():
+        existing = stored.pop(key, [])
+        for fields, current in zip(rows, existing):
+            changed = {name: fields[name] for name in SYNC_FIELDS if fields[name] != current[name]}
+            if changed:
+                updates.append(Flight(id=current['id'], **{name: fields[name] for name in SYNC_FIELDS}))
+            else:
+                report['unchanged'] += 1
+        for fields in rows[len(existing):]:
+            inserts.append((fields, key[3]))
+        for current in existing[len(rows):]:
+            retirements.append((current['id'], key[3]))
+    for key, leftovers in stored.items():
+        for current in leftovers:
+            retirements.append((current['id'], key[3]))
+
+    report['inserted'] = len(inserts)
+    report['updated'] = len(updates)
+    report['retired'] = len(retirements)
+    if dry_run:
+        report['seconds'] = time.perf_counter() - started
+        return report
+
+    inserted_ids = []
+    for start in range(0, len(inserts), batch_size):
+        batch = inserts[start:start + batch_size]
+        flights = []
+        for fields, weekday in batch:
+            fields = dict(fields)
+            origin = places[fields.pop('origin')]
+            destination = places[fields.pop('destination')]
+            flights.append(Flight(origin=origin, destination=destination, depart_days=day_bit(weekday), **fields))
+        with transaction.atomic():
+            Flight.objects.bulk_create(flights)
+        inserted_ids += [flight.id for flight in flights]
+
+    for start in range(0, len(updates), batch_size):
+        with transaction.atomic():
+            Flight.objects.bulk_update(updates[start:start + batch_size], SYNC_FIELDS)
+
+    for start in range(0, len(retirements), batch_size):
+        batch = retirements[start:start + batch_size]
+        with transaction.atomic():
+            for weekday in {weekday for _, weekday in batch}:
+                Flight.objects.filter(
+                    id__in=[flight_id for flight_id, day in batch if day == weekday],
+                ).on_day(weekday).update(depart_days=F('depart_days') - day_bit(weekday))
+
+    if inserts or updates or retirements:
+        invalidate_timetable()
+        rebuild_route_calendar(batch_size=batch_size)
+        # Only the changed flights' departures; the rest of the window is still current
+        refresh_flights(inserted_ids + [flight.id for flight in updates]
+                        + [flight_id for flight_id, _ in retirements], batch_size=batch_size)
+    report['seconds'] = time.perf_counter() - started
+    return report
 
 def addDomesticFlights():
-    file = open("./Data/domestic_flights.csv", "r")
     print("Adding Domestic Flights...")
-    total = get_number_of_lines("./Data/domestic_flights.csv")
-    for i, line in tqdm(enumerate(file), total=total):
-        if i == 0:
-            continue
-        data = line.split(',')
-        origin = data[1].strip()
-        destination = data[2].strip()
-        depart_time = datetime.strptime(data[3].strip(), "%H:%M:%S").time()
-        depart_week = int(data[4].strip())
-        duration = timedelta(hours=int(data[5].strip()[:2]), minutes=int(data[5].strip()[3:5]))
-        arrive_time = datetime.strptime(data[6].strip(), "%H:%M:%S").time()
-        arrive_week = int(data[7].strip())
-        flight_no = data[8].strip()
-        airline = data[10].strip()
-        economy_fare = float(data[11].strip()) if data[11].strip() else 0.0
-        business_fare = float(data[12].strip()) if data[12].strip() else 0.0
-        first_fare = float(data[13].strip()) if data[13].strip() else 0.0
-
-        try:
-            a1 = Flight.objects.create(origin=Place.objects.get(code=origin), destination=Place.objects.get(code=destination), depart_time=depart_time , duration=duration, arrival_time=arrive_time, plane=flight_no, airline=airline, economy_fare=economy_fare, business_fare=business_fare, first_fare=first_fare)
-            a1.depart_day.add(Week.objects.get(number=depart_week))
-            a1.save()
-        except Exception as e:
-            print(e)
-            return
-    print("Done.\n")
+    report = load_schedules(["./Data/domestic_flights.csv"])
+    print(f"Done. {report['created']} added, {len(report['rejected'])} rejected.\n")
 
 def addInternationalFlights():
-    file = open("./Data/international_flights.csv", "r")
     print("Adding International Flights...")
-    total = get_number_of_lines("./Data/international_flights.csv")
-    for i, line in tqdm(enumerate(file), total=total):
-        if i == 0:
-            continue
-        data = line.split(',')
-        origin = data[1].strip()
-        destination = data[2].strip()
-        depart_time = datetime.strptime(data[3].strip(), "%H:%M:%S").time()
-        depart_week = int(data[4].strip())
-        duration = timedelta(hours=int(data[5].strip()[:2]), minutes=int(data[5].strip()[3:5]))
-        arrive_time = datetime.strptime(data[6].strip(), "%H:%M:%S").time()
-        arrive_week = int(data[7].strip())
-        flight_no = data[8].strip()
-        airline = data[10].strip()
-        economy_fare = float(data[11].strip()) if data[11].strip() else 0.0
-        business_fare = float(data[12].strip()) if data[12].strip() else 0.0
-        first_fare = float(data[13].strip()) if data[13].strip() else 0.0
-
-        try:
-            a1 = Flight.objects.create(origin=Place.objects.get(code=origin), destination=Place.objects.get(code=destination), depart_time=depart_time , duration=duration, arrival_time=arrive_time, plane=flight_no, airline=airline, economy_fare=economy_fare, business_fare=business_fare, first_fare=first_fare)
-            a1.depart_day.add(Week.objects.get(number=depart_week))
-            a1.save()
-        except Exception as e:
-            print(e)
-            return
-    print("Done.\n")
+    report = load_schedules(["./Data/international_flights.csv"])
+    print(f"Done. {report['created']} added, {len(report['rejected'])} rejected.\n")
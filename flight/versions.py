@@ -0,0 +1,57 @@
+"""
+Version stamps in the shared cache for data derived from the database.
+
+A stamp is an opaque token under a cache key that changes whenever its
+source data does. Per-process indexes (the timetable, the airport index)
+remember the stamp they were built from and rebuild when it moves; cache
+keys of derived results (the fare calendar) embed it so a bump orphans
+them.
+"""
+
+import threading
+import uuid
+
+from django.core.cache import cache
+
+
+def current_version(key):
+    """The stamp under `key`, creating one if it is missing"""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """Replace the stamp under `key`, marking everything built from the old one stale"""
+    cache.set(key, uuid.uuid4().hex, None)
+
+
+class VersionedIndex:
+    """
+    One process's copy of an index built by `build(version)`, rebuilt on
+    lookup whenever the stamp under `key` has moved. Built objects expose
+    the stamp they were built from as `.version`.
+    """
+
+    def __init__(self, key, build):
+        self.key = key
+        self.build = build
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = current_version(self.key)
+        current = self._value
+        if current is not None and current.version == version:
+            return current
+        with self._lock:
+            if self._value is None or self._value.version != version:
+                self._value = self.build(version)
+            return self._value
+
+    def invalidate(self):
+        """Mark every process's copy stale; call after bulk writes that bypass signals"""
+        bump_version(self.key)
+        self._value = None
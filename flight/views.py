@@ -1,35 +1,32 @@
 from django.shortcuts import render, HttpResponse, HttpResponseRedirect, redirect
 from django.urls import reverse
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
+from django.db import transaction
+from django.utils import timezone
 
-from datetime import datetime
+from datetime import datetime, timedelta
+import json
 import math
 from .models import *
-from capstone.utils import render_to_pdf, createticket
+from capstone.utils import render_to_pdf, createtickets
 from .amadeus_service import amadeus_service
+from .planner import find_place, plan_leg
+from .inventory import hold_expired, release_tickets
+from .bookings import InvalidCursor, booking_page
+from .airports import get_airport_index, DEFAULT_LIMIT, MAX_LIMIT
+from .connections import find_connections
+from .search import gather
+from .offer_cache import offer_cache
+from .results import LOCAL_CURRENCY, InvalidQuery, ResultQuery, amadeus_results, local_results
+from .pairing import DEFAULT_PAIRS, top_round_trips
+from .fare_calendar import fare_calendar
 
 
 #Fee and Surcharge variable
 from .constant import FEE
-from flight.utils import createWeekDays, addPlaces, addDomesticFlights, addInternationalFlights
-
-try:
-    if len(Week.objects.all()) == 0:
-        createWeekDays()
-
-    if len(Place.objects.all()) == 0:
-        addPlaces()
-
-    if len(Flight.objects.all()) == 0:
-        print("Do you want to add flights in the Database? (y/n)")
-        if input().lower() in ['y', 'yes']:
-            addDomesticFlights()
-            addInternationalFlights()
-except:
-    pass
 
 # Create your views here.
 def flighttime(request):
@@ -124,13 +121,12 @@ def logout_view(request):
     return HttpResponseRedirect(reverse("index"))
 
 def query(request, q):
-    places = Place.objects.all()
-    filters = []
-    q = q.lower()
-    for place in places:
-        if (q in place.city.lower()) or (q in place.airport.lower()) or (q in place.code.lower()) or (q in place.country.lower()):
-            filters.append(place)
-    return JsonResponse([{'code':place.code, 'city':place.city, 'country': place.country} for place in filters], safe=False)
+    try:
+        limit = min(int(request.GET.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    places = get_airport_index().search(q, limit)
+    return JsonResponse([{'code':place.code, 'city':place.city, 'country': place.country} for place in places], safe=False)
 
 def enhanced_search(request):
     """
@@ -173,86 +169,24 @@ def flight(request):
     departdate = request.GET.get('DepartDate')
     depart_date = datetime.strptime(departdate, "%Y-%m-%d")
     return_date = None
-    if trip_type == '2':
-        returndate = request.GET.get('ReturnDate')
-        return_date = datetime.strptime(returndate, "%Y-%m-%d")
-        flightday2 = Week.objects.get(number=return_date.weekday())
-        origin2 = Place.objects.get(code=d_place.upper())
-        destination2 = Place.objects.get(code=o_place.upper())
     seat = request.GET.get('SeatClass')
 
-    flightday = Week.objects.get(number=depart_date.weekday())
-    destination = Place.objects.get(code=d_place.upper())
-    origin = Place.objects.get(code=o_place.upper())
-    available_days = []
-
-    if seat == 'economy':
-        flights = Flight.objects.filter(depart_day=flightday,origin=origin,destination=destination).exclude(economy_fare=0).order_by('economy_fare')
-        if not flights.exists():
-            available_days = Flight.objects.filter(origin=origin, destination=destination).exclude(economy_fare=0).values_list('depart_day__name', flat=True).distinct()
-        try:
-            max_price = flights.last().economy_fare
-            min_price = flights.first().economy_fare
-        except:
-            max_price = 0
-            min_price = 0
+    destination = find_place(d_place)
+    origin = find_place(o_place)
 
-        if trip_type == '2':
-            flights2 = Flight.objects.filter(depart_day=flightday2,origin=origin2,destination=destination2).exclude(economy_fare=0).order_by('economy_fare')
-            if not flights2.exists():
-                available_days2 = Flight.objects.filter(origin=origin2, destination=destination2).exclude(economy_fare=0).values_list('depart_day__name', flat=True).distinct()
-            try:
-                max_price2 = flights2.last().economy_fare
-                min_price2 = flights2.first().economy_fare
-            except:
-                max_price2 = 0
-                min_price2 = 0
-
-    elif seat == 'business':
-        flights = Flight.objects.filter(depart_day=flightday,origin=origin,destination=destination).exclude(business_fare=0).order_by('business_fare')
-        if not flights.exists():
-            available_days = Flight.objects.filter(origin=origin, destination=destination).exclude(business_fare=0).values_list('depart_day__name', flat=True).distinct()
-        try:
-            max_price = flights.last().business_fare
-            min_price = flights.first().business_fare
-        except:
-            max_price = 0
-            min_price = 0
-
-        if trip_type == '2':
-            flights2 = Flight.objects.filter(depart_day=flightday2,origin=origin2,destination=destination2).exclude(business_fare=0).order_by('business_fare')
-            if not flights2.exists():
-                available_days2 = Flight.objects.filter(origin=origin2, destination=destination2).exclude(business_fare=0).values_list('depart_day__name', flat=True).distinct()
-            try:
-                max_price2 = flights2.last().business_fare
-                min_price2 = flights2.first().business_fare
-            except:
-                max_price2 = 0
-                min_price2 = 0
-
-    elif seat == 'first':
-        flights = Flight.objects.filter(depart_day=flightday,origin=origin,destination=destination).exclude(first_fare=0).order_by('first_fare')
-        if not flights.exists():
-            available_days = Flight.objects.filter(origin=origin, destination=destination).exclude(first_fare=0).values_list('depart_day__name', flat=True).distinct()
-        try:
-            max_price = flights.last().first_fare
-            min_price = flights.first().first_fare
-        except:
-            max_price = 0
-            min_price = 0
-
-        if trip_type == '2':
-            flights2 = Flight.objects.filter(depart_day=flightday2,origin=origin2,destination=destination2).exclude(first_fare=0).order_by('first_fare')
-            if not flights2.exists():
-                available_days2 = Flight.objects.filter(origin=origin2, destination=destination2).exclude(first_fare=0).values_list('depart_day__name', flat=True).distinct()
-            try:
-                max_price2 = flights2.last().first_fare
-                min_price2 = flights2.first().first_fare
-            except:
-                max_price2 = 0
-                min_price2 = 0
+    outbound = plan_leg(origin.code, destination.code, depart_date, seat)
+    flights, available_days = outbound.flights, outbound.available_days
+    min_price, max_price = outbound.min_price, outbound.max_price
 
     if trip_type == '2':
+        returndate = request.GET.get('ReturnDate')
+        return_date = datetime.strptime(returndate, "%Y-%m-%d")
+        origin2 = destination
+        destination2 = origin
+        inbound = plan_leg(origin2.code, destination2.code, return_date, seat)
+        flights2, available_days2 = inbound.flights, inbound.available_days
+        min_price2, max_price2 = inbound.min_price, inbound.max_price
+
         return render(request, "flight/search.html", {
             'flights': flights,
             'origin': origin,
@@ -269,7 +203,8 @@ def flight(request):
             'max_price2': math.ceil(max_price2/100)*100,
             'min_price2': math.floor(min_price2/100)*100,
             'available_days': available_days,
-            'available_days2': available_days2
+            'available_days2': available_days2,
+            'cheapest_day': outbound.cheapest_day,
         })
     else:
         return render(request, "flight/search.html", {
@@ -282,7 +217,8 @@ def flight(request):
             'return_date': return_date,
             'max_price': math.ceil(max_price/100)*100,
             'min_price': math.floor(min_price/100)*100,
-            'available_days': available_days
+            'available_days': available_days,
+            'cheapest_day': outbound.cheapest_day,
         })
 
 def review(request):
@@ -356,29 +292,24 @@ def book(request):
                 fname = request.POST[f'passenger{i}FName']
                 lname = request.POST[f'passenger{i}LName']
                 gender = request.POST[f'passenger{i}Gender']
-                passengers.append(Passenger.objects.create(first_name=fname,last_name=lname,gender=gender.lower()))
+                passengers.append(Passenger(first_name=fname,last_name=lname,gender=gender.lower()))
             coupon = request.POST.get('coupon')
             
             try:
-                ticket1 = createticket(request.user,passengers,passengerscount,flight1,flight_1date,flight_1class,coupon,countrycode,email,mobile)
+                ticket_legs = [(flight1, flight_1date, flight_1class)]
                 if f2:
-                    ticket2 = createticket(request.user,passengers,passengerscount,flight2,flight_2date,flight_2class,coupon,countrycode,email,mobile)
-
-                if(flight_1class == 'Economy'):
-                    if f2:
-                        fare = (flight1.economy_fare*int(passengerscount))+(flight2.economy_fare*int(passengerscount))
-                    else:
-                        fare = flight1.economy_fare*int(passengerscount)
-                elif (flight_1class == 'Business'):
-                    if f2:
-                        fare = (flight1.business_fare*int(passengerscount))+(flight2.business_fare*int(passengerscount))
-                    else:
-                        fare = flight1.business_fare*int(passengerscount)
-                elif (flight_1class == 'First'):
-                    if f2:
-                        fare = (flight1.first_fare*int(passengerscount))+(flight2.first_fare*int(passengerscount))
-                    else:
-                        fare = flight1.first_fare*int(passengerscount)
+                    ticket_legs.append((flight2, flight_2date, flight_2class))
+                # Passengers, tickets and their links are written together or not at all
+                with transaction.atomic():
+                    passengers = Passenger.objects.bulk_create(passengers)
+                    tickets = createtickets(request.user, passengers, ticket_legs, coupon, countrycode, email, mobile)
+                ticket1 = tickets[0]
+                if f2:
+                    ticket2 = tickets[1]
+
+                # Both legs are booked in the outbound seat class
+                legs = [flight1, flight2] if f2 else [flight1]
+                fare = sum(flight.fare(flight_1class) for flight in legs) * int(passengerscount)
             except Exception as e:
                 return HttpResponse(e)
             
@@ -415,13 +346,19 @@ def payment(request):
 
             try:
                 ticket = Ticket.objects.get(id=ticket_id)
+                if t2:
+                    ticket2 = Ticket.objects.get(id=ticket2_id)
+                # Seats of a hold that ran out may already be resold
+                unpaid = [ticket, ticket2] if t2 else [ticket]
+                if any(t.status == 'CANCELLED' or hold_expired(t) for t in unpaid):
+                    release_tickets(unpaid)
+                    return HttpResponse("This booking has expired. Please search and book again.")
                 ticket.status = 'CONFIRMED'
-                ticket.booking_date = datetime.now()
-                ticket.save()
+                ticket.booking_date = timezone.now()
+                ticket.save(update_fields=['status', 'booking_date'])
                 if t2:
-                    ticket2 = Ticket.objects.get(id(ticket2_id))
                     ticket2.status = 'CONFIRMED'
-                    ticket2.save()
+                    ticket2.save(update_fields=['status'])
                     return render(request, 'flight/payment_process.html', {
                         'ticket1': ticket,
                         'ticket2': ticket2
@@ -462,10 +399,15 @@ def get_ticket(request):
 
 def bookings(request):
     if request.user.is_authenticated:
-        tickets = Ticket.objects.filter(user=request.user).order_by('-booking_date')
+        try:
+            tickets, next_cursor = booking_page(request.user, request.GET.get('after'))
+        except InvalidCursor as e:
+            return HttpResponse(e, status=400)
         return render(request, 'flight/bookings.html', {
             'page': 'bookings',
-            'tickets': tickets
+            'tickets': tickets,
+            'next_cursor': next_cursor,
+            'paged': 'after' in request.GET
         })
     else:
         return HttpResponseRedirect(reverse('login'))
@@ -478,8 +420,7 @@ def cancel_ticket(request):
             try:
                 ticket = Ticket.objects.get(ref_no=ref)
                 if ticket.user == request.user:
-                    ticket.status = 'CANCELLED'
-                    ticket.save()
+                    release_tickets([ticket])
                     return JsonResponse({'success': True})
                 else:
                     return JsonResponse({
@@ -528,7 +469,7 @@ def about_us(request):
 # Amadeus API Integration Views
 
 @csrf_exempt
-def amadeus_flight_search(request):
+async def amadeus_flight_search(request):
     """
     Search flights using Amadeus API
     """
@@ -551,7 +492,7 @@ def amadeus_flight_search(request):
         amadeus_class = seat_class_map.get(seat_class.lower(), 'ECONOMY')
         
         # Search flights using Amadeus
-        search_result = amadeus_service.search_flights(
+        search_result = await amadeus_service.asearch_flights(
             origin_code=origin,
             destination_code=destination,
             departure_date=depart_date,
@@ -569,8 +510,8 @@ def amadeus_flight_search(request):
         
         # Get place objects for display
         try:
-            origin_place = Place.objects.get(code=origin.upper())
-            destination_place = Place.objects.get(code=destination.upper())
+            origin_place = await Place.objects.aget(code=origin.upper())
+            destination_place = await Place.objects.aget(code=destination.upper())
         except Place.DoesNotExist:
             return JsonResponse({
                 'error': True,
@@ -578,11 +519,14 @@ def amadeus_flight_search(request):
                 'flights': []
             })
         
-        # Return Amadeus results
+        # Return Amadeus results; ?format=columns sends the compact offer table
+        flights = search_result['flights']
+        payload = {'offers': flights.as_columns()} if request.GET.get('format') == 'columns' \
+            else {'flights': flights.as_dicts()}
         return JsonResponse({
             'error': False,
             'source': 'amadeus',
-            'flights': search_result['flights'],
+            **payload,
             'count': search_result['count'],
             'origin': {
                 'code': origin_place.code,
@@ -612,6 +556,7 @@ def unified_flight_search(request):
         returndate = request.POST.get('ReturnDate')
         seat = request.POST.get('SeatClass', 'economy')
         include_amadeus = request.POST.get('include_amadeus', 'true') == 'true'
+        connection_sort = request.POST.get('ConnectionSort', 'fare')
     else:
         # Handle GET parameters (for modify search, etc.)
         o_place = request.GET.get('Origin')
@@ -621,6 +566,7 @@ def unified_flight_search(request):
         returndate = request.GET.get('ReturnDate')
         seat = request.GET.get('SeatClass', 'economy')
         include_amadeus = request.GET.get('include_amadeus', 'true') == 'true'
+        connection_sort = request.GET.get('ConnectionSort', 'fare')
 
     # Validate required parameters
     if not all([o_place, d_place, departdate]):
@@ -636,129 +582,84 @@ def unified_flight_search(request):
 
         # Get place objects
         try:
-            origin = Place.objects.get(code=o_place.upper())
-            destination = Place.objects.get(code=d_place.upper())
+            origin = find_place(o_place)
+            destination = find_place(d_place)
         except Place.DoesNotExist:
             messages.error(request, "Invalid airport codes provided.")
             return redirect('home')
 
-        # Initialize result containers
-        local_flights = []
-        amadeus_flights = []
-        local_flights2 = []  # For return flights
-        amadeus_error = None
-        
-        # Search local database flights
-        flightday = Week.objects.get(name=depart_date.strftime("%A"))
-        
-        if seat.lower() == 'economy':
-            local_flights = Flight.objects.filter(
-                depart_day=flightday,
-                origin=origin,
-                destination=destination
-            ).exclude(economy_fare=0).order_by('economy_fare')
-        elif seat.lower() == 'business':
-            local_flights = Flight.objects.filter(
-                depart_day=flightday,
-                origin=origin,
-                destination=destination
-            ).exclude(business_fare=0).order_by('business_fare')
-        elif seat.lower() == 'first':
-            local_flights = Flight.objects.filter(
-                depart_day=flightday,
-                origin=origin,
-                destination=destination
-            ).exclude(first_fare=0).order_by('first_fare')
-
-        # Search return flights for round trip
+        # Map seat class to Amadeus format
+        seat_class_map = {
+            'economy': 'ECONOMY',
+            'business': 'BUSINESS', 
+            'first': 'FIRST'
+        }
+        amadeus_class = seat_class_map.get(seat.lower(), 'ECONOMY')
+
+        def search_outbound():
+            plan = plan_leg(origin.code, destination.code, depart_date, seat)
+            # Offer connecting itineraries when there is no direct flight
+            connections = [] if plan.flights else find_connections(
+                origin.code, destination.code, depart_date.weekday(), seat, sort=connection_sort, limit=10)
+            return plan, connections
+
+        def search_return():
+            # Return trip reverses origin/destination
+            return plan_leg(destination.code, origin.code, return_date, seat)
+
+        def search_amadeus():
+            return amadeus_service.search_flights(
+                origin_code=origin.code,
+                destination_code=destination.code,
+                departure_date=depart_date.strftime("%Y-%m-%d"),
+                return_date=return_date.strftime("%Y-%m-%d") if return_date else None,
+                adults=1,
+                travel_class=amadeus_class,
+                max_results=20
+            )
+
+        # Run the Amadeus search in the background while the local legs run here, under one deadline
+        tasks = {'outbound': search_outbound}
         if trip_type == '2' and return_date:
-            flightday2 = Week.objects.get(name=return_date.strftime("%A"))
-            origin2 = destination  # Return trip reverses origin/destination
-            destination2 = origin
-            
-            if seat.lower() == 'economy':
-                local_flights2 = Flight.objects.filter(
-                    depart_day=flightday2,
-                    origin=origin2,
-                    destination=destination2
-                ).exclude(economy_fare=0).order_by('economy_fare')
-            elif seat.lower() == 'business':
-                local_flights2 = Flight.objects.filter(
-                    depart_day=flightday2,
-                    origin=origin2,
-                    destination=destination2
-                ).exclude(business_fare=0).order_by('business_fare')
-            elif seat.lower() == 'first':
-                local_flights2 = Flight.objects.filter(
-                    depart_day=flightday2,
-                    origin=origin2,
-                    destination=destination2
-                ).exclude(first_fare=0).order_by('first_fare')
-
-        # Search Amadeus API if requested
+            tasks['return'] = search_return
         if include_amadeus:
-            try:
-                # Map seat class to Amadeus format
-                seat_class_map = {
-                    'economy': 'ECONOMY',
-                    'business': 'BUSINESS', 
-                    'first': 'FIRST'
-                }
-                amadeus_class = seat_class_map.get(seat.lower(), 'ECONOMY')
-                
-                # Search Amadeus flights
-                amadeus_result = amadeus_service.search_flights(
-                    origin_code=origin.code,
-                    destination_code=destination.code,
-                    departure_date=depart_date.strftime("%Y-%m-%d"),
-                    return_date=return_date.strftime("%Y-%m-%d") if return_date else None,
-                    adults=1,
-                    travel_class=amadeus_class,
-                    max_results=20
-                )
-                
-                if not amadeus_result.get('error'):
-                    amadeus_flights = amadeus_result.get('flights', [])
-                else:
-                    amadeus_error = amadeus_result.get('message', 'Amadeus search failed')
-                    
-            except Exception as e:
-                amadeus_error = f"Amadeus API error: {str(e)}"
+            tasks['amadeus'] = search_amadeus
+        results, errors, timed_out = gather(tasks, inline=('outbound', 'return'))
 
-        # Calculate price ranges for filters
-        max_price = min_price = 0
-        max_price2 = min_price2 = 0
-        
-        if local_flights:
-            if seat.lower() == 'economy':
-                prices = [f.economy_fare for f in local_flights]
-            elif seat.lower() == 'business':
-                prices = [f.business_fare for f in local_flights]
-            else:
-                prices = [f.first_fare for f in local_flights]
-            max_price = max(prices)
-            min_price = min(prices)
-            
-        if local_flights2:
-            if seat.lower() == 'economy':
-                prices2 = [f.economy_fare for f in local_flights2]
-            elif seat.lower() == 'business':
-                prices2 = [f.business_fare for f in local_flights2]
+        for name in ('outbound', 'return'):
+            if name in errors:
+                raise errors[name]
+        outbound, connections = results.get('outbound', (None, []))
+        inbound = results.get('return')
+        local_flights = outbound.flights if outbound else ()
+        local_flights2 = inbound.flights if inbound else ()
+
+        amadeus_flights = []
+        amadeus_error = None
+        if 'amadeus' in results:
+            amadeus_result = results['amadeus']
+            if not amadeus_result.get('error'):
+                amadeus_flights = amadeus_result.get('flights', [])
             else:
-                prices2 = [f.first_fare for f in local_flights2]
-            max_price2 = max(prices2)
-            min_price2 = min(prices2)
+                amadeus_error = amadeus_result.get('message', 'Amadeus search failed')
+        elif 'amadeus' in errors:
+            amadeus_error = f"Amadeus API error: {str(errors['amadeus'])}"
+        elif 'amadeus' in timed_out:
+            amadeus_error = "Live flight search is taking longer than usual; showing the results available so far."
+
+        # Price ranges for filters
+        min_price, max_price = (outbound.min_price, outbound.max_price) if outbound else (0, 0)
+        min_price2, max_price2 = (inbound.min_price, inbound.max_price) if inbound else (0, 0)
 
         # Include Amadeus prices in range calculation
         if amadeus_flights:
-            amadeus_prices = [float(f['price']['total']) for f in amadeus_flights]
-            if amadeus_prices:
-                if max_price == 0:
-                    max_price = max(amadeus_prices)
-                    min_price = min(amadeus_prices)
-                else:
-                    max_price = max(max_price, max(amadeus_prices))
-                    min_price = min(min_price, min(amadeus_prices))
+            amadeus_min, amadeus_max = amadeus_flights.price_range()
+            if max_price == 0:
+                max_price = amadeus_max
+                min_price = amadeus_min
+            else:
+                max_price = max(max_price, amadeus_max)
+                min_price = min(min_price, amadeus_min)
 
         # Prepare context for template
         context = {
@@ -774,7 +675,9 @@ def unified_flight_search(request):
             'min_price': math.floor(min_price/100)*100 if min_price else 0,
             'include_amadeus': include_amadeus,
             'amadeus_error': amadeus_error,
+            'partial_results': bool(timed_out),
             'available_days': [],
+            'connections': connections,
         }
         
         # Add return flight data for round trips
@@ -815,8 +718,8 @@ def enhanced_flight_search(request):
     source = request.GET.get('source', 'both')  # 'database', 'amadeus', or 'both'
 
     try:
-        destination = Place.objects.get(code=d_place.upper())
-        origin = Place.objects.get(code=o_place.upper())
+        destination = find_place(d_place)
+        origin = find_place(o_place)
     except Place.DoesNotExist:
         return HttpResponse("Invalid airport codes provided")
 
@@ -831,82 +734,25 @@ def enhanced_flight_search(request):
     min_price2 = 0
     available_days = []
     available_days2 = []
+    cheapest_day = None
+    connections = []
 
     # Get database flights if requested
     if source in ['database', 'both']:
-        flightday = Week.objects.get(number=depart_date.weekday())
-        
+        outbound = plan_leg(origin.code, destination.code, depart_date, seat)
+        flights, available_days = outbound.flights, outbound.available_days
+        cheapest_day = outbound.cheapest_day
+        if not flights:
+            connections = find_connections(origin.code, destination.code, depart_date.weekday(), seat,
+                                           sort=request.GET.get('ConnectionSort', 'fare'), limit=10)
+        min_price, max_price = outbound.min_price, outbound.max_price
+
         if trip_type == '2':
-            flightday2 = Week.objects.get(number=return_date.weekday())
-            origin2 = Place.objects.get(code=d_place.upper())
-            destination2 = Place.objects.get(code=o_place.upper())
-
-        # Database flight search logic (copied from existing flight view)
-        if seat == 'economy':
-            flights = Flight.objects.filter(depart_day=flightday,origin=origin,destination=destination).exclude(economy_fare=0).order_by('economy_fare')
-            if not flights.exists():
-                available_days = Flight.objects.filter(origin=origin, destination=destination).exclude(economy_fare=0).values_list('depart_day__name', flat=True).distinct()
-            try:
-                max_price = flights.last().economy_fare
-                min_price = flights.first().economy_fare
-            except:
-                max_price = 0
-                min_price = 0
-
-            if trip_type == '2':
-                flights2 = Flight.objects.filter(depart_day=flightday2,origin=origin2,destination=destination2).exclude(economy_fare=0).order_by('economy_fare')
-                if not flights2.exists():
-                    available_days2 = Flight.objects.filter(origin=origin2, destination=destination2).exclude(economy_fare=0).values_list('depart_day__name', flat=True).distinct()
-                try:
-                    max_price2 = flights2.last().economy_fare
-                    min_price2 = flights2.first().economy_fare
-                except:
-                    max_price2 = 0
-                    min_price2 = 0
-
-        elif seat == 'business':
-            flights = Flight.objects.filter(depart_day=flightday,origin=origin,destination=destination).exclude(business_fare=0).order_by('business_fare')
-            if not flights.exists():
-                available_days = Flight.objects.filter(origin=origin, destination=destination).exclude(business_fare=0).values_list('depart_day__name', flat=True).distinct()
-            try:
-                max_price = flights.last().business_fare
-                min_price = flights.first().business_fare
-            except:
-                max_price = 0
-                min_price = 0
-
-            if trip_type == '2':
-                flights2 = Flight.objects.filter(depart_day=flightday2,origin=origin2,destination=destination2).exclude(business_fare=0).order_by('business_fare')
-                if not flights2.exists():
-                    available_days2 = Flight.objects.filter(origin=origin2, destination=destination2).exclude(business_fare=0).values_list('depart_day__name', flat=True).distinct()
-                try:
-                    max_price2 = flights2.last().business_fare
-                    min_price2 = flights2.first().business_fare
-                except:
-                    max_price2 = 0
-                    min_price2 = 0
-
-        elif seat == 'first':
-            flights = Flight.objects.filter(depart_day=flightday,origin=origin,destination=destination).exclude(first_fare=0).order_by('first_fare')
-            if not flights.exists():
-                available_days = Flight.objects.filter(origin=origin, destination=destination).exclude(first_fare=0).values_list('depart_day__name', flat=True).distinct()
-            try:
-                max_price = flights.last().first_fare
-                min_price = flights.first().first_fare
-            except:
-                max_price = 0
-                min_price = 0
-
-            if trip_type == '2':
-                flights2 = Flight.objects.filter(depart_day=flightday2,origin=origin2,destination=destination2).exclude(first_fare=0).order_by('first_fare')
-                if not flights2.exists():
-                    available_days2 = Flight.objects.filter(origin=origin2, destination=destination2).exclude(first_fare=0).values_list('depart_day__name', flat=True).distinct()
-                try:
-                    max_price2 = flights2.last().first_fare
-                    min_price2 = flights2.first().first_fare
-                except:
-                    max_price2 = 0
-                    min_price2 = 0
+            origin2 = destination
+            destination2 = origin
+            inbound = plan_leg(origin2.code, destination2.code, return_date, seat)
+            flights2, available_days2 = inbound.flights, inbound.available_days
+            min_price2, max_price2 = inbound.min_price, inbound.max_price
 
     # Get Amadeus flights if requested
     if source in ['amadeus', 'both']:
@@ -944,7 +790,9 @@ def enhanced_flight_search(request):
         'max_price': math.ceil(max_price/100)*100 if max_price else 0,
         'min_price': math.floor(min_price/100)*100 if min_price else 0,
         'available_days': available_days,
+        'cheapest_day': cheapest_day,
         'source': source,
+        'connections': connections,
     }
 
     if trip_type == '2':
@@ -960,14 +808,213 @@ def enhanced_flight_search(request):
 
     return render(request, "flight/search.html", context)
 
-def amadeus_airport_suggestions(request, q):
+def query_connections(request):
+    """
+    Connecting itineraries over the local schedule as JSON
+    """
+    o_place = request.GET.get('Origin')
+    d_place = request.GET.get('Destination')
+    departdate = request.GET.get('DepartDate')
+    if not all([o_place, d_place, departdate]):
+        return JsonResponse({'error': True, 'message': 'Missing required parameters'})
+    try:
+        depart_date = datetime.strptime(departdate, "%Y-%m-%d")
+        max_stops = min(int(request.GET.get('MaxStops', 2)), 2)
+        limit = min(int(request.GET.get('limit', 20)), 50)
+    except ValueError:
+        return JsonResponse({'error': True, 'message': 'Invalid parameters'})
+
+    itineraries = find_connections(
+        o_place, d_place, depart_date.weekday(), request.GET.get('SeatClass', 'economy'),
+        max_stops=max_stops, sort=request.GET.get('sort', 'fare'), limit=limit
+    )
+    return JsonResponse({
+        'error': False,
+        'itineraries': [itinerary.as_dict() for itinerary in itineraries]
+    })
+
+def search_legs(request, origin, destination, depart_date, return_date, seat, legs):
+    """
+    Result rows for the requested legs ('outbound', 'return') of a search,
+    the local legs running here while Amadeus is searched in the background,
+    under the search deadline.
+
+    Returns (local, amadeus, amadeus_error, timed_out); local and amadeus map
+    each leg to its SearchResult rows.
+    """
+    days = {'outbound': (depart_date, origin, destination), 'return': (return_date, destination, origin)}
+
+    def search_local(leg):
+        day, leg_origin, leg_destination = days[leg]
+        flights = plan_leg(leg_origin.code, leg_destination.code, day, seat).flights
+        # Connecting itineraries only when there is no direct flight, as on the search page
+        connections = [] if flights else find_connections(
+            leg_origin.code, leg_destination.code, day.weekday(), seat,
+            sort=request.GET.get('ConnectionSort', 'fare'), limit=10)
+        return local_results(flights, connections, day, seat)
+
+    def search_amadeus():
+        # Same parameters as the search page, so both share the offer cache entry
+        return amadeus_service.search_flights(
+            origin_code=origin.code,
+            destination_code=destination.code,
+            departure_date=depart_date.strftime("%Y-%m-%d"),
+            return_date=return_date.strftime("%Y-%m-%d") if return_date else None,
+            adults=1,
+            travel_class={'business': 'BUSINESS', 'first': 'FIRST'}.get(seat.lower(), 'ECONOMY'),
+            max_results=20
+        )
+
+    tasks = {leg: (lambda leg=leg: search_local(leg)) for leg in legs}
+    if request.GET.get('include_amadeus', 'true') == 'true':
+        tasks['amadeus'] = search_amadeus
+    results, errors, timed_out = gather(tasks, inline=legs)
+    for leg in legs:
+        if leg in errors:
+            raise errors[leg]
+
+    local = {leg: results.get(leg, []) for leg in legs}
+    amadeus = {leg: [] for leg in legs}
+    amadeus_error = None
+    if 'amadeus' in results:
+        amadeus_result = results['amadeus']
+        if not amadeus_result.get('error'):
+            for index, leg in enumerate(days):
+                if leg in legs:
+                    amadeus[leg] = amadeus_results(amadeus_result['flights'], index, days[leg][0])
+        else:
+            amadeus_error = amadeus_result.get('message', 'Amadeus search failed')
+    elif 'amadeus' in errors:
+        amadeus_error = f"Amadeus API error: {str(errors['amadeus'])}"
+    return local, amadeus, amadeus_error, timed_out
+
+def search_request(request, round_trip=False):
+    """
+    (origin, destination, depart_date, return_date, seat) from the GET
+    parameters shared by the JSON search views, or a JsonResponse error
+    """
+    o_place = request.GET.get('Origin')
+    d_place = request.GET.get('Destination')
+    trip_type = request.GET.get('TripType', '2' if round_trip else '1')
+    departdate = request.GET.get('DepartDate')
+    returndate = request.GET.get('ReturnDate')
+    if not all([o_place, d_place, departdate]) or (round_trip and not returndate):
+        return JsonResponse({'error': True, 'message': 'Missing required parameters'}, status=400)
+    try:
+        depart_date = datetime.strptime(departdate, "%Y-%m-%d")
+        return_date = datetime.strptime(returndate, "%Y-%m-%d") if trip_type == '2' and returndate else None
+    except ValueError:
+        return JsonResponse({'error': True, 'message': 'Invalid date'}, status=400)
+    try:
+        origin = find_place(o_place)
+        destination = find_place(d_place)
+    except Place.DoesNotExist:
+        return JsonResponse({'error': True, 'message': 'Invalid airport codes provided'}, status=400)
+    return origin, destination, depart_date, return_date, request.GET.get('SeatClass', 'economy')
+
+def search_api(request):
+    """
+    Paginated JSON search over local and Amadeus results, filtered and sorted
+    on the server. Leg=return pages through the return flights of a round trip.
+    """
+    leg = request.GET.get('Leg', 'outbound')
+    try:
+        query = ResultQuery.from_request(request.GET)
+    except InvalidQuery as e:
+        return JsonResponse({'error': True, 'message': str(e)}, status=400)
+    search = search_request(request)
+    if isinstance(search, JsonResponse):
+        return search
+    origin, destination, depart_date, return_date, seat = search
+    if leg not in ('outbound', 'return') or (leg == 'return' and return_date is None):
+        return JsonResponse({'error': True, 'message': 'Return leg requires a round trip'}, status=400)
+
+    local, amadeus, amadeus_error, timed_out = search_legs(
+        request, origin, destination, depart_date, return_date, seat, [leg])
+    rows = local[leg] + amadeus[leg]
+    page, total, next_cursor = query.page(rows)
+    prices = [row.price for row in rows]
+    return JsonResponse({
+        'error': False,
+        'leg': leg,
+        'results': [row.as_dict() for row in page],
+        'count': len(page),
+        'total': total,
+        'next_cursor': next_cursor,
+        'price_range': [min(prices), max(prices)] if prices else [0, 0],
+        'amadeus_error': amadeus_error,
+        'partial_results': bool(timed_out),
+    })
+
+def round_trip_api(request):
+    """
+    Best outbound/return pairs of a round trip as JSON, ranked by total fare
+    or total duration (sort=fare|duration); filters apply to both legs.
+    """
+    try:
+        query = ResultQuery.from_request(request.GET)
+        limit = min(int(request.GET.get('limit', DEFAULT_PAIRS)), DEFAULT_PAIRS)
+    except (InvalidQuery, ValueError) as e:
+        message = str(e) if isinstance(e, InvalidQuery) else 'Invalid limit'
+        return JsonResponse({'error': True, 'message': message}, status=400)
+    sort = request.GET.get('sort', 'fare')
+    if sort not in ('fare', 'duration'):
+        return JsonResponse({'error': True, 'message': f"Unknown sort order {sort!r}"}, status=400)
+    search = search_request(request, round_trip=True)
+    if isinstance(search, JsonResponse):
+        return search
+    origin, destination, depart_date, return_date, seat = search
+
+    local, amadeus, amadeus_error, timed_out = search_legs(
+        request, origin, destination, depart_date, return_date, seat, ['outbound', 'return'])
+    legs = {leg: [row for row in local[leg] if query.matches(row)] for leg in local}
+    offers = {leg: [row for row in amadeus[leg] if query.matches(row)] for leg in amadeus}
+    pairs = top_round_trips(legs['outbound'], legs['return'], (offers['outbound'], offers['return']),
+                            sort=sort, limit=limit)
+    return JsonResponse({
+        'error': False,
+        'sort': sort,
+        'round_trips': [pair.as_dict() for pair in pairs],
+        'count': len(pairs),
+        'candidates': len(legs['outbound']) * len(legs['return']) + len(offers['outbound']),
+        'amadeus_error': amadeus_error,
+        'partial_results': bool(timed_out),
+    })
+
+def fare_calendar_api(request):
+    """
+    Cheapest local fare per date within Days (default 3, at most 7) of the
+    departure date and, with a ReturnDate, the departure x return fare matrix
+    """
+    search = search_request(request)
+    if isinstance(search, JsonResponse):
+        return search
+    origin, destination, depart_date, return_date, seat = search
+    try:
+        days = int(request.GET.get('Days', 3))
+    except ValueError:
+        return JsonResponse({'error': True, 'message': 'Invalid value for Days'}, status=400)
+
+    calendar = fare_calendar(origin.code, destination.code, seat, depart_date.date(),
+                             return_date.date() if return_date else None, days=days,
+                             today=datetime.now().date())
+    return JsonResponse({
+        'error': False,
+        'origin': origin.code,
+        'destination': destination.code,
+        'seat': seat.lower(),
+        'currency': LOCAL_CURRENCY,
+        **calendar,
+    })
+
+async def amadeus_airport_suggestions(request, q):
     """
     Get airport suggestions from Amadeus API
     """
     if len(q) < 2:
         return JsonResponse([], safe=False)
     
-    suggestions = amadeus_service.get_airport_suggestions(q)
+    suggestions = await amadeus_service.aget_airport_suggestions(q)
     
     # Format suggestions to match existing format
     formatted_suggestions = []
@@ -984,7 +1031,7 @@ def amadeus_airport_suggestions(request, q):
     return JsonResponse(formatted_suggestions, safe=False)
 
 @csrf_exempt
-def amadeus_flight_price_analysis(request):
+async def amadeus_flight_price_analysis(request):
     """
     Get flight price analysis from Amadeus
     """
@@ -999,7 +1046,7 @@ def amadeus_flight_price_analysis(request):
                 'message': 'Missing required parameters'
             })
         
-        analysis = amadeus_service.get_flight_price_analysis(
+        analysis = await amadeus_service.aget_flight_price_analysis(
             origin_code=origin,
             destination_code=destination,
             departure_date=depart_date
@@ -1008,3 +1055,61 @@ def amadeus_flight_price_analysis(request):
         return JsonResponse(analysis)
     
     return JsonResponse({'error': True, 'message': 'GET method required'})
+
+@csrf_exempt
+def amadeus_flexible_dates(request):
+    """
+    Cheapest Amadeus offer for each departure date within Days (default 3,
+    at most 3) of DepartDate, streamed as one JSON line per date as the
+    searches complete. Round trips keep the trip length for every date.
+
+    Deliberately a sync view over a sync generator: the site is served
+    under WSGI, where Django buffers the whole of an async streaming body
+    before sending it, so lines would only arrive once every search is done.
+    """
+    origin = request.GET.get('Origin')
+    destination = request.GET.get('Destination')
+    depart_date = request.GET.get('DepartDate')
+    return_date = request.GET.get('ReturnDate') if request.GET.get('TripType', '1') == '2' else None
+    if not all([origin, destination, depart_date]):
+        return JsonResponse({'error': True, 'message': 'Missing required parameters'}, status=400)
+    try:
+        depart = datetime.strptime(depart_date, "%Y-%m-%d").date()
+        stay = (datetime.strptime(return_date, "%Y-%m-%d").date() - depart) if return_date else None
+        days = max(0, min(int(request.GET.get('Days', 3)), 3))
+    except ValueError:
+        return JsonResponse({'error': True, 'message': 'Invalid parameters'}, status=400)
+
+    today = datetime.now().date()
+    searches = []
+    for offset in range(-days, days + 1):
+        date = depart + timedelta(days=offset)
+        if date >= today:
+            searches.append((origin.upper(), destination.upper(), date.isoformat(),
+                             (date + stay).isoformat() if stay is not None else None))
+    travel_class = {'business': 'BUSINESS', 'first': 'FIRST'}.get(request.GET.get('SeatClass', '').lower(), 'ECONOMY')
+
+    def lines():
+        for (_, _, date, back), result in amadeus_service.search_dates(searches, travel_class=travel_class):
+            offer = None if result.get('error') else result['flights'].cheapest()
+            yield json.dumps({
+                'date': date,
+                'return_date': back,
+                'error': result.get('message') if result.get('error') else None,
+                'offers': 0 if result.get('error') else result['count'],
+                'cheapest': {
+                    'offer_id': offer.id,
+                    'total': offer.price.total,
+                    'currency': offer.price.currency,
+                } if offer else None,
+            }) + "\n"
+
+    return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+
+def amadeus_cache_stats(request):
+    """
+    Flight-offer cache counters for monitoring (staff only)
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': True, 'message': 'Staff access required'}, status=403)
+    return JsonResponse({'error': False, 'offer_cache': offer_cache.stats()})